@@ -0,0 +1,51 @@
+"""
+Measures the time needed to import parts of the package in a fresh interpreter.
+
+Every statement is executed REPEATS times in a new process (imports are cached within a process);
+the median wall time of the process is reported next to the median time of an empty interpreter.
+
+Usage (with "src" in the PYTHONPATH):
+    python benchmarks/import_time.py
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+REPEATS = 15
+
+STATEMENTS = {
+    "empty interpreter": "pass",
+    "numpy": "import numpy",
+    "scipy.optimize": "import scipy.optimize",
+    "characteristicParameters": "import characteristicParameters",
+    "muellerCalculus": "import characteristicParameters.muellerCalculus",
+    "triangle_wave_functions": "import characteristicParameters.triangle_wave_functions",
+    "optimizationProcedure": "import characteristicParameters.optimizationProcedure",
+    "rgbMethod": "import characteristicParameters.rgbMethod",
+    "optimizer + scipy (first fit)": "import characteristicParameters.optimizationProcedure; import scipy.optimize",
+}
+
+
+def time_statement(statement: str) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def scipy_is_imported_by(statement: str) -> bool:
+    check = f"{statement}; import sys; print('scipy' in sys.modules)"
+    return subprocess.run([sys.executable, "-c", check], check=True, capture_output=True,
+                          text=True).stdout.strip() == "True"
+
+
+if __name__ == "__main__":
+    baseline = time_statement(STATEMENTS["empty interpreter"])
+    print(f"{'statement':<32}{'median [ms]':>12}{'import [ms]':>13}  scipy loaded")
+    for (name, statement) in STATEMENTS.items():
+        median = time_statement(statement)
+        print(f"{name:<32}{1e3 * median:>12.1f}{1e3 * (median - baseline):>13.1f}  "
+              f"{scipy_is_imported_by(statement)}")
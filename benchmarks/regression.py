@@ -0,0 +1,197 @@
+"""
+Regression-tracking benchmark harness.
+
+A fixed set of workloads is timed REPEATS times; the results are stored in a versioned JSON file.
+A later run is compared against such a baseline and slowdowns are flagged if
+    1. the median time grew by more than the threshold (default 10 %) and
+    2. the slowdown is statistically significant (one-sided Mann-Whitney U test, default alpha 0.05).
+
+Usage (with "src" in the PYTHONPATH):
+    python benchmarks/regression.py run -o benchmarks/baseline.json
+    python benchmarks/regression.py compare benchmarks/baseline.json                 # times the workloads now
+    python benchmarks/regression.py compare benchmarks/baseline.json current.json    # compares two stored runs
+"compare" exits with status 1 if a regression was found, so it can be used in CI.
+"""
+import argparse
+import datetime
+import importlib.metadata
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+
+from characteristicParameters import imageProcessing
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes, char_paras_to_stokes
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+from characteristicParameters.rgbMethod import MeasuredRetardationsAtOneLocation, MultipleNeighboringLocations, \
+    RetardationMeasurement, convert_retardation_to_different_wavelength, define_reduced_birefringence_function
+from characteristicParameters.triangle_wave_functions import T_pi
+
+FORMAT_VERSION = 1
+WAVELENGTHS = [632.8, 546.1, 435.8]
+K_FUNCTION = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+
+
+def rgb_location(delta_r: float) -> MeasuredRetardationsAtOneLocation:
+    measurements = [RetardationMeasurement(wavelength=wavelength,
+                                           delta=T_pi(convert_retardation_to_different_wavelength(
+                                               k_function=K_FUNCTION, wavelength_1=WAVELENGTHS[0],
+                                               delta_1=delta_r, wavelength_2=wavelength)))
+                    for wavelength in WAVELENGTHS]
+    return MeasuredRetardationsAtOneLocation(measurement_at_reference_wavelength=measurements[0],
+                                             additional_measurements=measurements[1:],
+                                             reduced_birefringence_function=K_FUNCTION)
+
+
+def single_pixel_optimizer_fit() -> Callable[[], object]:
+    phis = [0, math.pi / 4, math.pi / 8]
+    measurements = [MeasuredStokesVector(phi=phi, stokes_vector=char_paras_to_stokes(
+        delta=1.1, theta=0.4, omega=2.0, stokes_in=linearly_polarized_light(phi))) for phi in phis]
+    procedure = OptimizationProcedure(measurements)
+    return procedure.find_characteristic_parameters
+
+
+def analytic_inversion_512() -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    delta, theta, omega = (rng.uniform(0, math.pi, (512, 512)) for _ in range(3))
+    phis = [0, math.pi / 4]
+    stokes = np.stack([char_paras_images_to_stokes(delta, theta, omega, linearly_polarized_light(phi))
+                       for phi in phis])
+    return lambda: imageProcessing.analytic_image(stokes, phis=phis)
+
+
+def rgb_location_solve_3_channels() -> Callable[[], object]:
+    return rgb_location(21.25 * math.pi).find_delta_r
+
+
+def neighbor_solve(n_locations: int) -> Callable[[], Callable[[], object]]:
+    def setup():
+        locations = MultipleNeighboringLocations([rgb_location(21.25 * math.pi + 0.01 * i)
+                                                  for i in range(n_locations)])
+        return lambda: locations.find_all_neighboring_delta_r(k=0.1, ub_delta=25 * math.pi)
+
+    return setup
+
+
+# name -> function that prepares the workload and returns the callable that is timed
+WORKLOADS: dict[str, Callable[[], Callable[[], object]]] = {
+    "single_pixel_optimizer_fit": single_pixel_optimizer_fit,
+    "analytic_inversion_512x512": analytic_inversion_512,
+    "rgb_location_solve_3_channels": rgb_location_solve_3_channels,
+    "neighbor_solve_N10": neighbor_solve(10),
+    "neighbor_solve_N50": neighbor_solve(50),
+}
+
+
+def time_workload(setup: Callable[[], Callable[[], object]], repeats: int) -> list[float]:
+    workload = setup()
+    timings = []
+    for repeat in range(repeats):
+        # The stochastic solvers draw from numpy's global generator: identical work in every run
+        np.random.seed(repeat)
+        start = time.perf_counter()
+        workload()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(names: list[str], repeats: int) -> dict:
+    results = {}
+    for name in names:
+        timings = time_workload(WORKLOADS[name], repeats)
+        results[name] = {"times": timings,
+                         "median": statistics.median(timings),
+                         "min": min(timings),
+                         "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0}
+        print(f"{name:<32}median {results[name]['median']:.4f} s  min {results[name]['min']:.4f} s")
+
+    return {"format_version": FORMAT_VERSION,
+            "package_version": _package_version(),
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()} {platform.processor()}",
+            "repeats": repeats,
+            "workloads": results}
+
+
+def _package_version() -> str:
+    try:
+        return importlib.metadata.version("characteristicParameters")
+    except importlib.metadata.PackageNotFoundError:
+        return "source"
+
+
+def load(path: str) -> dict:
+    with open(path) as handle:
+        data = json.load(handle)
+    if data.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {data.get('format_version')}, expected {FORMAT_VERSION}.")
+    return data
+
+
+def compare(baseline: dict, current: dict, threshold: float, alpha: float) -> list[str]:
+    """
+    Returns: names of the workloads that regressed
+
+    """
+    from scipy import stats
+
+    regressions = []
+    print(f"{'workload':<32}{'baseline [s]':>13}{'current [s]':>13}{'change':>9}{'p-value':>9}")
+    for (name, current_result) in current["workloads"].items():
+        if name not in baseline["workloads"]:
+            print(f"{name:<32}{'-':>13}{current_result['median']:>13.4f}   (new)")
+            continue
+        baseline_times = baseline["workloads"][name]["times"]
+        current_times = current_result["times"]
+        change = statistics.median(current_times) / statistics.median(baseline_times) - 1
+        p_value = stats.mannwhitneyu(current_times, baseline_times, alternative="greater").pvalue
+        regressed = change > threshold and p_value < alpha
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32}{statistics.median(baseline_times):>13.4f}{statistics.median(current_times):>13.4f}"
+              f"{100 * change:>8.1f}%{p_value:>9.3f}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="time the workloads and store the results")
+    compare_parser = subparsers.add_parser("compare", help="compare against a stored baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", help="stored run (default: time the workloads now)")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown of the median that is tolerated (default 0.10)")
+    compare_parser.add_argument("--alpha", type=float, default=0.05, help="significance level (default 0.05)")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("-o", "--output", help="store the timed results in this JSON file")
+        sub.add_argument("--repeats", type=int, default=7)
+        sub.add_argument("--only", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    args = parser.parse_args(argv)
+
+    if args.command == "compare" and args.current is not None:
+        current = load(args.current)
+    else:
+        current = run(args.only, args.repeats)
+        if args.output:
+            with open(args.output, "w") as handle:
+                json.dump(current, handle, indent=2)
+
+    if args.command == "run":
+        return 0
+    regressions = compare(load(args.baseline), current, threshold=args.threshold, alpha=args.alpha)
+    print(f"{len(regressions)} regression(s)" + (f": {', '.join(regressions)}" if regressions else ""))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
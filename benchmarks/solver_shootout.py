@@ -0,0 +1,194 @@
+"""
+Solver shootout: accuracy versus cost on synthetic ground truth.
+
+Random characteristic parameters are pushed through the Mueller forward model
+(muellerCalculus.optical_equivalent_model), Gaussian noise is added to the normalized Stokes parameters
+(and to the retardations for the RGB method), and every registered solver backend
+(solverBackends.available_backends, the differential evolution with several strategies) is run on the same samples
+through the solver_problem of the fitting classes, i.e. the code path the library uses.
+For each backend the error distribution, the number of function evaluations and the wall time are reported.
+
+Usage (with "src" in the PYTHONPATH):
+    python benchmarks/solver_shootout.py --samples 50 --noise 1e-3 --output shootout
+writes shootout.json (summary per solver) and shootout.csv (one row per sample and solver).
+"""
+import argparse
+import csv
+import json
+import math
+import statistics
+import time
+
+import numpy as np
+
+from characteristicParameters import solverBackends
+from characteristicParameters.analyticFormulas import char_paras_to_stokes, eff_diff_theta, eff_diff_omega, \
+    shift_theta_to_0_pi_2, shift_omega_to_0_pi
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+from characteristicParameters.rgbMethod import MeasuredRetardationsAtOneLocation, RetardationMeasurement, \
+    convert_retardation_to_different_wavelength, define_reduced_birefringence_function
+from characteristicParameters.triangle_wave_functions import T_pi
+
+PHIS = [0, math.pi / 4, math.pi / 8]
+DE_STRATEGIES = ["rand1exp", "rand2exp", "best1bin", "best1exp", "rand1bin", "currenttobest1bin"]
+WAVELENGTHS = [632.8, 546.1, 435.8]
+K_FUNCTION = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+UB_DELTA_R = 50 * math.pi
+# Variants (name -> backend options) of the backends that are run with several settings
+BACKEND_VARIANTS = {
+    "differential_evolution": {f"de_{strategy}": {"strategy": strategy} for strategy in DE_STRATEGIES},
+    "least_squares": {"least_squares_1_start": {"n_starts": 1}, "least_squares_8_starts": {"n_starts": 8}},
+}
+# Backends with random starts or populations, they get the seed of the run as the option "seed"
+SEEDED_BACKENDS = ("differential_evolution", "dual_annealing", "least_squares")
+
+
+def solver_variants() -> list[tuple[str, str, dict]]:
+    """
+    Returns: (name, backend, options) of every registered backend and its variants
+
+    """
+    return [(name, backend, options) for backend in solverBackends.available_backends()
+            for (name, options) in BACKEND_VARIANTS.get(backend, {backend: {}}).items()]
+
+
+def n_branches() -> int:
+    # The analytic backend of the RGB method evaluates E once at every branch of the reference wavelength
+    return 2 * (math.ceil(UB_DELTA_R / (2 * math.pi)) + 1)
+
+
+# ---------------------------------------------------------------- optimization procedure (section 2.2)
+
+def optimizer_samples(n_samples: int, noise: float, rng: np.random.Generator) -> list[dict]:
+    samples = []
+    for _ in range(n_samples):
+        delta, theta, omega = rng.uniform([0.05, 0, 0], [math.pi - 0.05, math.pi, math.pi])
+        measurements = []
+        for phi in PHIS:
+            stokes = char_paras_to_stokes(delta=delta, theta=theta, omega=omega,
+                                          stokes_in=linearly_polarized_light(phi))
+            stokes[1:] = np.asarray(stokes[1:]) + rng.normal(0, noise, 3)
+            measurements.append(MeasuredStokesVector(phi=phi, stokes_vector=stokes))
+        samples.append({"truth": (delta, theta, omega), "measurements": measurements})
+    return samples
+
+
+def optimizer_errors(truth, found) -> tuple[float, float, float]:
+    # Measurement ranges: delta in [0, pi], theta modulo pi/2, omega modulo pi (section 2.3 in the paper)
+    delta_error = found[0] - T_pi(truth[0])
+    theta_error = eff_diff_theta(theta_measured=shift_theta_to_0_pi_2(found[1]),
+                                 theta_expected=shift_theta_to_0_pi_2(truth[1]))
+    omega_error = eff_diff_omega(omega_measured=shift_omega_to_0_pi(found[2]),
+                                 omega_expected=shift_omega_to_0_pi(truth[2]))
+    return abs(delta_error), abs(theta_error), abs(omega_error)
+
+
+# ---------------------------------------------------------------- RGB method (section 2.6)
+
+def rgb_samples(n_samples: int, noise: float, rng: np.random.Generator) -> list[dict]:
+    samples = []
+    for _ in range(n_samples):
+        delta_r = rng.uniform(0, UB_DELTA_R)
+        deltas = [T_pi(convert_retardation_to_different_wavelength(
+            k_function=K_FUNCTION, wavelength_1=WAVELENGTHS[0], delta_1=delta_r, wavelength_2=wavelength))
+            + rng.normal(0, noise) for wavelength in WAVELENGTHS]
+        samples.append({"truth": delta_r, "deltas": deltas})
+    return samples
+
+
+def make_location(deltas: list[float]) -> MeasuredRetardationsAtOneLocation:
+    measurements = [RetardationMeasurement(wavelength=wavelength, delta=delta)
+                    for (wavelength, delta) in zip(WAVELENGTHS, deltas)]
+    return MeasuredRetardationsAtOneLocation(measurement_at_reference_wavelength=measurements[0],
+                                             additional_measurements=measurements[1:],
+                                             reduced_birefringence_function=K_FUNCTION)
+
+
+# ---------------------------------------------------------------- driver
+
+def summarize(rows: list[dict], error_keys: list[str], tolerance: float) -> dict:
+    summary = {"n_samples": len(rows),
+               "mean_evaluations": statistics.fmean(row["evaluations"] for row in rows),
+               "mean_time_s": statistics.fmean(row["time_s"] for row in rows)}
+    for key in error_keys:
+        errors = np.array([row[key] for row in rows])
+        summary[key] = {"median": float(np.median(errors)),
+                        "p95": float(np.percentile(errors, 95)),
+                        "max": float(np.max(errors))}
+    summary["success_rate"] = float(np.mean([all(row[key] <= tolerance for key in error_keys) for row in rows]))
+    return summary
+
+
+def run_shootout(n_samples: int, noise: float, seed: int, tolerance: float) -> tuple[dict, list[dict]]:
+    rng = np.random.default_rng(seed)
+    rows = []
+    summary = {"settings": {"samples": n_samples, "noise": noise, "seed": seed, "tolerance": tolerance},
+               "optimization_procedure": {}, "rgb_method": {}}
+
+    samples = optimizer_samples(n_samples, noise, rng)
+    for (name, backend, options) in solver_variants():
+        solver_rows = []
+        options = {**options, "seed": seed} if backend in SEEDED_BACKENDS else options
+        for (index, sample) in enumerate(samples):
+            procedure = OptimizationProcedure(sample["measurements"])
+            start = time.perf_counter()
+            result = solverBackends.solve(procedure.solver_problem(), backend=backend, **options)
+            found = procedure.convert_to_specified_ranges_array(result.x)
+            elapsed = time.perf_counter() - start
+            delta_error, theta_error, omega_error = optimizer_errors(sample["truth"], found)
+            solver_rows.append({"method": "optimization_procedure", "solver": name, "sample": index,
+                                "evaluations": result.n_evaluations, "time_s": elapsed,
+                                "delta_error": delta_error, "theta_error": theta_error,
+                                "omega_error": omega_error})
+        summary["optimization_procedure"][name] = summarize(solver_rows, ["delta_error", "theta_error",
+                                                                          "omega_error"], tolerance)
+        rows.extend(solver_rows)
+        print(f"optimization procedure {name:<28}{summary['optimization_procedure'][name]['success_rate']:>6.0%}")
+
+    samples = rgb_samples(n_samples, noise, rng)
+    for (name, backend, options) in solver_variants():
+        solver_rows = []
+        options = {**options, "seed": seed} if backend in SEEDED_BACKENDS else options
+        for (index, sample) in enumerate(samples):
+            location = make_location(sample["deltas"])
+            start = time.perf_counter()
+            result = solverBackends.solve(location.solver_problem(ub_delta=UB_DELTA_R), backend=backend, **options)
+            delta_r = float(result.x[0])
+            elapsed = time.perf_counter() - start
+            n_evaluations = n_branches() if backend == "analytic" else result.n_evaluations
+            solver_rows.append({"method": "rgb_method", "solver": name, "sample": index,
+                                "evaluations": n_evaluations, "time_s": elapsed,
+                                "delta_r_error": abs(delta_r - sample["truth"])})
+        summary["rgb_method"][name] = summarize(solver_rows, ["delta_r_error"], tolerance)
+        rows.extend(solver_rows)
+        print(f"rgb method             {name:<28}{summary['rgb_method'][name]['success_rate']:>6.0%}")
+
+    return summary, rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=1e-3, help="standard deviation of the measurement noise")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=math.radians(1),
+                        help="[rad] a sample counts as success if all its errors are below this value")
+    parser.add_argument("--output", default="solver_shootout", help="prefix of the .json and .csv files")
+    args = parser.parse_args(argv)
+
+    summary, rows = run_shootout(args.samples, args.noise, args.seed, args.tolerance)
+
+    with open(f"{args.output}.json", "w") as handle:
+        json.dump(summary, handle, indent=2)
+    fieldnames = ["method", "solver", "sample", "evaluations", "time_s",
+                  "delta_error", "theta_error", "omega_error", "delta_r_error"]
+    with open(f"{args.output}.csv", "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Results written to {args.output}.json and {args.output}.csv")
+
+
+if __name__ == "__main__":
+    main()
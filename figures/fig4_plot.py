@@ -1,14 +1,14 @@
 import math
-import os
-import pickle
 
 import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.ticker import MultipleLocator
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
-with open(os.path.join('fig4_mean_abs_errors.pickle'), 'rb') as handle:
-    std_errors = pickle.load(handle)
+from fig4_data import SETTINGS, axes, mean_abs_errors
+
+# Loaded from the computation cache (computed only if fig4_data.py has not been run with these settings)
+mean_abs_error = mean_abs_errors(**SETTINGS)
 
 rc = {"font.family": "serif",
       "mathtext.fontset": "stix"}
@@ -16,31 +16,12 @@ plt.rcParams.update(rc)
 plt.rcParams["font.serif"] = ["Times New Roman"] + plt.rcParams["font.serif"]
 
 
-Z1 = std_errors[0]
-Z2 = std_errors[1]
-Z3 = std_errors[2]
-
-Z1_deg = [[math.degrees(x) for x in y] for y in Z1]
-Z2_deg = [[math.degrees(x) for x in y] for y in Z2]
-Z3_deg = [[math.degrees(x) for x in y] for y in Z3]
-
-# Chose a fixed theta
-theta = math.radians(125)
-theta_expected = theta % math.pi/2
-
-# Error analyis
-# N times the corresponding characteristic parameters are calculated
-
-
-# Settings
-stepsize = math.radians(1)
+Z1_deg = np.degrees(mean_abs_error["delta"])
+Z2_deg = np.degrees(mean_abs_error["theta"])
+Z3_deg = np.degrees(mean_abs_error["omega"])
 
-# y-axis
-omegas = np.arange(0, math.pi + stepsize / 2, stepsize)
-Y = omegas
-# x-axis
-deltas = np.arange(0, 4 * math.pi + stepsize / 2, stepsize)
-X = deltas
+# y-axis, x-axis
+Y, X = axes(SETTINGS["stepsize"])
 
 fig, (ax1, ax2, ax3) = plt.subplots(3, 1, sharex=False, constrained_layout=True)
 
@@ -2,55 +2,35 @@ import math
 
 import matplotlib.pyplot as plt
 import numpy as np
-from characteristicParameters.rgbMethod import define_reduced_birefringence_function
 from characteristicParameters.triangle_wave_functions import T_pi
 
 import pi_axis_plotter
+from rgb_setup import DISPERSION, delta_b, delta_g, k_function, l_b, l_g, l_r, measured_retardation_sweep
 
 rc = {"font.family": "serif",
       "mathtext.fontset": "stix"}
 plt.rcParams.update(rc)
 plt.rcParams["font.serif"] = ["Times New Roman"] + plt.rcParams["font.serif"]
 
-# Define wavelengths
-l_r = 632.8
-l_g = 546.1
-l_b = 435.8
 
-k_dispersion = define_reduced_birefringence_function(lambda_0=632.8, a=25.5e3, b=3.25e9)
-
-
-# Express delta_g as function of delta_r see Eq. (25)
-def delta_A_g(delta_A_r: float) -> float:
-    return l_r / l_g * k_dispersion(l_g) / k_dispersion(l_r) * delta_A_r
-
-
-print(f"delta_g = {round(l_r / l_g * k_dispersion(l_g) / k_dispersion(l_r), ndigits=4)} x delta_r")
+print(f"delta_g = {round(l_r / l_g * k_function(l_g) / k_function(l_r), ndigits=4)} x delta_r")
+print(f"delta_b = {round(l_r / l_b * k_function(l_b) / k_function(l_r), ndigits=4)} x delta_r")
 
+d = 20 * math.pi
+print(f"{round(T_pi(d), ndigits=2)}")
+print(f"{round(T_pi(delta_g(d)), ndigits=2)}")
+print(f"{round(T_pi(delta_b(d)), ndigits=2)}")
 
-def delta_A_b(delta_A_r: float) -> float:
-    return l_r / l_b * k_dispersion(l_b) / k_dispersion(l_r) * delta_A_r
+sweep_1, sweep_2, sweep_3 = [measured_retardation_sweep(start=start * np.pi, stop=(start + 10) * np.pi, step=0.001,
+                                                        **DISPERSION) for start in (0, 10, 20)]
+delta_A_r_1 = sweep_1["delta_r"]
+delta_R_r_1, delta_R_g_1, delta_R_b_1 = sweep_1["deltas_tilde"]
 
+delta_A_r_2 = sweep_2["delta_r"]
+delta_R_r_2, delta_R_g_2, delta_R_b_2 = sweep_2["deltas_tilde"]
 
-print(f"delta_b = {round(l_r / l_b * k_dispersion(l_b) / k_dispersion(l_r), ndigits=4)} x delta_r")
-delta_A_r_1 = np.arange(0 * np.pi, 10 * np.pi, 0.001)
-delta_R_r_1 = np.array([T_pi(d) for d in delta_A_r_1])
-delta_R_g_1 = np.array([T_pi(delta_A_g(d)) for d in delta_A_r_1])
-delta_R_b_1 = np.array([T_pi(delta_A_b(d)) for d in delta_A_r_1])
-d = 20 * math.pi
-print(f"{round(T_pi(d), ndigits=2)}")
-print(f"{round(T_pi(delta_A_g(d)), ndigits=2)}")
-print(f"{round(T_pi(delta_A_b(d)), ndigits=2)}")
-
-delta_A_r_2 = np.arange(10 * np.pi, 20 * np.pi, 0.001)
-delta_R_r_2 = np.array([T_pi(d) for d in delta_A_r_2])
-delta_R_g_2 = np.array([T_pi(delta_A_g(d)) for d in delta_A_r_2])
-delta_R_b_2 = np.array([T_pi(delta_A_b(d)) for d in delta_A_r_2])
-
-delta_A_r_3 = np.arange(20 * np.pi, 30 * np.pi, 0.001)
-delta_R_r_3 = np.array([T_pi(d) for d in delta_A_r_3])
-delta_R_g_3 = np.array([T_pi(delta_A_g(d)) for d in delta_A_r_3])
-delta_R_b_3 = np.array([T_pi(delta_A_b(d)) for d in delta_A_r_3])
+delta_A_r_3 = sweep_3["delta_r"]
+delta_R_r_3, delta_R_g_3, delta_R_b_3 = sweep_3["deltas_tilde"]
 
 fig, (ax1, ax2, ax3) = plt.subplots(3, 1, sharex=False, figsize=(6, 3))
 
@@ -4,35 +4,14 @@ import matplotlib.pyplot as plt
 from characteristicParameters import rgbMethod
 from characteristicParameters.triangle_wave_functions import T_pi
 
+from rgb_setup import DISPERSION, delta_b, delta_g, find_neighboring_delta_rs, k_function, l_b, l_g, l_r, \
+    make_location
+
 rc = {"font.family": "serif",
       "mathtext.fontset": "stix"}
 plt.rcParams.update(rc)
 plt.rcParams["font.serif"] = ["Times New Roman"] + plt.rcParams["font.serif"]
 
-# Define the wavelengths:
-l_r = 632.8
-l_g = 546.1
-l_b = 435.8
-
-# Eq. (4) in the Paper
-k_function = rgbMethod.define_reduced_birefringence_function(lambda_0=632.8, a=25.5e3, b=3.25e9)
-
-
-#
-def delta_g(delta_r: float) -> float:
-    return rgbMethod.convert_retardation_to_different_wavelength(k_function=k_function,
-                                                                 wavelength_1=l_r,
-                                                                 delta_1=delta_r,
-                                                                 wavelength_2=l_g)
-
-
-def delta_b(delta_r: float) -> float:
-    return rgbMethod.convert_retardation_to_different_wavelength(k_function=k_function,
-                                                                 wavelength_1=l_r,
-                                                                 delta_1=delta_r,
-                                                                 wavelength_2=l_b)
-
-
 # Plot the approximate relation
 print(f"delta_g = {round(l_r / l_g * k_function(l_g) / k_function(l_r), ndigits=2)} x delta_r")
 print(f"delta_g = {round(l_r / l_b * k_function(l_b) / k_function(l_r), ndigits=2)} x delta_r")
@@ -59,17 +38,10 @@ print(f"delta_r = {delta_r_2_tilde}")
 print(f"delta_g = {delta_g_2_tilde}")
 print(f"delta_b = {delta_b_2_tilde}")
 
-measurement1 = rgbMethod.MeasuredRetardationsAtOneLocation(
-    measurement_at_reference_wavelength=rgbMethod.RetardationMeasurement(wavelength=l_r, delta=delta_r_1_tilde),
-    additional_measurements=[rgbMethod.RetardationMeasurement(wavelength=l_g, delta=delta_g_1_tilde),
-                             rgbMethod.RetardationMeasurement(wavelength=l_b, delta=delta_b_1_tilde)],
-    reduced_birefringence_function=k_function)
-
-measurement2 = rgbMethod.MeasuredRetardationsAtOneLocation(
-    measurement_at_reference_wavelength=rgbMethod.RetardationMeasurement(wavelength=l_r, delta=delta_r_2_tilde),
-    additional_measurements=[rgbMethod.RetardationMeasurement(wavelength=l_g, delta=delta_g_2_tilde),
-                             rgbMethod.RetardationMeasurement(wavelength=l_b, delta=delta_b_2_tilde)],
-    reduced_birefringence_function=k_function)
+deltas_tilde = [[delta_r_1_tilde, delta_g_1_tilde, delta_b_1_tilde],
+                [delta_r_2_tilde, delta_g_2_tilde, delta_b_2_tilde]]
+measurement1 = make_location(deltas_tilde[0])
+measurement2 = make_location(deltas_tilde[1])
 
 multi_locations = rgbMethod.MultipleNeighboringLocations(neighboring_locations=[measurement1, measurement2])
 
@@ -87,13 +59,12 @@ def E2(delta: float):
 k_value = 0.1
 
 
-def L(deltas: list[float, float]):
+def L(deltas: list[float]):
     return multi_locations.collective_error_function_L(delta_rs=deltas, k=k_value)
 
 
-deltas_found = multi_locations.find_all_neighboring_delta_r(k=k_value,
-                                                            lb_delta=0,
-                                                            ub_delta=25 * math.pi,
-                                                            strategy="rand2exp")
+# Stored in the computation cache, the differential evolution only runs once
+deltas_found = find_neighboring_delta_rs(deltas_tilde=deltas_tilde, k_value=k_value, ub_delta=25 * math.pi,
+                                         strategy="rand2exp", seed=0)
 
 print(f"delta_r1 = {deltas_found[0] / math.pi}, delta_r2 = {deltas_found[1] / math.pi}")
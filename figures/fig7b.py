@@ -1,15 +1,16 @@
 import numpy as np
 
 from fig6_fig7_data import *
+from rgb_setup import collective_error_map
 
 from figures import pi_axis_plotter
 
 dx = 0.01
 
-x = np.arange(20 * np.pi, 24 * np.pi + dx / 2, dx)
-y = np.arange(20 * np.pi, 24 * np.pi + dx / 2, dx)
-X, Y = np.meshgrid(x, y)
-Z = np.array([[L([xx, yy]) for xx in x] for yy in y])
+error_map = collective_error_map(deltas_tilde=deltas_tilde, k_value=k_value, start=20 * np.pi, stop=24 * np.pi,
+                                 step=dx, **DISPERSION)
+X, Y = np.meshgrid(error_map["delta_r"], error_map["delta_r"])
+Z = error_map["L"]
 
 print(L([deltas_found[0], deltas_found[1]]))
 
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+from characteristicParameters import rgbMethod
+from characteristicParameters.computationCache import cached
+from characteristicParameters.triangle_wave_functions import T_pi
+
+"""
+Setup shared by the figures of the RGB method (Figs. 5-7): wavelengths, reduced birefringence function
+and the cached computations that are plotted.
+"""
+
+# Define the wavelengths:
+l_r = 632.8
+l_g = 546.1
+l_b = 435.8
+a = 25.5e3
+b = 3.25e9
+# Arguments of the cached computations that describe the dispersion
+DISPERSION = dict(wavelengths=(l_r, l_g, l_b), a=a, b=b)
+
+# Eq. (4) in the Paper
+k_function = rgbMethod.define_reduced_birefringence_function(lambda_0=l_r, a=a, b=b)
+
+
+# Express delta_g and delta_b as function of delta_r, see Eq. (5)
+def delta_g(delta_r: float) -> float:
+    return rgbMethod.convert_retardation_to_different_wavelength(k_function=k_function,
+                                                                 wavelength_1=l_r,
+                                                                 delta_1=delta_r,
+                                                                 wavelength_2=l_g)
+
+
+def delta_b(delta_r: float) -> float:
+    return rgbMethod.convert_retardation_to_different_wavelength(k_function=k_function,
+                                                                 wavelength_1=l_r,
+                                                                 delta_1=delta_r,
+                                                                 wavelength_2=l_b)
+
+
+def make_location(deltas_tilde: list[float]) -> rgbMethod.MeasuredRetardationsAtOneLocation:
+    return rgbMethod.MeasuredRetardationsAtOneLocation(
+        measurement_at_reference_wavelength=rgbMethod.RetardationMeasurement(wavelength=l_r, delta=deltas_tilde[0]),
+        additional_measurements=[rgbMethod.RetardationMeasurement(wavelength=l_g, delta=deltas_tilde[1]),
+                                 rgbMethod.RetardationMeasurement(wavelength=l_b, delta=deltas_tilde[2])],
+        reduced_birefringence_function=k_function)
+
+
+@cached
+def measured_retardation_sweep(start: float, stop: float, step: float, wavelengths: tuple, a: float,
+                               b: float) -> dict:
+    """
+    Returns: delta_r and the measured retardations T_pi(delta) at every wavelength, (n_wavelengths, n)
+
+    """
+    k = rgbMethod.define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    delta_r = np.arange(start, stop, step)
+    factors = [wavelengths[0] / wavelength * k(wavelength) / k(wavelengths[0]) for wavelength in wavelengths]
+    return {"delta_r": delta_r, "deltas_tilde": np.array([T_pi(factor * delta_r) for factor in factors])}
+
+
+@cached
+def error_function_sweep(deltas_tilde: list[list[float]], start: float, stop: float, step: float,
+                         wavelengths: tuple, a: float, b: float) -> dict:
+    """
+    Returns: delta_r and the error function E (Eq. (27) in the paper) of every location, (n_locations, n)
+
+    """
+    k = rgbMethod.define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    locations = rgbMethod.MeasuredRetardationsAtManyLocations(wavelengths=wavelengths, deltas=np.array(deltas_tilde),
+                                                             reduced_birefringence_function=k)
+    delta_r = np.arange(start, stop, step)
+    return {"delta_r": delta_r, "E": locations.error_function_E(delta_r)}
+
+
+@cached
+def collective_error_map(deltas_tilde: list[list[float]], k_value: float, start: float, stop: float, step: float,
+                         wavelengths: tuple, a: float, b: float) -> dict:
+    """
+    Collective error function L (Eq. (32) in the paper) of two locations on a grid
+
+    Returns: delta_r axis and L, (n, n) with the first location along the columns
+
+    """
+    k = rgbMethod.define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    locations = rgbMethod.MeasuredRetardationsAtManyLocations(wavelengths=wavelengths, deltas=np.array(deltas_tilde),
+                                                             reduced_birefringence_function=k)
+    delta_r = np.arange(start, stop + step / 2, step)
+    E1, E2 = locations.error_function_E(delta_r)
+    # For two locations: sum over k * (delta_r - mean)^2 = k/2 * (delta_r1 - delta_r2)^2
+    L = E1[np.newaxis, :] + E2[:, np.newaxis] + k_value / 2 * (delta_r[np.newaxis, :] - delta_r[:, np.newaxis]) ** 2
+    return {"delta_r": delta_r, "L": L}
+
+
+@cached
+def find_neighboring_delta_rs(deltas_tilde: list[list[float]], k_value: float, ub_delta: float, strategy: str,
+                              seed: int) -> np.ndarray:
+    locations = rgbMethod.MultipleNeighboringLocations([make_location(deltas) for deltas in deltas_tilde])
+    return locations.find_all_neighboring_delta_r(k=k_value, lb_delta=0, ub_delta=ub_delta, strategy=strategy,
+                                                  backend_options={"seed": seed})
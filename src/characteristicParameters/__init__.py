@@ -1,5 +1,35 @@
-from . import _helpers
-from . import optimizationProcedure
-from . import muellerCalculus
-from . import rgbMethod
-from . import triangle_wave_functions
+import importlib
+
+# Submodules are imported on first attribute access (PEP 562), so that
+# "import characteristicParameters" stays cheap for code that only needs a few of them.
+__all__ = [
+    "_helpers",
+    "optimizationProcedure",
+    "muellerCalculus",
+    "rgbMethod",
+    "triangle_wave_functions",
+    "imageProcessing",
+    "asyncPipeline",
+    "sharedArrays",
+    "tileCheckpoint",
+    "floodFillUnwrapping",
+    "dispersionCalibration",
+    "solverBackends",
+    "lookupTable",
+    "computationCache",
+    "uncertaintyPropagation",
+    "fringeOrderTracking",
+    "muellerPolarimetry",
+    "jonesCalculus",
+    "batchedLevenbergMarquardt",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
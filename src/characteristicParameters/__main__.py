@@ -0,0 +1,3 @@
+from characteristicParameters.cli import main
+
+raise SystemExit(main())
@@ -2,8 +2,12 @@ import math
 
 import numpy as np
 
-from characteristicParameters._helpers import CodingError
-from characteristicParameters.muellerCalculus import optical_equivalent_model
+from characteristicParameters import jonesCalculus
+from characteristicParameters._helpers import CodingError, InvalidInputError
+from characteristicParameters.muellerCalculus import optical_equivalent_model, optical_equivalent_model_stack
+
+# Forward models of char_paras_images_to_stokes
+FORWARD_MODELS = ("mueller", "jones")
 
 
 def eff_diff_with_shift(measured, true, shift):
@@ -66,10 +70,60 @@ def char_paras_to_stokes(
 
     Returns: [S0, S1, S2, S3]
 
+    """
+    return list(char_paras_to_stokes_array(delta=delta, theta=theta, omega=omega, stokes_in=stokes_in))
+
+
+def char_paras_to_stokes_array(delta: float, theta: float, omega: float, stokes_in,
+                               out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Array version of char_paras_to_stokes
+
+    Args:
+        delta: [rad]
+        theta: [rad]
+        omega: [rad]
+        stokes_in: [S0, S1, S2, S3]
+        out: (4,) array the result is written to
+
+    Returns: (4,) [S0, S1, S2, S3] (out if given)
+
     """
     oem = optical_equivalent_model(delta=delta, theta=theta, omega=omega)
-    stokes_in = np.asarray(stokes_in)
-    return list(np.matmul(oem, stokes_in))
+    return np.matmul(oem, np.asarray(stokes_in, dtype=float), out=out)
+
+
+def char_paras_images_to_stokes(
+        delta: np.ndarray, theta: np.ndarray, omega: np.ndarray, stokes_in, forward_model: str = "mueller",
+        out: np.ndarray | None = None, dtype=np.float64
+) -> np.ndarray:
+    """
+    Vectorized version of char_paras_to_stokes for whole images (or any stack of pixels)
+
+    Args:
+        delta: [rad] any shape
+        theta: [rad] same shape as delta
+        omega: [rad] same shape as delta
+        stokes_in: [S0, S1, S2, S3] incident on every pixel
+        forward_model: "mueller" (4x4 Mueller matrices) or "jones" (2x2 Jones matrices, about 2-3 times faster,
+                       requires fully polarized incident light, see jonesCalculus)
+        out: (4, ...) array the result is written to
+        dtype: dtype of the computation and of the result (float32: see the accuracy budget in the README)
+
+    Returns: (4, ...) [S0, S1, S2, S3] of every pixel (out if given)
+
+    """
+    if forward_model == "jones":
+        return jonesCalculus.char_paras_images_to_stokes(delta=delta, theta=theta, omega=omega, stokes_in=stokes_in,
+                                                         out=out, dtype=dtype)
+    if forward_model != "mueller":
+        raise InvalidInputError(f"Unknown forward model {forward_model!r}, choose one of {FORWARD_MODELS}.")
+    oem = optical_equivalent_model_stack(delta=delta, theta=theta, omega=omega, dtype=dtype)
+    stokes_out = np.moveaxis(np.matmul(oem, np.asarray(stokes_in, dtype=dtype)), -1, 0)
+    if out is None:
+        return stokes_out
+    np.copyto(out, stokes_out)
+    return out
 
 
 def stokes_to_char_paras_phi_0_and_45(
@@ -112,4 +166,50 @@ def stokes_to_char_paras_phi_0_and_45(
     theta = 0.25 * math.atan2(Sigma_2*Sigma_3-Sigma_1*Sigma_4, Sigma_1*Sigma_3+Sigma_2*Sigma_4)
 
 
-    return delta, theta, omega
\ No newline at end of file
+    return delta, theta, omega
+
+
+def stokes_images_to_char_paras_phi_0_and_45(
+        stokes_0_deg: np.ndarray,
+        stokes_45_deg: np.ndarray,
+        out: np.ndarray | None = None,
+        dtype=np.float64
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized version of stokes_to_char_paras_phi_0_and_45 for whole images (or any stack of pixels).
+
+    Args:
+        stokes_0_deg: measured at phi=0°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+        stokes_45_deg: measured at phi=45°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+        out: (3, ...) array delta, theta and omega are written to
+        dtype: dtype of the computation and of the result (float32: see the accuracy budget in the README)
+
+    Returns: delta [0-pi], theta [0-pi/4], omega [0-pi], each with the shape of one Stokes parameter
+             (views of out if given)
+
+    """
+    stokes_0_deg = np.asarray(stokes_0_deg, dtype=dtype)
+    stokes_45_deg = np.asarray(stokes_45_deg, dtype=dtype)
+
+    S1_0 = stokes_0_deg[1] / stokes_0_deg[0]
+    S2_0 = stokes_0_deg[2] / stokes_0_deg[0]
+
+    S1_45 = stokes_45_deg[1] / stokes_45_deg[0]
+    S2_45 = stokes_45_deg[2] / stokes_45_deg[0]
+
+    Sigma_1 = S1_0 + S2_45
+    Sigma_2 = -S1_45 + S2_0
+    Sigma_3 = S1_0 - S2_45
+    Sigma_4 = -S1_45 - S2_0
+
+    out = np.empty((3,) + np.shape(Sigma_1), dtype=dtype) if out is None else out
+    delta, theta, omega = out
+
+    # Measurement errors can lead to cos_delta>1 or cos_delta<-1
+    cos_delta = np.clip(0.25*(Sigma_1**2 + Sigma_2**2 - Sigma_3**2 - Sigma_4**2), -1, 1)
+
+    np.arccos(cos_delta, out=delta)
+    np.multiply(0.5, np.arctan2(Sigma_2, Sigma_1), out=omega)
+    np.multiply(0.25, np.arctan2(Sigma_2*Sigma_3-Sigma_1*Sigma_4, Sigma_1*Sigma_3+Sigma_2*Sigma_4), out=theta)
+
+    return delta, theta, omega
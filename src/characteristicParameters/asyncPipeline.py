@@ -0,0 +1,142 @@
+import asyncio
+import collections
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, TypeVar
+
+import numpy as np
+
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+
+"""
+Asyncio interface for acquisition software: frames are awaited from an asynchronous source
+and the (blocking) inversion runs in an executor, so the event loop is never stalled and the
+acquisition of the next frame overlaps with the computation of the previous ones.
+"""
+
+Result = TypeVar("Result")
+
+
+@dataclass
+class Frame:
+    """
+    Attributes:
+        index: running number of the frame
+        timestamp: [s] time.perf_counter() when the frame was acquired
+        stokes: (n_phi, 4, height, width) Stokes stack (see imageProcessing)
+    """
+    index: int
+    timestamp: float
+    stokes: np.ndarray
+
+
+class SimulatedCamera:
+    """
+    In-process asynchronous frame source built on the forward model char_paras_images_to_stokes.
+    It can be used to load-test a pipeline without hardware.
+    Iterating over it ("async for frame in camera") yields n_frames instances of Frame.
+    """
+
+    def __init__(self,
+                 delta: np.ndarray,
+                 theta: np.ndarray,
+                 omega: np.ndarray,
+                 phis: list[float],
+                 n_frames: int,
+                 frame_interval: float = 0.0,
+                 noise_std: float = 0.0,
+                 delta_rate: float = 0.0,
+                 seed: int | None = None,
+                 forward_model: str = "mueller"):
+        """
+
+        Args:
+            delta: [rad] (height, width) characteristic parameters of the simulated specimen
+            theta: [rad] (height, width)
+            omega: [rad] (height, width)
+            phis: [rad] orientations of the incident linearly polarized light of every frame
+            n_frames: number of frames until the source is exhausted
+            frame_interval: [s] acquisition time per frame (awaited with asyncio.sleep)
+            noise_std: standard deviation of the Gaussian noise added to S1, S2 and S3
+            delta_rate: [rad] increase of delta per frame (simulates loading of the specimen)
+            seed: seed of the noise generator
+            forward_model: "mueller" or "jones" (see char_paras_images_to_stokes)
+        """
+        self.delta = np.asarray(delta, dtype=float)
+        self.theta = np.asarray(theta, dtype=float)
+        self.omega = np.asarray(omega, dtype=float)
+        self.phis = list(phis)
+        self.n_frames = n_frames
+        self.frame_interval = frame_interval
+        self.noise_std = noise_std
+        self.delta_rate = delta_rate
+        self.forward_model = forward_model
+        self._rng = np.random.default_rng(seed)
+        self._index = 0
+
+    def __str__(self):
+        return (f"{self.__class__.__name__}: {self.n_frames} frames of {self.delta.shape} pixels, "
+                f"{len(self.phis)} angles")
+
+    def render(self, index: int) -> np.ndarray:
+        """
+        Returns: (n_phi, 4, height, width) Stokes stack of frame "index"
+
+        """
+        delta = self.delta + index * self.delta_rate
+        stokes = np.stack([char_paras_images_to_stokes(delta=delta, theta=self.theta, omega=self.omega,
+                                                       stokes_in=linearly_polarized_light(phi),
+                                                       forward_model=self.forward_model)
+                           for phi in self.phis])
+        if self.noise_std > 0:
+            stokes[:, 1:] += self._rng.normal(0, self.noise_std, stokes[:, 1:].shape)
+        return stokes
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Frame:
+        if self._index >= self.n_frames:
+            raise StopAsyncIteration
+        index = self._index
+        self._index += 1
+        await asyncio.sleep(self.frame_interval)
+        timestamp = time.perf_counter()
+        # The forward model is rendered in a thread, so it does not stall the inversions awaited in the event loop
+        stokes = await asyncio.to_thread(self.render, index)
+        return Frame(index=index, timestamp=timestamp, stokes=stokes)
+
+
+async def process_frames(source: AsyncIterator[Frame],
+                         invert: Callable[[np.ndarray], Result],
+                         executor: Executor | None = None,
+                         max_pending: int = 2) -> AsyncIterator[tuple[Frame, Result]]:
+    """
+    Inverts every frame of an asynchronous source in an executor.
+    Up to max_pending inversions run while further frames are being acquired; results are yielded in frame order.
+
+    Args:
+        source: asynchronous iterator of frames (e.g. SimulatedCamera)
+        invert: blocking function applied to frame.stokes, e.g.
+                functools.partial(imageProcessing.analytic_image, phis=phis).
+                Must be picklable if a ProcessPoolExecutor is used.
+        executor: thread or process pool (None uses the default executor of the event loop)
+        max_pending: number of inversions that may still run while the next frame is acquired (bounds the memory use)
+
+    Yields: (frame, result of invert)
+
+    """
+    loop = asyncio.get_running_loop()
+    pending: collections.deque[tuple[Frame, asyncio.Future]] = collections.deque()
+
+    async for frame in source:
+        pending.append((frame, loop.run_in_executor(executor, invert, frame.stokes)))
+        while len(pending) > max_pending:
+            finished_frame, future = pending.popleft()
+            yield finished_frame, await future
+
+    while pending:
+        finished_frame, future = pending.popleft()
+        yield finished_frame, await future
@@ -0,0 +1,241 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from characteristicParameters import _helpers
+from characteristicParameters.triangle_wave_functions import T_pi_array
+
+"""
+Lock-step Levenberg-Marquardt fit of Eqs. (8) and (9) in the paper for many pixels at once.
+
+Calling a scipy solver once per pixel leaves the Python overhead of every call dominating the run time of large
+images. Here, all pixels iterate together as NumPy arrays: every iteration evaluates the residual vectors r
+(Eq. (12) in the paper) and their Jacobians J of all active pixels and solves the per-pixel 3x3 normal equations
+    (J^T J + damping * diag(J^T J)) step = -J^T r
+in closed form (adjugate of the symmetric matrix, no LAPACK call per pixel). Every pixel has its own damping,
+which decreases after an accepted step and increases after a rejected one. Converged pixels are retired from the
+active set, so the cost of an iteration shrinks with the number of pixels still iterating.
+
+The fit is local: it needs starting points (e.g. the analytic solution or LookupTable.nearest_batch), several per
+pixel can be given and the best result is kept. The parameters are unbounded during the iterations and are mapped
+to the measurement ranges of section 2.3 afterwards (delta [0-pi], theta [0-pi/2), omega [0-pi)).
+"""
+
+# Factors applied to the damping of a pixel after an accepted and after a rejected step
+DAMPING_DECREASE = 1 / 3
+DAMPING_INCREASE = 4
+# Pixels whose damping exceeds this value cannot decrease their residual any more and are retired
+MAX_DAMPING = 1e10
+
+
+@dataclass
+class BatchedFitResult:
+    """
+    Attributes:
+        delta: [rad] (n_pixels,) in the range 0-pi
+        theta: [rad] (n_pixels,) in the range 0-pi/2
+        omega: [rad] (n_pixels,) in the range 0-pi
+        residual: (n_pixels,) residual function R (Eq. (13) in the paper) of the result
+        converged: (n_pixels,) True where the best start met a convergence criterion (False: stalled or
+                   max_iterations reached)
+        n_iterations: number of lock-step iterations until the active set was empty (or max_iterations)
+    """
+    delta: np.ndarray
+    theta: np.ndarray
+    omega: np.ndarray
+    residual: np.ndarray
+    converged: np.ndarray
+    n_iterations: int
+
+
+def solve_symmetric_3x3(matrices: np.ndarray, right_hand_sides: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Closed-form solution of many symmetric 3x3 systems by the adjugate (Cramer's rule).
+
+    Args:
+        matrices: (..., 6) unique elements a00, a01, a02, a11, a12, a22 of every matrix
+        right_hand_sides: (..., 3)
+
+    Returns: (..., 3) solutions and (...,) determinants (the solutions are meaningless where they are not > 0)
+
+    """
+    a00, a01, a02, a11, a12, a22 = np.moveaxis(matrices, -1, 0)
+    b0, b1, b2 = np.moveaxis(right_hand_sides, -1, 0)
+    c00 = a11 * a22 - a12 * a12
+    c01 = a02 * a12 - a01 * a22
+    c02 = a01 * a12 - a02 * a11
+    c11 = a00 * a22 - a02 * a02
+    c12 = a01 * a02 - a00 * a12
+    c22 = a00 * a11 - a01 * a01
+    determinant = a00 * c00 + a01 * c01 + a02 * c02
+    with np.errstate(divide="ignore", invalid="ignore"):
+        solution = np.stack([c00 * b0 + c01 * b1 + c02 * b2,
+                             c01 * b0 + c11 * b1 + c12 * b2,
+                             c02 * b0 + c12 * b1 + c22 * b2], axis=-1) / determinant[..., np.newaxis]
+    return solution, determinant
+
+
+class BatchedLevenbergMarquardt:
+
+    def __init__(self, phis: list[float] | np.ndarray, S1: np.ndarray, S2: np.ndarray):
+        """
+
+        Args:
+            phis: [rad] (n_phi,) orientation of the incident light of each measurement
+            S1: (n_pixels, n_phi) measured normalized S1 of every pixel and phi
+            S2: (n_pixels, n_phi) measured normalized S2 of every pixel and phi
+        """
+        self.phis = np.asarray(phis, dtype=float)
+        self.S1 = np.atleast_2d(np.asarray(S1, dtype=float))
+        self.S2 = np.atleast_2d(np.asarray(S2, dtype=float))
+        if self.S1.shape != self.S2.shape or self.S1.shape[1:] != self.phis.shape:
+            raise _helpers.InvalidInputError(f"S1 and S2 must both have the shape (n_pixels, {self.phis.size}), "
+                                             f"got {self.S1.shape} and {self.S2.shape}.")
+
+    def __str__(self):
+        return f"Class {self.__class__.__name__}: {self.S1.shape[0]} pixels, phis {self.phis.tolist()}"
+
+    @classmethod
+    def from_stokes(cls, stokes: np.ndarray, phis: list[float] | np.ndarray) -> "BatchedLevenbergMarquardt":
+        """
+        Args:
+            stokes: (n_phi, n_stokes, ...) measured Stokes parameters, the pixels are flattened in C order
+            phis: [rad] orientation of the incident light of each measurement
+
+        """
+        stokes = np.asarray(stokes, dtype=float)
+        n_phi = stokes.shape[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            S1 = (stokes[:, 1] / stokes[:, 0]).reshape(n_phi, -1).T
+            S2 = (stokes[:, 2] / stokes[:, 0]).reshape(n_phi, -1).T
+        return cls(phis, S1, S2)
+
+    def residuals_and_jacobians(self, x: np.ndarray, pixels: np.ndarray | None = None
+                                ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Residual vectors r = measured - theory (Eq. (12) in the paper) and their Jacobians for many parameter sets
+
+        Args:
+            x: [rad] (n, 3) delta, theta, omega
+            pixels: (n,) pixel of every parameter set (default: parameter set i belongs to pixel i)
+
+        Returns: (n, n_phi, 2) residuals of S1, S2 and (n, n_phi, 2, 3) their derivatives with respect to x
+
+        """
+        S1 = self.S1 if pixels is None else self.S1[pixels]
+        S2 = self.S2 if pixels is None else self.S2[pixels]
+        delta, theta, omega = x[:, [0]], x[:, [1]], x[:, [2]]
+        A = 2 * (self.phis + omega)
+        B = A - 4 * theta
+        cos_A, sin_A, cos_B, sin_B = np.cos(A), np.sin(A), np.cos(B), np.sin(B)
+        cos_delta, sin_delta = np.cos(delta), np.sin(delta)
+        p, q = 1 + cos_delta, 1 - cos_delta
+
+        residuals = np.stack([S1 - 0.5 * (p * cos_A + q * cos_B),
+                              S2 - 0.5 * (p * sin_A - q * sin_B)], axis=-1)
+        # Derivatives of Eqs. (8) and (9) (see OptimizationProcedure.residual_jacobian), negated for r
+        jacobians = np.negative(np.stack([
+            np.stack([0.5 * sin_delta * (cos_B - cos_A), 2 * q * sin_B, -(sin_A * p + sin_B * q)], axis=-1),
+            np.stack([-0.5 * sin_delta * (sin_A + sin_B), 2 * q * cos_B, cos_A * p - cos_B * q], axis=-1)],
+            axis=-2))
+        return residuals, jacobians
+
+    def fit(self,
+            x0: np.ndarray,
+            max_iterations: int = 100,
+            initial_damping: float = 1e-3,
+            ftol: float = 1e-8,
+            xtol: float = 1e-8,
+            gtol: float = 1e-8) -> BatchedFitResult:
+        """
+        Iterates all pixels (and all their starts) in lock-step until every one of them is retired.
+        A start is retired when an accepted step decreases the squared residual sum by less than ftol (relative),
+        when an accepted step is shorter than xtol * (xtol + |x|), when the gradient J^T r is below gtol
+        (maximum norm) or when its damping exceeds MAX_DAMPING. The default tolerances are the ones of
+        scipy.optimize.least_squares.
+
+        Args:
+            x0: [rad] (n_pixels, 3) or (n_pixels, n_starts, 3) starting points delta, theta, omega
+            max_iterations: upper limit of the number of iterations
+            initial_damping: damping of every start in the first iteration
+            ftol: relative tolerance of the decrease of the squared residual sum
+            xtol: relative tolerance of the step length
+            gtol: absolute tolerance of the gradient
+
+        Returns: best result of every pixel
+
+        """
+        n_pixels = self.S1.shape[0]
+        x0 = np.asarray(x0, dtype=float)
+        if x0.ndim == 2:
+            x0 = x0[:, np.newaxis, :]
+        if x0.shape[0] != n_pixels or x0.shape[2:] != (3,):
+            raise _helpers.InvalidInputError(f"x0 must have the shape ({n_pixels}, 3) or ({n_pixels}, n_starts, 3),"
+                                             f" got {x0.shape}.")
+        n_starts = x0.shape[1]
+
+        # State of every start, the active ones are gathered into dense arrays every iteration
+        x = x0.reshape(-1, 3).copy()
+        pixels = np.repeat(np.arange(n_pixels), n_starts)
+        residuals, jacobians = self.residuals_and_jacobians(x, pixels)
+        costs = np.sum(residuals ** 2, axis=(1, 2))
+        converged = np.zeros(len(x), dtype=bool)
+
+        active = np.flatnonzero(np.isfinite(costs))
+        damping = np.full(len(active), float(initial_damping))
+        # Residuals and Jacobians of the active starts at their current x
+        residuals, jacobians = residuals[active], jacobians[active]
+
+        n_iterations = 0
+        while active.size and n_iterations < max_iterations:
+            n_iterations += 1
+            J = jacobians.reshape(len(active), -1, 3)
+            r = residuals.reshape(len(active), -1)
+            gradient = np.einsum("nki,nk->ni", J, r)
+            normal = np.matmul(J.transpose(0, 2, 1), J)[:, [0, 0, 0, 1, 1, 2], [0, 1, 2, 1, 2, 2]]
+
+            # Marquardt scaling of the diagonal (floored, so theta stays damped at delta=0 where it is undefined)
+            damped = normal.copy()
+            damped[:, [0, 3, 5]] += damping[:, np.newaxis] * np.maximum(normal[:, [0, 3, 5]], 1e-12)
+            step, determinant = solve_symmetric_3x3(damped, -gradient)
+            valid = (determinant > 0) & np.all(np.isfinite(step), axis=1)
+            step[~valid] = 0
+
+            trial = x[active] + step
+            trial_residuals, trial_jacobians = self.residuals_and_jacobians(trial, pixels[active])
+            trial_costs = np.sum(trial_residuals ** 2, axis=(1, 2))
+            costs_active = costs[active]
+            accepted = valid & (trial_costs < costs_active)
+
+            x[active[accepted]] = trial[accepted]
+            costs[active[accepted]] = trial_costs[accepted]
+            residuals[accepted] = trial_residuals[accepted]
+            jacobians[accepted] = trial_jacobians[accepted]
+            damping = np.where(accepted, damping * DAMPING_DECREASE, damping * DAMPING_INCREASE)
+
+            small_decrease = accepted & (costs_active - trial_costs <= ftol * costs_active)
+            short_step = accepted & (np.linalg.norm(step, axis=1) <= xtol * (xtol + np.linalg.norm(trial, axis=1)))
+            flat = np.max(np.abs(gradient), axis=1) <= gtol
+            done = small_decrease | short_step | flat
+            converged[active[done]] = True
+            retired = done | (damping > MAX_DAMPING)
+
+            keep = ~retired
+            active, damping = active[keep], damping[keep]
+            residuals, jacobians = residuals[keep], jacobians[keep]
+
+        # Best start of every pixel, NaN pixels (e.g. S0 == 0) stay NaN
+        costs = np.where(np.isnan(costs), np.inf, costs).reshape(n_pixels, n_starts)
+        best = np.argmin(costs, axis=1)
+        chosen = np.arange(n_pixels) * n_starts + best
+        x_best = x[chosen]
+        residual = np.sqrt(costs[np.arange(n_pixels), best])
+        invalid = ~np.isfinite(residual)
+        x_best[invalid] = np.nan
+        residual[invalid] = np.nan
+
+        # Eqs. (8) and (9) depend on cos(delta) only and are periodic in theta (pi/2) and omega (pi)
+        return BatchedFitResult(delta=T_pi_array(x_best[:, 0]), theta=x_best[:, 1] % (math.pi / 2),
+                                omega=x_best[:, 2] % math.pi, residual=residual, converged=converged[chosen],
+                                n_iterations=n_iterations)
@@ -0,0 +1,202 @@
+import argparse
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+from characteristicParameters import _helpers, imageProcessing, solverBackends
+
+"""
+Command-line batch processor: characteristicParameters INPUT [INPUT ...] --method {analytic,optimizer,hybrid,rgb}
+
+Every input is a .npy/.npz file or a directory containing such files.
+Stokes stacks (analytic, optimizer, hybrid) have the shape (n_phi, n_stokes, height, width),
+retardation stacks (rgb) have the shape (n_wavelengths, height, width).
+In .npz files the stack is stored under "stokes" or "retardations" (or is the only array),
+optional "phis" (in radians, unlike --phis-deg) or "wavelengths" arrays override the command-line values and an
+optional boolean "mask" array of shape (height, width) restricts the processing to its True pixels.
+"""
+
+METHODS = ("analytic", "optimizer", "hybrid", "batched", "rgb")
+STACK_KEYS = {"analytic": "stokes", "optimizer": "stokes", "hybrid": "stokes", "batched": "stokes",
+              "rgb": "retardations"}
+
+
+def _float_list(text: str) -> list[float]:
+    return [float(value) for value in text.split(",")]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="characteristicParameters",
+        description="Determines characteristic parameters for directories of Stokes or retardation stacks.")
+    parser.add_argument("inputs", nargs="+", type=Path,
+                        help=".npy/.npz files or directories containing them")
+    parser.add_argument("-m", "--method", choices=METHODS, default="analytic")
+    parser.add_argument("-o", "--output-dir", type=Path, default=None,
+                        help="directory of the results (default: next to each input file)")
+    parser.add_argument("--suffix", default="_char_paras",
+                        help="appended to the input file name to form the output file name")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="edge length of a tile in pixels (default: the default of the method)")
+    parser.add_argument("--dtype", choices=("float32", "float64"), default="float64",
+                        help="dtype of the stored results")
+    parser.add_argument("--compute-dtype", choices=("float32", "float64"), default="float64",
+                        help="dtype in which the analytic formulas are evaluated (analytic, hybrid)")
+    parser.add_argument("--precision", choices=imageProcessing.PRECISIONS, default="float64",
+                        help="mixed: float32 search of a start for every pixel and a float64 least-squares polish "
+                             "instead of the global search (optimizer, hybrid)")
+    parser.add_argument("--phis-deg", type=_float_list, default=[0.0, 45.0],
+                        help="[deg] comma separated orientations of the incident light, one per stack entry "
+                             "(a \"phis\" array in an .npz file overrides it and is given in radians)")
+    parser.add_argument("--wavelengths", type=_float_list, default=[632.8, 546.1, 435.8],
+                        help="comma separated wavelengths, one per stack entry, the first one is the reference")
+    parser.add_argument("--a", type=float, default=25.5e3, help="fitting parameter a of k(lambda)")
+    parser.add_argument("--b", type=float, default=3.25e9, help="fitting parameter b of k(lambda)")
+    parser.add_argument("--strategy", default=None, help="differential evolution strategy")
+    parser.add_argument("--backend", choices=solverBackends.available_backends(), default="differential_evolution",
+                        help="solver backend of the optimizer, hybrid and rgb methods")
+    parser.add_argument("--residual-threshold", type=float, default=1e-2,
+                        help="pixels whose analytic solution has a larger residual R are sent to the optimizer "
+                             "(hybrid)")
+    parser.add_argument("--checkpoint-dir", type=Path, default=None,
+                        help="persist completed tiles there (one sub-directory per input file); "
+                             "rerunning the same command resumes an interrupted job")
+    parser.add_argument("--pyramid-factor", type=int, default=1,
+                        help="unwrap a block-averaged image downsampled by this factor first and only search "
+                             "+-1 fringe order around its solution at full resolution (rgb, 1 disables it)")
+    parser.add_argument("--ub-delta", type=float, default=50.0,
+                        help="[pi rad] upper boundary of the retardation search (rgb)")
+    parser.add_argument("--auto-mask", action="store_true",
+                        help="only process pixels whose S0 and degree of polarisation pass the checks of "
+                             "--min-s0/--max-s0 (analytic, optimizer, hybrid)")
+    parser.add_argument("--min-s0", type=float, default=0.0,
+                        help="pixels with S0 at most this value in any measurement are skipped (--auto-mask)")
+    parser.add_argument("--max-s0", type=float, default=None,
+                        help="saturation level: pixels with S0 at least this value are skipped (--auto-mask)")
+    return parser
+
+
+def collect_input_files(inputs: list[Path], suffix: str | None = None) -> list[Path]:
+    """
+    Args:
+        inputs: files and directories
+        suffix: files in the directories whose name ends with this suffix (results of a previous run) are skipped
+
+    Returns: the .npy/.npz files, explicitly given files are always kept
+
+    """
+    files = []
+    for path in inputs:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix in (".npy", ".npz")
+                                and not (suffix and p.stem.endswith(suffix))))
+        else:
+            files.append(path)
+    return files
+
+
+def load_stack(path: Path, key: str) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Returns: (stack, remaining arrays of a .npz file)
+
+    """
+    if path.suffix == ".npy":
+        return np.load(path), {}
+
+    with np.load(path) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    if key in arrays:
+        return arrays.pop(key), arrays
+    if len(arrays) == 1:
+        return arrays.popitem()[1], {}
+    raise _helpers.InvalidInputError(f"{path} contains no array named '{key}'.")
+
+
+def process_file(path: Path, args: argparse.Namespace) -> tuple[Path, int]:
+    """
+    Returns: (path of the stored results, number of processed pixels)
+
+    """
+    stack, extras = load_stack(path, STACK_KEYS[args.method])
+    dtype = np.dtype(args.dtype)
+    checkpoint_dir = None if args.checkpoint_dir is None else args.checkpoint_dir / f"{path.stem}_{args.method}"
+    mask = extras.get("mask")
+    # Each method has its own default tile size (e.g. larger tiles for batched)
+    tiling = {} if args.tile_size is None else {"tile_size": args.tile_size}
+    if args.auto_mask and args.method != "rgb":
+        automatic = imageProcessing.automatic_mask(stack, min_s0=args.min_s0, max_s0=args.max_s0)
+        mask = automatic if mask is None else mask & automatic
+
+    if args.method == "rgb":
+        wavelengths = extras.get("wavelengths", args.wavelengths)
+        rgb_settings = dict(wavelengths=wavelengths, a=args.a, b=args.b, workers=args.workers, dtype=dtype,
+                            ub_delta=args.ub_delta * math.pi,
+                            strategy=args.strategy or "rand2exp", backend=args.backend,
+                            checkpoint_dir=checkpoint_dir, mask=mask, **tiling)
+        if args.pyramid_factor > 1:
+            delta_r = imageProcessing.rgb_image_pyramid(stack, factor=args.pyramid_factor, **rgb_settings)
+        else:
+            delta_r = imageProcessing.rgb_image(stack, **rgb_settings)
+        results = {"delta_r": delta_r}
+    else:
+        phis = extras.get("phis", [math.radians(phi) for phi in args.phis_deg])
+        if args.method == "analytic":
+            maps = imageProcessing.analytic_image(stack, phis=phis, dtype=dtype, mask=mask,
+                                                  compute_dtype=np.dtype(args.compute_dtype))
+        elif args.method == "hybrid":
+            hybrid = imageProcessing.hybrid_image(stack, phis=phis, residual_threshold=args.residual_threshold,
+                                                  workers=args.workers, dtype=dtype,
+                                                  strategy=args.strategy or "rand1exp", backend=args.backend,
+                                                  checkpoint_dir=checkpoint_dir, mask=mask,
+                                                  compute_dtype=np.dtype(args.compute_dtype),
+                                                  precision=args.precision, **tiling)
+            print(f"{path.name}: {hybrid.n_analytic} pixels analytic, {hybrid.n_optimizer} pixels optimizer")
+            maps = hybrid.maps
+        elif args.method == "batched":
+            maps = imageProcessing.batched_optimizer_image(stack, phis=phis, workers=args.workers, dtype=dtype,
+                                                           checkpoint_dir=checkpoint_dir, mask=mask, **tiling)
+        else:
+            maps = imageProcessing.optimizer_image(stack, phis=phis, workers=args.workers, dtype=dtype,
+                                                   strategy=args.strategy or "rand1exp", backend=args.backend,
+                                                   checkpoint_dir=checkpoint_dir, mask=mask,
+                                                   precision=args.precision, **tiling)
+        results = {"delta": maps.delta, "theta": maps.theta, "omega": maps.omega}
+
+    output_dir = args.output_dir if args.output_dir is not None else path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{path.stem}{args.suffix}.npz"
+    np.savez(output_path, **results)
+
+    height, width = stack.shape[-2:]
+    return output_path, height * width if mask is None else int(np.count_nonzero(mask))
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    files = collect_input_files(args.inputs, suffix=args.suffix)
+    if not files:
+        print("No .npy/.npz files found.")
+        return 1
+
+    total_pixels = 0
+    total_time = 0.0
+    for path in files:
+        start = time.perf_counter()
+        output_path, n_pixels = process_file(path, args)
+        elapsed = time.perf_counter() - start
+
+        total_pixels += n_pixels
+        total_time += elapsed
+        print(f"{path.name}: {n_pixels} pixels in {elapsed:.3f} s "
+              f"({n_pixels / elapsed:.1f} pixels/s) -> {output_path}")
+
+    print(f"Total ({args.method}): {len(files)} files, {total_pixels} pixels in {total_time:.3f} s "
+          f"({total_pixels / total_time:.1f} pixels/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+import functools
+import hashlib
+import importlib.metadata
+import inspect
+import os
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from characteristicParameters.lookupTable import default_cache_dir
+from characteristicParameters.tileCheckpoint import _atomic_write, fingerprint_array
+
+"""
+Content-addressed on-disk cache for expensive analysis computations (error maps, RGB sweeps, unwrapping results).
+
+A result is stored under a key derived from
+    1. the source code of the function,
+    2. its keyword arguments (arrays by content) and
+    3. the version of the package,
+so changing any of them recomputes the result, while re-plotting or changing the plot styling does not.
+Results (an array or a dict of arrays) are stored with np.savez_compressed. If the cache grows beyond
+max_bytes, the least recently used results are deleted.
+"""
+
+_SINGLE_RESULT = "__result__"
+
+
+def _package_version() -> str:
+    try:
+        return importlib.metadata.version("characteristicParameters")
+    except importlib.metadata.PackageNotFoundError:
+        return "source"
+
+
+def _describe(value) -> str:
+    if isinstance(value, np.ndarray):
+        return f"array:{fingerprint_array(value)}"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{', '.join(_describe(item) for item in value)}]"
+    if isinstance(value, dict):
+        return f"dict{{{', '.join(f'{key!r}: {_describe(value[key])}' for key in sorted(value))}}}"
+    return repr(value)
+
+
+class ComputationCache:
+
+    def __init__(self, directory: str | os.PathLike | None = None, max_bytes: int = 2 ** 30):
+        """
+
+        Args:
+            directory: cache directory (default: "computations" in lookupTable.default_cache_dir())
+            max_bytes: the least recently used results are deleted if the cache grows beyond this size
+        """
+        self.directory = Path(directory) if directory is not None else default_cache_dir() / "computations"
+        self.max_bytes = max_bytes
+
+    def __str__(self):
+        return f"{self.__class__.__name__}: {self.directory} ({self.size_bytes()} of {self.max_bytes} bytes)"
+
+    @staticmethod
+    def key(function: Callable, kwargs: dict) -> str:
+        try:
+            source = inspect.getsource(function)
+        except (OSError, TypeError):
+            source = f"{function.__module__}.{function.__qualname__}"
+        description = "\n".join([source, _describe(kwargs), _package_version()])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def get_or_compute(self, function: Callable[..., np.ndarray | dict[str, np.ndarray]], **kwargs):
+        """
+        Returns the stored result of function(**kwargs) or computes and stores it.
+
+        Args:
+            function: returns an array or a dict of arrays (only keyword arguments are supported)
+            **kwargs: arguments of the function
+
+        Returns: result of the function (dict values are returned as numpy arrays)
+
+        """
+        path = self._path(self.key(function, kwargs))
+        if path.exists():
+            with np.load(path) as archive:
+                arrays = {name: archive[name] for name in archive.files}
+            # The modification time records the last use (for the eviction)
+            os.utime(path)
+        else:
+            result = function(**kwargs)
+            arrays = result if isinstance(result, dict) else {_SINGLE_RESULT: result}
+            arrays = {name: np.asarray(value) for (name, value) in arrays.items()}
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _atomic_write(path, lambda handle: np.savez_compressed(handle, **arrays))
+            self._evict(keep=path)
+        return arrays[_SINGLE_RESULT] if list(arrays) == [_SINGLE_RESULT] else arrays
+
+    def _entries(self) -> list[Path]:
+        return sorted(self.directory.glob("*.npz"), key=lambda path: path.stat().st_mtime) \
+            if self.directory.exists() else []
+
+    def size_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self._entries())
+
+    def _evict(self, keep: Path) -> None:
+        entries = self._entries()
+        total = sum(path.stat().st_size for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                total -= path.stat().st_size
+                path.unlink()
+
+    def clear(self) -> None:
+        for path in self._entries():
+            path.unlink()
+
+
+def cached(function: Callable | None = None, *, cache: ComputationCache | None = None):
+    """
+    Decorator that routes all calls of a function through a ComputationCache:
+
+        @cached
+        def error_maps(stepsize: float) -> dict[str, np.ndarray]: ...
+
+    Args:
+        function: function returning an array or a dict of arrays, called with keyword arguments only
+        cache: cache to use (default: ComputationCache())
+
+    """
+    def decorator(wrapped: Callable) -> Callable:
+        @functools.wraps(wrapped)
+        def wrapper(**kwargs):
+            return (cache if cache is not None else ComputationCache()).get_or_compute(wrapped, **kwargs)
+
+        return wrapper
+
+    return decorator if function is None else decorator(function)
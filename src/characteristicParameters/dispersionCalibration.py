@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from characteristicParameters import _helpers
+from characteristicParameters.rgbMethod import define_reduced_birefringence_function
+
+"""
+Calibration of the fitting parameters a and b of the reduced birefringence function k(lambda)
+(Eq. (4) in the paper) from known retardations at several wavelengths.
+
+With Eq. (5), the measured ratio r = delta(lambda) * lambda / (delta(lambda_0) * lambda_0) equals k(lambda).
+Multiplying Eq. (4) by its denominator gives an equation that is linear in a and b:
+    a * (r / lambda_0^2 - 1 / lambda^2) + b * (r / lambda_0^4 - 1 / lambda^4) = 1 - r
+It is solved in the normalised unknowns alpha = a / lambda_0^2 and beta = b / lambda_0^4 (well conditioned for
+any length unit), so all samples are reduced to one 2x2 least-squares system.
+"""
+
+
+@dataclass
+class DispersionFit:
+    """
+    Attributes:
+        a: fitting parameter a
+        b: fitting parameter b
+        lambda_0: reference wavelength
+        rms_residual: root mean square of k_measured(lambda) - k_fitted(lambda) over all samples
+        n_samples: number of (location, wavelength) pairs used for the fit
+    """
+    a: float
+    b: float
+    lambda_0: float
+    rms_residual: float
+    n_samples: int
+
+    def reduced_birefringence_function(self) -> Callable[[float], float]:
+        return define_reduced_birefringence_function(lambda_0=self.lambda_0, a=self.a, b=self.b)
+
+
+def _measured_k(wavelengths: np.ndarray, retardations: np.ndarray, reference_index: int) -> np.ndarray:
+    # r = k(lambda) of every sample, see Eq. (5) in the paper
+    reference = retardations[:, [reference_index]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return retardations * wavelengths / (reference * wavelengths[reference_index])
+
+
+def fit_dispersion_parameters(wavelengths: list[float] | np.ndarray,
+                              retardations: np.ndarray,
+                              reference_index: int = 0,
+                              chunk_size: int = 1_000_000) -> DispersionFit:
+    """
+    Least-squares fit of a and b to known (unwrapped) retardations.
+
+    Args:
+        wavelengths: (n_wavelengths,) wavelengths at which the retardations were obtained
+        retardations: [rad] (..., n_wavelengths) absolute retardation of every location at every wavelength
+        reference_index: index of the reference wavelength lambda_0
+        chunk_size: number of locations processed at once (bounds the memory use)
+
+    Returns: fitted parameters and their residual
+
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    retardations = np.asarray(retardations, dtype=float).reshape(-1, wavelengths.size)
+    lambda_0 = wavelengths[reference_index]
+    others = np.arange(wavelengths.size) != reference_index
+    x2 = (lambda_0 / wavelengths[others]) ** 2
+    x4 = x2 ** 2
+
+    # Normal equations of the linear system in (alpha, beta)
+    gram = np.zeros((2, 2))
+    rhs = np.zeros(2)
+    n_samples = 0
+    for start in range(0, retardations.shape[0], chunk_size):
+        r = _measured_k(wavelengths, retardations[start:start + chunk_size], reference_index)[:, others]
+        valid = np.isfinite(r)
+        u = np.where(valid, r - x2, 0)
+        v = np.where(valid, r - x4, 0)
+        y = np.where(valid, 1 - r, 0)
+        gram += [[np.sum(u * u), np.sum(u * v)], [np.sum(u * v), np.sum(v * v)]]
+        rhs += [np.sum(u * y), np.sum(v * y)]
+        n_samples += int(np.count_nonzero(valid))
+
+    if n_samples < 2 or np.linalg.matrix_rank(gram) < 2:
+        raise _helpers.InvalidInputError("a and b cannot be determined: at least two independent samples at "
+                                         "wavelengths other than the reference wavelength are required.")
+
+    alpha, beta = np.linalg.solve(gram, rhs)
+    a = alpha * lambda_0 ** 2
+    b = beta * lambda_0 ** 4
+
+    k_function = define_reduced_birefringence_function(lambda_0=lambda_0, a=a, b=b)
+    k_fitted = k_function(wavelengths[others])
+    squared_sum = 0.0
+    for start in range(0, retardations.shape[0], chunk_size):
+        r = _measured_k(wavelengths, retardations[start:start + chunk_size], reference_index)[:, others]
+        squared_sum += float(np.nansum(np.where(np.isfinite(r), r - k_fitted, np.nan) ** 2))
+
+    return DispersionFit(a=float(a), b=float(b), lambda_0=float(lambda_0),
+                         rms_residual=float(np.sqrt(squared_sum / n_samples)), n_samples=n_samples)
@@ -0,0 +1,121 @@
+import heapq
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from characteristicParameters.imageProcessing import _validate_mask, _validate_stack
+from characteristicParameters.rgbMethod import (MeasuredRetardationsAtManyLocations, branch_candidates,
+                                                define_reduced_birefringence_function)
+
+"""
+Quality-guided unwrapping of the fringe order across a whole image (extension of section 2.6 in the paper).
+
+A measured retardation delta_r~ at the reference wavelength is compatible with the retardations
+delta_r = 2*pi*n +- delta_r~ (the branches of T_pi). Every pixel is evaluated at all branches within the
+search area with the error function E (Eq. (27) in the paper). Unwrapping starts at the most reliable pixel
+(lowest E) and spreads over the pixel grid in the order of reliability (priority queue). Each newly reached
+pixel takes the branch with the lowest E close to the retardation of the neighbor that reached it.
+Pixels without a finite E (NaN retardations) are never unwrapped and do not connect their neighbors: every
+region of valid pixels they separate is started from its own seed.
+"""
+
+
+@dataclass
+class UnwrappedImage:
+    """
+    Attributes:
+        delta_r: [rad] (height, width) retardation at the reference wavelength
+        error: (height, width) error function E of the chosen retardation
+        n_seeds: number of regions that were started from a new seed pixel
+    """
+    delta_r: np.ndarray
+    error: np.ndarray
+    n_seeds: int
+
+
+def quality_guided_unwrap(retardations: np.ndarray,
+                          wavelengths: list[float] | np.ndarray,
+                          a: float,
+                          b: float,
+                          lb_delta: float = 0,
+                          ub_delta: float = 50 * math.pi,
+                          fringe_window: float = 0.5,
+                          mask: np.ndarray | None = None) -> UnwrappedImage:
+    """
+    Unwraps the fringe order of a whole image in O(N log N).
+
+    Args:
+        retardations: [rad] (n_wavelengths, height, width), measured retardations in the range 0-pi
+        wavelengths: wavelength of each retardation image, the first one is the reference wavelength
+        a: fitting parameter a of the reduced birefringence function
+        b: fitting parameter b of the reduced birefringence function
+        lb_delta: lower boundary of the search area
+        ub_delta: upper boundary of the search area
+        fringe_window: [fringe orders, 2 pi each] a pixel only considers branches this close to the
+                       retardation of the neighbor it was reached from
+        mask: (height, width) pixels to unwrap, the others are treated like NaN pixels (None unwraps all pixels)
+
+    Returns: retardation and error maps
+
+    """
+    retardations = np.asarray(retardations, dtype=float)
+    _validate_stack(retardations, ndim=3, n_first=len(wavelengths), name="retardation")
+    n_wavelengths, height, width = retardations.shape
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+
+    locations = MeasuredRetardationsAtManyLocations(wavelengths=wavelengths,
+                                                    deltas=retardations.reshape(n_wavelengths, -1).T,
+                                                    reduced_birefringence_function=k_function)
+    candidates = branch_candidates(locations.deltas[:, 0], lb_delta=lb_delta, ub_delta=ub_delta)
+    errors = locations.error_function_E(np.nan_to_num(candidates))
+    errors[np.isnan(candidates)] = np.inf
+    quality = errors.min(axis=1)
+    valid = np.isfinite(quality)
+    if mask is not None:
+        valid &= _validate_mask(mask, (height, width)).ravel()
+    window = fringe_window * 2 * math.pi
+
+    delta_r = np.full(height * width, np.nan)
+    chosen_error = np.full(height * width, np.nan)
+    visited = np.zeros(height * width, dtype=bool)
+    seed_order = np.flatnonzero(valid)[np.argsort(quality[valid], kind="stable")]
+    n_seeds = 0
+
+    def assign(pixel: int, reference: float | None) -> None:
+        pixel_errors = errors[pixel]
+        if reference is not None:
+            pixel_errors = np.where(np.abs(candidates[pixel] - reference) <= window, pixel_errors, np.inf)
+            if np.all(np.isinf(pixel_errors)):
+                # No branch close enough: fall back to the nearest one
+                pixel_errors = np.where(np.isnan(candidates[pixel]), np.inf, np.abs(candidates[pixel] - reference))
+        best = int(np.argmin(pixel_errors))
+        delta_r[pixel] = candidates[pixel, best]
+        chosen_error[pixel] = errors[pixel, best]
+        visited[pixel] = True
+
+    def push_neighbors(heap: list, pixel: int) -> None:
+        row, col = divmod(pixel, width)
+        for (neighbor_row, neighbor_col) in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if 0 <= neighbor_row < height and 0 <= neighbor_col < width:
+                neighbor = neighbor_row * width + neighbor_col
+                if valid[neighbor] and not visited[neighbor]:
+                    heapq.heappush(heap, (quality[neighbor], neighbor, pixel))
+
+    for seed in seed_order:
+        if visited[seed]:
+            continue
+        n_seeds += 1
+        assign(seed, reference=None)
+        heap = []
+        push_neighbors(heap, seed)
+        while heap:
+            _, pixel, parent = heapq.heappop(heap)
+            if visited[pixel]:
+                continue
+            assign(pixel, reference=delta_r[parent])
+            push_neighbors(heap, pixel)
+
+    return UnwrappedImage(delta_r=delta_r.reshape(height, width),
+                          error=chosen_error.reshape(height, width),
+                          n_seeds=n_seeds)
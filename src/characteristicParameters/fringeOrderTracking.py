@@ -0,0 +1,161 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from characteristicParameters.imageProcessing import _validate_mask, _validate_stack
+from characteristicParameters.rgbMethod import (MeasuredRetardationsAtManyLocations, branch_candidates,
+                                                define_reduced_birefringence_function)
+
+"""
+Temporal tracking of the fringe order in RGB video sequences (extension of section 2.6 in the paper).
+
+Between two consecutive frames the retardation of a pixel changes by much less than one fringe order.
+The tracker therefore predicts delta_r of every pixel from the previous frames (linear extrapolation) and
+evaluates the error function E (Eq. (27) in the paper) only at the branches 2*pi*n +- delta_r~ closest to the
+prediction. Only pixels whose error exceeds a threshold (and all pixels of the first frame) are re-acquired
+with a scan over all branches of the search area.
+"""
+
+
+@dataclass
+class TrackedFrame:
+    """
+    Attributes:
+        delta_r: [rad] (height, width) retardation at the reference wavelength
+        error: (height, width) error function E of the chosen retardation
+        reacquired: (height, width) pixels that were solved with a scan over all branches
+        n_evaluations: number of evaluations of E (per pixel and candidate) for this frame
+    """
+    delta_r: np.ndarray
+    error: np.ndarray
+    reacquired: np.ndarray
+    n_evaluations: int
+
+
+class FringeOrderTracker:
+
+    def __init__(self,
+                 wavelengths: list[float] | np.ndarray,
+                 a: float,
+                 b: float,
+                 lb_delta: float = 0,
+                 ub_delta: float = 50 * math.pi,
+                 error_threshold: float = 0.1,
+                 n_candidates: int = 2,
+                 dtype=np.float64):
+        """
+
+        Args:
+            wavelengths: wavelength of each retardation image, the first one is the reference wavelength
+            a: fitting parameter a of the reduced birefringence function
+            b: fitting parameter b of the reduced birefringence function
+            lb_delta: lower boundary of the search area
+            ub_delta: upper boundary of the search area
+            error_threshold: pixels whose tracked solution has a larger error function E are re-acquired
+            n_candidates: number of branches closest to the prediction at which E is evaluated
+            dtype: dtype in which E is evaluated (see MeasuredRetardationsAtManyLocations)
+        """
+        self.wavelengths = [float(wavelength) for wavelength in wavelengths]
+        self.k_function = define_reduced_birefringence_function(lambda_0=self.wavelengths[0], a=a, b=b)
+        self.lb_delta = lb_delta
+        self.ub_delta = ub_delta
+        self.error_threshold = error_threshold
+        self.n_candidates = n_candidates
+        self.dtype = dtype
+        # Number of branches of the full scan (per pixel)
+        self._n_branches = branch_candidates(np.zeros(1), lb_delta=lb_delta, ub_delta=ub_delta).shape[1]
+        self.reset()
+
+    def __str__(self):
+        return (f"{self.__class__.__name__}: {self.n_frames} frames tracked, "
+                f"reference wavelength {self.wavelengths[0]}")
+
+    def reset(self) -> None:
+        """
+        Forgets all previous frames, the next frame is acquired from scratch
+        """
+        self._previous: np.ndarray | None = None
+        self._velocity: np.ndarray | None = None
+        self.n_frames = 0
+
+    def predict(self) -> np.ndarray | None:
+        """
+        Returns: [rad] (n_pixels,) predicted retardation of the next frame (None before the first frame)
+
+        """
+        if self._previous is None:
+            return None
+        return self._previous + self._velocity
+
+    def _nearest_candidates(self, measured: np.ndarray, prediction: np.ndarray) -> np.ndarray:
+        # The branches of the fringe orders around the prediction, the n_candidates closest ones are kept
+        orders = np.round(prediction / (2 * math.pi))[:, np.newaxis] + np.array([-1, 0, 1])
+        candidates = np.concatenate([2 * math.pi * orders - measured[:, np.newaxis],
+                                     2 * math.pi * orders + measured[:, np.newaxis]], axis=1)
+        candidates[(candidates < self.lb_delta) | (candidates > self.ub_delta)] = np.nan
+        distance = np.where(np.isnan(candidates), np.inf, np.abs(candidates - prediction[:, np.newaxis]))
+        closest = np.argsort(distance, axis=1)[:, :self.n_candidates]
+        return np.take_along_axis(candidates, closest, axis=1)
+
+    @staticmethod
+    def _best(locations: MeasuredRetardationsAtManyLocations,
+              candidates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        errors = locations.error_function_E(np.nan_to_num(candidates))
+        errors[np.isnan(candidates)] = np.inf
+        best = np.argmin(errors, axis=1)
+        rows = np.arange(candidates.shape[0])
+        return candidates[rows, best], errors[rows, best]
+
+    def update(self, retardations: np.ndarray, mask: np.ndarray | None = None) -> TrackedFrame:
+        """
+        Unwraps the next frame.
+
+        Args:
+            retardations: [rad] (n_wavelengths, height, width), measured retardations in the range 0-pi
+            mask: (height, width) pixels to track, the others are NaN and are re-acquired once they are selected
+                  again (None tracks all pixels)
+
+        Returns: retardation and error maps of the frame
+
+        """
+        retardations = np.asarray(retardations, dtype=float)
+        _validate_stack(retardations, ndim=3, n_first=len(self.wavelengths), name="retardation")
+        n_wavelengths, height, width = retardations.shape
+        n_pixels = height * width
+        selected = np.ones(n_pixels, dtype=bool) if mask is None else _validate_mask(mask, (height, width)).ravel()
+        deltas = retardations.reshape(n_wavelengths, -1).T
+        prediction = self.predict()
+        if prediction is not None and prediction.size != n_pixels:
+            prediction = None
+
+        n_evaluations = 0
+        delta_r = np.full(n_pixels, np.nan)
+        error = np.full(n_pixels, np.inf)
+        if prediction is not None:
+            locations = MeasuredRetardationsAtManyLocations(wavelengths=self.wavelengths, deltas=deltas[selected],
+                                                            reduced_birefringence_function=self.k_function,
+                                                            dtype=self.dtype)
+            candidates = self._nearest_candidates(locations.deltas[:, 0], prediction[selected])
+            delta_r[selected], error[selected] = self._best(locations, candidates)
+            n_evaluations += candidates.size
+
+        reacquired = selected & ~(error <= self.error_threshold)
+        if np.any(reacquired):
+            lost = MeasuredRetardationsAtManyLocations(wavelengths=self.wavelengths,
+                                                       deltas=deltas[reacquired],
+                                                       reduced_birefringence_function=self.k_function,
+                                                       dtype=self.dtype)
+            delta_r[reacquired], error[reacquired] = lost.find_delta_r(lb_delta=self.lb_delta, ub_delta=self.ub_delta)
+            n_evaluations += lost.deltas.shape[0] * self._n_branches
+        error[~selected] = np.nan
+
+        if prediction is None:
+            self._velocity = np.zeros(n_pixels)
+        else:
+            self._velocity = np.where(reacquired, 0, delta_r - self._previous)
+        self._previous = delta_r
+        self.n_frames += 1
+
+        return TrackedFrame(delta_r=delta_r.reshape(height, width), error=error.reshape(height, width),
+                            reacquired=reacquired.reshape(height, width), n_evaluations=n_evaluations)
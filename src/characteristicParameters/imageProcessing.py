@@ -0,0 +1,819 @@
+import functools
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from characteristicParameters import _helpers
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes, \
+    stokes_images_to_char_paras_phi_0_and_45
+from characteristicParameters.batchedLevenbergMarquardt import BatchedLevenbergMarquardt
+from characteristicParameters.lookupTable import DEFAULT_RESOLUTION, LookupTable
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+from characteristicParameters.rgbMethod import (MeasuredRetardationsAtOneLocation, MultipleNeighboringLocations,
+                                                RetardationMeasurement, define_reduced_birefringence_function)
+from characteristicParameters.sharedArrays import SharedArray, SharedArrayDescriptor
+from characteristicParameters.tileCheckpoint import TileCheckpoint, fingerprint_array
+
+"""
+Image-level drivers for the measurement techniques of the paper.
+
+Conventions:
+    Stokes stacks have the shape (n_phi, n_stokes, height, width), where n_stokes is 3 or 4 and the
+    i-th entry along the first axis was measured with incident light oriented at phis[i].
+    Retardation stacks have the shape (n_wavelengths, height, width), where the first entry
+    belongs to the reference wavelength (wavelengths[0]).
+    Masks have the shape (height, width) and are True at the pixels to process. The drivers compact the masked
+    pixels into a dense strip before the inversion, so no time is spent on background pixels, and return NaN
+    (and False or NaN in the additional outputs of hybrid_image) outside the mask.
+
+Precision:
+    The dtype arguments only set the dtype of the returned maps. compute_dtype=np.float32 evaluates the analytic
+    formulas in single precision (see the accuracy budget in the README), precision="mixed" replaces the global
+    search of the optimizer by a float32 search of the closest grid points followed by a float64 polish.
+"""
+
+# Precisions of optimizer_image
+PRECISIONS = ("float64", "mixed")
+# Grid resolution (delta, theta, omega) and number of starts of the float32 search of precision="mixed"
+MIXED_PRECISION_RESOLUTION = DEFAULT_RESOLUTION
+MIXED_PRECISION_STARTS = 4
+# Grid resolution (delta, theta, omega) of the starting points of batched_optimizer_image (coarser grids miss the
+# basin of the global minimum of a few pixels)
+BATCHED_RESOLUTION = (33, 32, 64)
+
+
+@dataclass
+class CharacteristicParameterMaps:
+    """
+    Characteristic parameters of every pixel of an image
+
+    Attributes:
+        delta: [rad] (height, width)
+        theta: [rad] (height, width)
+        omega: [rad] (height, width)
+
+    """
+    delta: np.ndarray
+    theta: np.ndarray
+    omega: np.ndarray
+
+
+def iter_tiles(shape: tuple[int, int], tile_size: int) -> list[tuple[slice, slice]]:
+    """
+    Splits an image into square tiles (the tiles at the right and bottom border may be smaller)
+
+    Args:
+        shape: (height, width) of the image
+        tile_size: edge length of a tile in pixels
+
+    Returns: list of (row slice, column slice), row by row
+
+    """
+    if tile_size < 1:
+        raise _helpers.InvalidInputError(f"The tile size must be at least 1, got {tile_size}.")
+
+    height, width = shape
+    return [(slice(row, min(row + tile_size, height)), slice(col, min(col + tile_size, width)))
+            for row in range(0, height, tile_size)
+            for col in range(0, width, tile_size)]
+
+
+def _index_of_phi(phis: list[float] | np.ndarray, phi: float) -> int:
+    for (index, phi_measured) in enumerate(phis):
+        if math.isclose(phi_measured, phi, abs_tol=1e-9):
+            return index
+    raise _helpers.InvalidInputError(f"The analytic method requires a measurement at phi={phi} rad.")
+
+
+# State of a worker process of _run_tiles (set once by _init_shared_worker)
+_worker_state: dict = {}
+
+
+def _init_shared_worker(solve: Callable[[np.ndarray], np.ndarray],
+                        image_descriptor: SharedArrayDescriptor,
+                        output_descriptor: SharedArrayDescriptor) -> None:
+    _worker_state["solve"] = solve
+    _worker_state["image"] = SharedArray.attach(image_descriptor)
+    _worker_state["output"] = SharedArray.attach(output_descriptor)
+
+
+def _solve_shared_tile(tile_index: int, row_start: int, row_stop: int, col_start: int, col_stop: int) -> int:
+    rows, cols = slice(row_start, row_stop), slice(col_start, col_stop)
+    image = _worker_state["image"].array
+    _worker_state["output"].array[:, rows, cols] = _worker_state["solve"](image[..., rows, cols])
+    return tile_index
+
+
+def _run_tiles(solve_tile: Callable[..., np.ndarray],
+               image: np.ndarray,
+               n_outputs: int,
+               tile_size: int,
+               workers: int,
+               dtype,
+               checkpoint_dir: str | os.PathLike | None = None,
+               job: dict | None = None,
+               **kwargs) -> np.ndarray:
+    """
+    Applies solve_tile to every tile of the image, optionally in several worker processes.
+    With several workers, the image and the results are placed in shared memory: the workers attach to it
+    once and afterwards only receive tile indices, so no pixel data is pickled or duplicated per worker.
+
+    Args:
+        solve_tile: module level function (picklable) mapping image[..., rows, cols] to (n_outputs, h, w)
+        image: array whose last two axes are (height, width)
+        n_outputs: number of values solve_tile returns per pixel
+        tile_size: edge length of a tile in pixels
+        workers: number of worker processes (1 solves all tiles in this process)
+        dtype: dtype of the returned array
+        checkpoint_dir: if given, every solved tile is persisted there and tiles solved by an earlier,
+                        interrupted run of the same job are loaded instead of solved again
+        job: JSON serializable description of the input the checkpoint is keyed on instead of the hash of image
+             (for images that contain data derived from the input)
+        **kwargs: passed on to solve_tile
+
+    Returns: (n_outputs, height, width)
+
+    """
+    height, width = image.shape[-2:]
+    output = np.empty((n_outputs, height, width), dtype=dtype)
+    tiles = iter_tiles((height, width), tile_size)
+    solve = functools.partial(solve_tile, **kwargs)
+
+    checkpoint = None
+    if checkpoint_dir is not None:
+        image_fingerprint = fingerprint_array(image) if job is None else job
+        checkpoint = TileCheckpoint(checkpoint_dir, fingerprint={"solver": solve_tile.__name__,
+                                                                 "image": image_fingerprint,
+                                                                 "tile_size": tile_size,
+                                                                 "n_outputs": n_outputs,
+                                                                 "dtype": np.dtype(dtype).name,
+                                                                 "settings": repr(sorted(kwargs.items()))})
+
+    pending = []
+    for (tile_index, (rows, cols)) in enumerate(tiles):
+        if checkpoint is not None and checkpoint.is_completed(tile_index):
+            output[:, rows, cols] = checkpoint.load(tile_index)
+        else:
+            pending.append(tile_index)
+
+    def store(tile_index: int, values: np.ndarray) -> None:
+        rows, cols = tiles[tile_index]
+        output[:, rows, cols] = values
+        if checkpoint is not None:
+            checkpoint.save(tile_index, output[:, rows, cols])
+
+    if workers <= 1:
+        for tile_index in pending:
+            rows, cols = tiles[tile_index]
+            store(tile_index, solve(image[..., rows, cols]))
+        return output
+
+    with SharedArray.from_array(image) as shared_image, SharedArray.create(output.shape, dtype) as shared_output:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shared_worker,
+                                 initargs=(solve, shared_image.descriptor, shared_output.descriptor)) as executor:
+            futures = [executor.submit(_solve_shared_tile, i, tiles[i][0].start, tiles[i][0].stop,
+                                       tiles[i][1].start, tiles[i][1].stop) for i in pending]
+            for future in as_completed(futures):
+                tile_index = future.result()
+                rows, cols = tiles[tile_index]
+                store(tile_index, shared_output.array[:, rows, cols])
+    return output
+
+
+@functools.lru_cache(maxsize=4)
+def _lookup_table(phis: tuple[float, ...], resolution: tuple[int, int, int]) -> LookupTable:
+    # Kept per process, so the grid (and its KD tree) is built once and not for every tile
+    return LookupTable.build(list(phis), resolution=resolution)
+
+
+def _mixed_precision_starts(stokes_tile: np.ndarray, phis: list[float],
+                            n_starts: int = MIXED_PRECISION_STARTS) -> np.ndarray:
+    # (height, width, n_starts, 3) closest grid points of every pixel, searched in float32
+    # (NaN for pixels whose normalized Stokes parameters are not finite, e.g. S0 == 0)
+    n_phi, _, height, width = stokes_tile.shape
+    stokes = stokes_tile[:, :3].astype(np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # (n_phi, 2, height, width) -> S1, S2 of every phi per pixel, in the order of the table features
+        features = (stokes[:, 1:] / stokes[:, [0]]).reshape(2 * n_phi, height * width).T
+    finite = np.all(np.isfinite(features), axis=1)
+    starts = np.full((height * width, n_starts, 3), np.nan)
+    table = _lookup_table(tuple(phis), MIXED_PRECISION_RESOLUTION)
+    starts[finite] = table.nearest_batch(features[finite], k=n_starts, dtype=np.float32)
+    return starts.reshape(height, width, n_starts, 3)
+
+
+def _solve_optimizer_tile(stokes_tile: np.ndarray, phis: list[float], strategy: str, backend: str,
+                          precision: str = "float64") -> np.ndarray:
+    _, _, height, width = stokes_tile.shape
+    result = np.empty((3, height, width))
+    starts = _mixed_precision_starts(stokes_tile, phis) if precision == "mixed" else None
+    for row in range(height):
+        for col in range(width):
+            if starts is not None and np.isnan(starts[row, col, 0, 0]):
+                # Nothing to polish (e.g. S0 == 0), the residuals are not finite
+                result[:, row, col] = np.nan
+                continue
+            measurements = [MeasuredStokesVector(phi=phi, stokes_vector=stokes_tile[i, :, row, col])
+                            for (i, phi) in enumerate(phis)]
+            procedure = OptimizationProcedure(measurements)
+            if starts is None:
+                procedure.find_characteristic_parameters_array(strategy=strategy, backend=backend,
+                                                               out=result[:, row, col])
+            else:
+                # theta and omega are periodic: the lower bounds are moved away from the grid points at 0, so the
+                # polish of a start at 0 can reach a minimum just below 0 (the result is wrapped back)
+                procedure.find_characteristic_parameters_array(lb_theta=-math.pi / 4, lb_omega=-math.pi / 2,
+                                                               backend="least_squares",
+                                                               backend_options={"x0": starts[row, col]},
+                                                               out=result[:, row, col])
+    return result
+
+
+def _solve_batched_tile(stokes_tile: np.ndarray, phis: list[float], n_starts: int, max_iterations: int
+                        ) -> np.ndarray:
+    _, _, height, width = stokes_tile.shape
+    solver = BatchedLevenbergMarquardt.from_stokes(stokes_tile, phis)
+    # S1, S2 of every phi per pixel, in the order of the table features (NaN pixels stay NaN in the fit)
+    features = np.nan_to_num(np.stack([solver.S1, solver.S2], axis=-1).reshape(height * width, -1))
+    table = _lookup_table(tuple(phis), BATCHED_RESOLUTION)
+    starts = table.nearest(features, k=n_starts).reshape(height * width, n_starts, 3)
+    fit = solver.fit(starts, max_iterations=max_iterations)
+    return np.stack([fit.delta, fit.theta, fit.omega]).reshape(3, height, width)
+
+
+def _location_at(retardation_tile: np.ndarray,
+                 row: int,
+                 col: int,
+                 wavelengths: list[float],
+                 k_function: Callable[[float], float]) -> MeasuredRetardationsAtOneLocation:
+    measurements = [RetardationMeasurement(wavelength=wavelength, delta=retardation_tile[i, row, col])
+                    for (i, wavelength) in enumerate(wavelengths)]
+    return MeasuredRetardationsAtOneLocation(measurement_at_reference_wavelength=measurements[0],
+                                             additional_measurements=measurements[1:],
+                                             reduced_birefringence_function=k_function)
+
+
+def _solve_rgb_tile(retardation_tile: np.ndarray,
+                    wavelengths: list[float],
+                    a: float,
+                    b: float,
+                    lb_delta: float,
+                    ub_delta: float,
+                    strategy: str,
+                    backend: str) -> np.ndarray:
+    # The birefringence function is built here, because closures cannot be sent to worker processes
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    _, height, width = retardation_tile.shape
+    result = np.empty((1, height, width))
+    for row in range(height):
+        for col in range(width):
+            location = _location_at(retardation_tile, row, col, wavelengths, k_function)
+            result[0, row, col] = location.find_delta_r(lb_delta=lb_delta, ub_delta=ub_delta, strategy=strategy,
+                                                        backend=backend)
+    return result
+
+
+def _solve_bounded_rgb_tile(stack_tile: np.ndarray,
+                            wavelengths: list[float],
+                            a: float,
+                            b: float,
+                            strategy: str,
+                            backend: str) -> np.ndarray:
+    # stack_tile holds the retardations followed by the lower and upper search boundary of every pixel
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    _, height, width = stack_tile.shape
+    result = np.empty((1, height, width))
+    for row in range(height):
+        for col in range(width):
+            location = _location_at(stack_tile, row, col, wavelengths, k_function)
+            result[0, row, col] = location.find_delta_r(lb_delta=stack_tile[-2, row, col],
+                                                        ub_delta=stack_tile[-1, row, col],
+                                                        strategy=strategy, backend=backend)
+    return result
+
+
+def _solve_rgb_group_tile(retardation_tile: np.ndarray,
+                          group_size: int,
+                          wavelengths: list[float],
+                          a: float,
+                          b: float,
+                          k: float,
+                          lb_delta: float,
+                          ub_delta: float,
+                          strategy: str,
+                          backend: str) -> np.ndarray:
+    # The valid pixels of every group_size x group_size group of the tile are solved jointly as neighboring
+    # locations (Eq. (32) in the paper), pixels with NaN retardations (masked out) are left out and stay NaN
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=a, b=b)
+    _, height, width = retardation_tile.shape
+    result = np.full((1, height, width), np.nan)
+    for (rows, cols) in iter_tiles((height, width), group_size):
+        group = retardation_tile[:, rows, cols]
+        valid = np.all(np.isfinite(group), axis=0)
+        if not np.any(valid):
+            continue
+        locations = [_location_at(group, row, col, wavelengths, k_function) for (row, col) in zip(*np.nonzero(valid))]
+        result[0, rows, cols][valid] = MultipleNeighboringLocations(locations).find_all_neighboring_delta_r(
+            k=k, lb_delta=lb_delta, ub_delta=ub_delta, strategy=strategy, backend=backend)
+    return result
+
+
+def block_average(stack: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Downsamples the last two axes by averaging factor x factor blocks
+    (incomplete blocks at the right and bottom border are averaged over their available pixels,
+    NaN pixels are ignored and blocks without any other pixel are NaN)
+
+    Args:
+        stack: array whose last two axes are (height, width)
+        factor: edge length of a block
+
+    Returns: (..., ceil(height/factor), ceil(width/factor))
+
+    """
+    height, width = stack.shape[-2:]
+    coarse_height, coarse_width = -(-height // factor), -(-width // factor)
+    padded = np.full(stack.shape[:-2] + (coarse_height * factor, coarse_width * factor), np.nan)
+    padded[..., :height, :width] = stack
+    blocks = padded.reshape(stack.shape[:-2] + (coarse_height, factor, coarse_width, factor))
+    with warnings.catch_warnings():
+        # Blocks containing only NaN ("Mean of empty slice")
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(blocks, axis=(-3, -1))
+
+
+def _compact(stack: np.ndarray, selection: np.ndarray) -> np.ndarray:
+    """
+    Gathers the selected pixels of a stack into a dense strip of shape (..., 1, n_selected)
+
+    """
+    return stack[..., selection][..., np.newaxis, :]
+
+
+def _scatter(strip: np.ndarray, selection: np.ndarray, fill_value=np.nan) -> np.ndarray:
+    """
+    Inverse of _compact: places a strip of shape (..., 1, n_selected) at the selected pixels of an array of shape
+    (..., height, width) that is fill_value everywhere else
+
+    """
+    image = np.full(strip.shape[:-2] + selection.shape, fill_value, dtype=strip.dtype)
+    image[..., selection] = strip[..., 0, :]
+    return image
+
+
+def _scatter_maps(strip: CharacteristicParameterMaps, selection: np.ndarray) -> CharacteristicParameterMaps:
+    return CharacteristicParameterMaps(delta=_scatter(strip.delta, selection),
+                                       theta=_scatter(strip.theta, selection),
+                                       omega=_scatter(strip.omega, selection))
+
+
+def _validate_mask(mask, shape: tuple[int, int]) -> np.ndarray:
+    mask = np.asarray(mask)
+    if mask.shape != tuple(shape):
+        raise _helpers.InvalidInputError(f"The mask must have the shape {tuple(shape)} of the image, got {mask.shape}.")
+    return mask.astype(bool, copy=False)
+
+
+def automatic_mask(stokes: np.ndarray,
+                   min_s0: float = 0,
+                   max_s0: float | None = None,
+                   min_dop: float = 0,
+                   max_dop: float = 1.05) -> np.ndarray:
+    """
+    Mask of the pixels that can be inverted: S0 is large enough to normalise the Stokes parameters, below the
+    saturation level and the degree of polarisation sqrt(S1^2 + S2^2 (+ S3^2)) / S0 is physically plausible
+    in every measurement.
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        min_s0: pixels with S0 <= min_s0 in any measurement are rejected (background, S0 == 0)
+        max_s0: pixels with S0 >= max_s0 in any measurement are rejected (saturation), None disables the check
+        min_dop: pixels with a smaller degree of polarisation in any measurement are rejected (depolarising)
+        max_dop: pixels with a larger degree of polarisation in any measurement are rejected (noise, saturation
+                 of a single channel); slightly above 1 to tolerate noise
+
+    Returns: (height, width) True at the valid pixels
+
+    """
+    stokes = np.asarray(stokes)
+    if stokes.ndim != 4:
+        raise _helpers.InvalidInputError(f"The Stokes stack must have 4 dimensions, got {stokes.ndim}.")
+    S0 = stokes[:, 0]
+    valid = np.all(np.isfinite(stokes), axis=(0, 1)) & np.all(S0 > min_s0, axis=0)
+    if max_s0 is not None:
+        valid &= np.all(S0 < max_s0, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dop = np.sqrt(np.sum(stokes[:, 1:] ** 2, axis=1)) / S0
+    valid &= np.all((dop >= min_dop) & (dop <= max_dop), axis=0)
+    return valid
+
+
+def residual_map(stokes: np.ndarray,
+                 phis: list[float] | np.ndarray,
+                 maps: CharacteristicParameterMaps,
+                 forward_model: str | None = None) -> np.ndarray:
+    """
+    Vectorized residual function R (Eq. (13) in the paper) of every pixel
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        phis: [rad] orientation of the incident light of each measurement
+        maps: characteristic parameters at which R is evaluated
+        forward_model: None evaluates Eqs. (8) and (9) in the paper, "mueller" or "jones" simulates the
+                       measurement with char_paras_images_to_stokes instead
+
+    Returns: (height, width)
+
+    """
+    stokes = np.asarray(stokes)
+    if forward_model is None:
+        # phi in the dtype of the maps, so float32 maps are evaluated in float32
+        phi = np.asarray(phis, dtype=np.asarray(maps.delta).dtype).reshape(-1, 1, 1)
+        S1, S2 = OptimizationProcedure.S1_S2_in_theory_arrays(phi=phi, delta=maps.delta, theta=maps.theta,
+                                                              omega=maps.omega)
+    else:
+        simulated = np.stack([char_paras_images_to_stokes(delta=maps.delta, theta=maps.theta, omega=maps.omega,
+                                                          stokes_in=linearly_polarized_light(phi),
+                                                          forward_model=forward_model) for phi in phis])
+        S1, S2 = simulated[:, 1] / simulated[:, 0], simulated[:, 2] / simulated[:, 0]
+    r1 = stokes[:, 1] / stokes[:, 0] - S1
+    r2 = stokes[:, 2] / stokes[:, 0] - S2
+    return np.sqrt(np.sum(r1 ** 2 + r2 ** 2, axis=0))
+
+
+def _validate_stack(stack: np.ndarray, ndim: int, n_first: int, name: str) -> None:
+    if stack.ndim != ndim:
+        raise _helpers.InvalidInputError(f"The {name} stack must have {ndim} dimensions, got {stack.ndim}.")
+    if stack.shape[0] != n_first:
+        raise _helpers.InvalidInputError(f"The {name} stack contains {stack.shape[0]} entries along the first axis,"
+                                         f" but {n_first} were specified.")
+
+
+def analytic_image(stokes: np.ndarray,
+                   phis: list[float] | np.ndarray,
+                   dtype=np.float64,
+                   mask: np.ndarray | None = None,
+                   compute_dtype=np.float64) -> CharacteristicParameterMaps:
+    """
+    Applies the analytic formulas (see section 2.4 in the paper) to every pixel.
+    The stack must contain the measurements at phi=0 and phi=pi/4.
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        phis: [rad] orientation of the incident light of each measurement
+        dtype: dtype of the returned maps
+        mask: (height, width) pixels to process (see automatic_mask), None processes all pixels
+        compute_dtype: dtype in which the formulas are evaluated
+
+    Returns: delta [0-pi], theta [0-pi/4], omega [0-pi] maps
+
+    """
+    stokes = np.asarray(stokes)
+    _validate_stack(stokes, ndim=4, n_first=len(phis), name="Stokes")
+    if mask is not None:
+        mask = _validate_mask(mask, stokes.shape[-2:])
+        return _scatter_maps(analytic_image(_compact(stokes, mask), phis=phis, dtype=dtype,
+                                            compute_dtype=compute_dtype), mask)
+
+    delta, theta, omega = stokes_images_to_char_paras_phi_0_and_45(
+        stokes_0_deg=stokes[_index_of_phi(phis, 0)],
+        stokes_45_deg=stokes[_index_of_phi(phis, math.pi / 4)],
+        dtype=compute_dtype)
+
+    return CharacteristicParameterMaps(delta=delta.astype(dtype, copy=False),
+                                       theta=theta.astype(dtype, copy=False),
+                                       omega=omega.astype(dtype, copy=False))
+
+
+@dataclass
+class HybridResult:
+    """
+    Result of hybrid_image
+
+    Attributes:
+        maps: characteristic parameters of every pixel (theta in [0, pi/2), omega in [0, pi))
+        residual: (height, width) residual function R of the returned parameters
+        routed_to_optimizer: (height, width) True where the analytic result was replaced by the optimizer
+        n_analytic: number of pixels solved analytically
+        n_optimizer: number of pixels solved by the optimization procedure
+    """
+    maps: CharacteristicParameterMaps
+    residual: np.ndarray
+    routed_to_optimizer: np.ndarray
+    n_analytic: int
+    n_optimizer: int
+
+
+def hybrid_image(stokes: np.ndarray,
+                 phis: list[float] | np.ndarray,
+                 residual_threshold: float = 1e-2,
+                 tile_size: int = 64,
+                 workers: int = 1,
+                 dtype=np.float64,
+                 strategy: str = "rand1exp",
+                 backend: str = "differential_evolution",
+                 checkpoint_dir: str | os.PathLike | None = None,
+                 mask: np.ndarray | None = None,
+                 compute_dtype=np.float64,
+                 precision: str = "float64") -> HybridResult:
+    """
+    Analytic-first processing: every pixel is solved with the analytic formulas and its residual function R
+    is evaluated over all measured phis. Only pixels with R > residual_threshold are solved again with the
+    optimization procedure.
+    The stack must contain the measurements at phi=0 and phi=pi/4.
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        phis: [rad] orientation of the incident light of each measurement
+        residual_threshold: pixels whose analytic solution has a larger residual R are sent to the optimizer
+        tile_size: edge length of the tiles that are distributed to the workers
+        workers: number of worker processes
+        dtype: dtype of the returned maps
+        strategy: differential evolution strategy
+        backend: name of the solver backend (see solverBackends.available_backends)
+        checkpoint_dir: directory in which completed optimizer tiles are persisted (makes the job resumable)
+        mask: (height, width) pixels to process (see automatic_mask), None processes all pixels
+        compute_dtype: dtype in which the analytic formulas and the residuals are evaluated
+        precision: precision of the optimizer (see optimizer_image)
+
+    Returns: maps, residuals and the number of pixels that took each route (masked out pixels and pixels whose
+             normalized Stokes parameters are not finite, e.g. S0 == 0, take none and are NaN)
+
+    """
+    stokes = np.asarray(stokes)
+    if mask is not None:
+        _validate_stack(stokes, ndim=4, n_first=len(phis), name="Stokes")
+        mask = _validate_mask(mask, stokes.shape[-2:])
+        strip = hybrid_image(_compact(stokes, mask), phis=phis, residual_threshold=residual_threshold,
+                             tile_size=tile_size, workers=workers, dtype=dtype, strategy=strategy, backend=backend,
+                             checkpoint_dir=checkpoint_dir, compute_dtype=compute_dtype, precision=precision)
+        return HybridResult(maps=_scatter_maps(strip.maps, mask), residual=_scatter(strip.residual, mask),
+                            routed_to_optimizer=_scatter(strip.routed_to_optimizer, mask, fill_value=False),
+                            n_analytic=strip.n_analytic, n_optimizer=strip.n_optimizer)
+    maps = analytic_image(stokes, phis=phis, dtype=compute_dtype, compute_dtype=compute_dtype)
+    maps.theta = maps.theta % (math.pi / 2)
+    maps.omega = maps.omega % math.pi
+    residual = residual_map(stokes.astype(compute_dtype, copy=False), phis=phis, maps=maps)
+
+    # Pixels whose analytic solution is NaN (but not the measurement) are routed to the optimizer as well,
+    # the optimizer cannot do anything for pixels without finite normalized Stokes parameters (e.g. S0 == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        solvable = np.all(np.isfinite(stokes[:, 1:3] / stokes[:, [0]]), axis=(0, 1))
+    routed = solvable & ~(residual <= residual_threshold)
+    n_optimizer = int(np.count_nonzero(routed))
+
+    maps = CharacteristicParameterMaps(delta=maps.delta.astype(dtype),
+                                       theta=maps.theta.astype(dtype),
+                                       omega=maps.omega.astype(dtype))
+    for values in (maps.delta, maps.theta, maps.omega, residual):
+        values[~solvable] = np.nan
+    if n_optimizer:
+        # The routed pixels are compacted into a strip, so tiles hold tile_size**2 pixels that need the optimizer
+        refined = optimizer_image(_compact(stokes, routed), phis=phis, tile_size=tile_size ** 2, workers=workers,
+                                  strategy=strategy, backend=backend, checkpoint_dir=checkpoint_dir,
+                                  precision=precision)
+        for (name, values) in (("delta", refined.delta), ("theta", refined.theta), ("omega", refined.omega)):
+            getattr(maps, name)[routed] = values[0]
+        residual[routed] = residual_map(_compact(stokes, routed), phis=phis, maps=refined)[0]
+
+    return HybridResult(maps=maps, residual=residual, routed_to_optimizer=routed,
+                        n_analytic=int(np.count_nonzero(solvable)) - n_optimizer, n_optimizer=n_optimizer)
+
+
+def optimizer_image(stokes: np.ndarray,
+                    phis: list[float] | np.ndarray,
+                    tile_size: int = 64,
+                    workers: int = 1,
+                    dtype=np.float64,
+                    strategy: str = "rand1exp",
+                    backend: str = "differential_evolution",
+                    checkpoint_dir: str | os.PathLike | None = None,
+                    mask: np.ndarray | None = None,
+                    precision: str = "float64") -> CharacteristicParameterMaps:
+    """
+    Applies the optimization procedure (see section 2.2 in the paper) to every pixel.
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        phis: [rad] orientation of the incident light of each measurement
+        tile_size: edge length of the tiles that are distributed to the workers
+        workers: number of worker processes
+        dtype: dtype of the returned maps
+        strategy: differential evolution strategy
+        backend: name of the solver backend (see solverBackends.available_backends)
+        checkpoint_dir: directory in which completed tiles are persisted (makes the job resumable)
+        mask: (height, width) pixels to process (see automatic_mask), None processes all pixels
+        precision: "float64" solves every pixel with the backend, "mixed" searches the closest points of a
+                   parameter grid for all pixels of a tile at once in float32 and polishes them with a float64
+                   least-squares solve (local, the backend and the strategy are not used)
+
+    Returns: delta [0-pi], theta [0-pi/2], omega [0-pi] maps
+
+    """
+    stokes = np.asarray(stokes)
+    _validate_stack(stokes, ndim=4, n_first=len(phis), name="Stokes")
+    if precision not in PRECISIONS:
+        raise _helpers.InvalidInputError(f"Unknown precision {precision!r}, choose one of {PRECISIONS}.")
+    if mask is not None:
+        mask = _validate_mask(mask, stokes.shape[-2:])
+        # Tiles of the strip hold as many pixels as the square tiles of the image
+        strip = optimizer_image(_compact(stokes, mask), phis=phis, tile_size=tile_size ** 2, workers=workers,
+                                dtype=dtype, strategy=strategy, backend=backend, checkpoint_dir=checkpoint_dir,
+                                precision=precision)
+        return _scatter_maps(strip, mask)
+
+    maps = _run_tiles(_solve_optimizer_tile, stokes, n_outputs=3, tile_size=tile_size, workers=workers,
+                      dtype=dtype, checkpoint_dir=checkpoint_dir, phis=[float(phi) for phi in phis],
+                      strategy=strategy, backend=backend, precision=precision)
+
+    return CharacteristicParameterMaps(delta=maps[0], theta=maps[1], omega=maps[2])
+
+
+def batched_optimizer_image(stokes: np.ndarray,
+                            phis: list[float] | np.ndarray,
+                            tile_size: int = 256,
+                            workers: int = 1,
+                            dtype=np.float64,
+                            n_starts: int = MIXED_PRECISION_STARTS,
+                            max_iterations: int = 100,
+                            checkpoint_dir: str | os.PathLike | None = None,
+                            mask: np.ndarray | None = None) -> CharacteristicParameterMaps:
+    """
+    Vectorized alternative to optimizer_image: the n_starts closest points of a parameter grid
+    (BATCHED_RESOLUTION, KD tree of the LookupTable) of all pixels of a tile are refined together by the lock-step
+    Levenberg-Marquardt fit of batchedLevenbergMarquardt, instead of one scipy solve per pixel.
+
+    Args:
+        stokes: (n_phi, n_stokes, height, width)
+        phis: [rad] orientation of the incident light of each measurement
+        tile_size: edge length of the tiles that are distributed to the workers (larger than for optimizer_image,
+                   because a tile is processed as a whole)
+        workers: number of worker processes
+        dtype: dtype of the returned maps
+        n_starts: number of starting points per pixel, the best result is kept
+        max_iterations: upper limit of the number of iterations per tile
+        checkpoint_dir: directory in which completed tiles are persisted (makes the job resumable)
+        mask: (height, width) pixels to process (see automatic_mask), None processes all pixels
+
+    Returns: delta [0-pi], theta [0-pi/2], omega [0-pi] maps
+
+    """
+    stokes = np.asarray(stokes)
+    _validate_stack(stokes, ndim=4, n_first=len(phis), name="Stokes")
+    if mask is not None:
+        mask = _validate_mask(mask, stokes.shape[-2:])
+        strip = batched_optimizer_image(_compact(stokes, mask), phis=phis, tile_size=tile_size ** 2, workers=workers,
+                                        dtype=dtype, n_starts=n_starts, max_iterations=max_iterations,
+                                        checkpoint_dir=checkpoint_dir)
+        return _scatter_maps(strip, mask)
+
+    maps = _run_tiles(_solve_batched_tile, stokes, n_outputs=3, tile_size=tile_size, workers=workers, dtype=dtype,
+                      checkpoint_dir=checkpoint_dir, phis=[float(phi) for phi in phis], n_starts=n_starts,
+                      max_iterations=max_iterations)
+
+    return CharacteristicParameterMaps(delta=maps[0], theta=maps[1], omega=maps[2])
+
+
+def rgb_image(retardations: np.ndarray,
+              wavelengths: list[float] | np.ndarray,
+              a: float,
+              b: float,
+              tile_size: int = 64,
+              workers: int = 1,
+              dtype=np.float64,
+              lb_delta: float = 0,
+              ub_delta: float = 50 * math.pi,
+              strategy: str = "rand2exp",
+              backend: str = "differential_evolution",
+              checkpoint_dir: str | os.PathLike | None = None,
+              mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Applies the RGB method (see section 2.6 in the paper) to every pixel independently.
+
+    Args:
+        retardations: [rad] (n_wavelengths, height, width), measured retardations in the range 0-pi
+        wavelengths: wavelength of each retardation image, the first one is the reference wavelength
+        a: fitting parameter a of the reduced birefringence function
+        b: fitting parameter b of the reduced birefringence function
+        tile_size: edge length of the tiles that are distributed to the workers
+        workers: number of worker processes
+        dtype: dtype of the returned map
+        lb_delta: lower boundary of the search area
+        ub_delta: upper boundary of the search area
+        strategy: differential evolution strategy
+        backend: name of the solver backend (see solverBackends.available_backends)
+        checkpoint_dir: directory in which completed tiles are persisted (makes the job resumable)
+        mask: (height, width) pixels to process, None processes all pixels
+
+    Returns: [rad] (height, width) retardation at the reference wavelength
+
+    """
+    retardations = np.asarray(retardations)
+    _validate_stack(retardations, ndim=3, n_first=len(wavelengths), name="retardation")
+    if mask is not None:
+        mask = _validate_mask(mask, retardations.shape[-2:])
+        strip = rgb_image(_compact(retardations, mask), wavelengths=wavelengths, a=a, b=b, tile_size=tile_size ** 2,
+                          workers=workers, dtype=dtype, lb_delta=lb_delta, ub_delta=ub_delta, strategy=strategy,
+                          backend=backend, checkpoint_dir=checkpoint_dir)
+        return _scatter(strip, mask)
+
+    delta_r = _run_tiles(_solve_rgb_tile, retardations, n_outputs=1, tile_size=tile_size, workers=workers,
+                         dtype=dtype, checkpoint_dir=checkpoint_dir,
+                         wavelengths=[float(wavelength) for wavelength in wavelengths], a=a, b=b,
+                         lb_delta=lb_delta, ub_delta=ub_delta, strategy=strategy, backend=backend)
+    return delta_r[0]
+
+
+def rgb_image_pyramid(retardations: np.ndarray,
+                      wavelengths: list[float] | np.ndarray,
+                      a: float,
+                      b: float,
+                      factor: int = 4,
+                      group_size: int = 2,
+                      k: float = 0.1,
+                      fringe_window: float = 1,
+                      tile_size: int = 64,
+                      workers: int = 1,
+                      dtype=np.float64,
+                      lb_delta: float = 0,
+                      ub_delta: float = 50 * math.pi,
+                      strategy: str = "rand2exp",
+                      backend: str = "differential_evolution",
+                      checkpoint_dir: str | os.PathLike | None = None,
+                      mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Coarse-to-fine version of rgb_image. Because the fringe order varies slowly across a specimen,
+    the retardation images are first downsampled by block averaging and unwrapped over the full search area,
+    with group_size x group_size coarse pixels solved jointly as MultipleNeighboringLocations.
+    The upsampled coarse solution then restricts the search of every full-resolution pixel to
+    +- fringe_window fringe orders (2 pi each) around it.
+
+    Args:
+        retardations: [rad] (n_wavelengths, height, width), measured retardations in the range 0-pi
+        wavelengths: wavelength of each retardation image, the first one is the reference wavelength
+        a: fitting parameter a of the reduced birefringence function
+        b: fitting parameter b of the reduced birefringence function
+        factor: downsampling factor of the coarse level
+        group_size: edge length of the groups of coarse pixels that are solved jointly
+        k: K-Parameter of the collective error function L (see Eq. (32) in the paper)
+        fringe_window: half width of the full-resolution search area in fringe orders
+        tile_size: edge length of the tiles that are distributed to the workers
+        workers: number of worker processes
+        dtype: dtype of the returned map
+        lb_delta: lower boundary of the search area
+        ub_delta: upper boundary of the search area
+        strategy: differential evolution strategy
+        backend: name of the solver backend (see solverBackends.available_backends)
+        checkpoint_dir: directory in which completed tiles of the coarse level (sub-directory "coarse") and of the
+                        full resolution (sub-directory "fine") are persisted
+        mask: (height, width) pixels to process, None processes all pixels. Masked out pixels are left out of the
+              block averages, coarse pixels without any valid pixel are not solved.
+
+    Returns: [rad] (height, width) retardation at the reference wavelength
+
+    """
+    retardations = np.asarray(retardations, dtype=float)
+    _validate_stack(retardations, ndim=3, n_first=len(wavelengths), name="retardation")
+    wavelengths = [float(wavelength) for wavelength in wavelengths]
+    height, width = retardations.shape[-2:]
+    if mask is not None:
+        mask = _validate_mask(mask, (height, width))
+
+    coarse_checkpoint_dir = fine_checkpoint_dir = job = None
+    if checkpoint_dir is not None:
+        coarse_checkpoint_dir = Path(checkpoint_dir) / "coarse"
+        fine_checkpoint_dir = Path(checkpoint_dir) / "fine"
+        # The bounds of the fine level are derived from the (randomized) coarse level, so the fine checkpoint is
+        # keyed on the input and the settings of the coarse level instead
+        job = {"retardations": fingerprint_array(retardations),
+               "mask": None if mask is None else fingerprint_array(mask),
+               "coarse": repr((factor, group_size, k, fringe_window, lb_delta, ub_delta))}
+
+    coarse = block_average(retardations if mask is None else np.where(mask, retardations, np.nan), factor)
+    # A coarse tile contains several whole groups, so the groups are the same for any tile_size
+    coarse_tile_size = max(1, tile_size // group_size) * group_size
+    coarse_delta_r = _run_tiles(_solve_rgb_group_tile, coarse, n_outputs=1, tile_size=coarse_tile_size,
+                                workers=workers, dtype=np.float64, checkpoint_dir=coarse_checkpoint_dir,
+                                group_size=group_size, wavelengths=wavelengths, a=a, b=b, k=k,
+                                lb_delta=lb_delta, ub_delta=ub_delta, strategy=strategy, backend=backend)[0]
+
+    guess = np.repeat(np.repeat(coarse_delta_r, factor, axis=0), factor, axis=1)[:height, :width]
+    window = fringe_window * 2 * math.pi
+    bounds = np.stack([np.maximum(guess - window, lb_delta), np.minimum(guess + window, ub_delta)])
+    stack = np.concatenate([retardations, bounds])
+
+    if mask is None:
+        return _run_tiles(_solve_bounded_rgb_tile, stack, n_outputs=1, tile_size=tile_size, workers=workers,
+                          dtype=dtype, checkpoint_dir=fine_checkpoint_dir, job=job, wavelengths=wavelengths, a=a,
+                          b=b, strategy=strategy, backend=backend)[0]
+    delta_r = _run_tiles(_solve_bounded_rgb_tile, _compact(stack, mask), n_outputs=1, tile_size=tile_size ** 2,
+                         workers=workers, dtype=dtype, checkpoint_dir=fine_checkpoint_dir, job=job,
+                         wavelengths=wavelengths, a=a, b=b, strategy=strategy, backend=backend)
+    return _scatter(delta_r, mask)[0]
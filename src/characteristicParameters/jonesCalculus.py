@@ -0,0 +1,157 @@
+import numpy as np
+
+from characteristicParameters import _helpers
+
+"""
+Jones calculus counterpart of muellerCalculus for the non-depolarizing optically equivalent model.
+
+The linear retarder and the rotator do not depolarize, so the 4x4 real Mueller matrices can be replaced by
+2x2 complex Jones matrices acting on Jones vectors (Ex, Ey). The conventions are chosen such that the Stokes
+vectors obtained with jones_vectors_to_stokes agree with the Mueller calculus of muellerCalculus:
+    S0 = |Ex|^2 + |Ey|^2, S1 = |Ex|^2 - |Ey|^2, S2 = 2 Re(Ex Ey*), S3 = 2 Im(Ex Ey*)
+Jones vectors only describe fully polarized light.
+"""
+
+
+def linearly_polarized_light(phi: float) -> np.ndarray:
+    """
+
+    Args:
+        phi: [rad] 0-pi orientation angle of the linearly polarized light
+
+    Returns: 2x1 complex Jones vector of linearly polarized light oriented at angle phi
+
+    """
+    return np.array([np.cos(phi), np.sin(phi)], dtype=complex)
+
+
+def stokes_to_jones_vector(stokes: list[float] | np.ndarray, atol: float = 1e-9) -> np.ndarray:
+    """
+    Jones vector (up to a global phase) of fully polarized light.
+
+    Args:
+        stokes: [S0, S1, S2, S3]
+        atol: tolerance of the check S0^2 = S1^2 + S2^2 + S3^2
+
+    Returns: 2x1 complex Jones vector
+
+    """
+    S0, S1, S2, S3 = np.asarray(stokes, dtype=float)
+    if abs(S0 ** 2 - S1 ** 2 - S2 ** 2 - S3 ** 2) > atol * max(S0 ** 2, 1):
+        raise _helpers.InvalidInputError(f"Only fully polarized light has a Jones vector, got {list(stokes)}.")
+    # Divide by the larger one of |Ex| and |Ey|
+    if S1 >= 0:
+        Ex = np.sqrt((S0 + S1) / 2)
+        return np.array([Ex, (S2 - 1j * S3) / (2 * Ex)])
+    Ey = np.sqrt((S0 - S1) / 2)
+    return np.array([(S2 + 1j * S3) / (2 * Ey), Ey])
+
+
+def jones_vectors_to_stokes(jones_vectors: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+
+    Args:
+        jones_vectors: (..., 2) complex Jones vectors
+        out: (4, ...) array the result is written to
+
+    Returns: (4, ...) [S0, S1, S2, S3] of every Jones vector (out if given)
+
+    """
+    Ex = jones_vectors[..., 0]
+    Ey = jones_vectors[..., 1]
+    intensity_x = Ex.real ** 2 + Ex.imag ** 2
+    intensity_y = Ey.real ** 2 + Ey.imag ** 2
+    correlation = Ex * np.conj(Ey)
+    return np.stack([intensity_x + intensity_y, intensity_x - intensity_y, 2 * correlation.real,
+                     2 * correlation.imag], out=out)
+
+
+def rotator(omega: float) -> np.ndarray:
+    """
+    Jones counterpart of muellerCalculus.rotator
+
+    Args:
+        omega: [rad] rotation relative to the coordinate axes
+
+    Returns: 2x2 complex Jones matrix of the rotator
+
+    """
+    return np.array([[np.cos(omega), -np.sin(omega)],
+                     [np.sin(omega), np.cos(omega)]], dtype=complex)
+
+
+def linear_retarder(delta: float, theta: float) -> np.ndarray:
+    """
+    Jones counterpart of muellerCalculus.linear_retarder: rotator(theta) * diag(1, exp(i*delta)) * rotator(-theta)
+
+    Args:
+        delta: [rad] retardance
+        theta: [rad] orientation of the fast axis
+
+    Returns: 2x2 complex Jones matrix of the linear retarder
+
+    """
+    return rotator(theta) @ np.diag([1, np.exp(1j * delta)]) @ rotator(-theta)
+
+
+def optical_equivalent_model(delta: float, theta: float, omega: float) -> np.ndarray:
+    """
+    Jones counterpart of muellerCalculus.optical_equivalent_model: linear_retarder(delta, theta) * rotator(omega)
+
+    Returns: 2x2 complex Jones matrix
+
+    """
+    return linear_retarder(delta=delta, theta=theta) @ rotator(omega)
+
+
+def optical_equivalent_model_stack(delta: np.ndarray, theta: np.ndarray, omega: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of optical_equivalent_model for arrays of characteristic parameters.
+    The product rotator(theta) * diag(1, exp(i*delta)) * rotator(omega - theta) is written out element-wise.
+
+    Args:
+        delta: [rad] retardance of the linear retarder, any shape
+        theta: [rad] position of the fast axis of the linear retarder, same shape as delta
+        omega: [rad] rotation of the rotation matrix, same shape as delta
+
+    Returns: (..., 2, 2) complex Jones matrices, one per element of delta
+
+    """
+    delta, theta, omega = np.broadcast_arrays(delta, theta, omega)
+    phase = np.exp(1j * delta)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    cos_r, sin_r = np.cos(omega - theta), np.sin(omega - theta)
+    return np.stack([np.stack([cos_t * cos_r - sin_t * sin_r * phase, -cos_t * sin_r - sin_t * cos_r * phase],
+                              axis=-1),
+                     np.stack([sin_t * cos_r + cos_t * sin_r * phase, -sin_t * sin_r + cos_t * cos_r * phase],
+                              axis=-1)], axis=-2)
+
+
+def char_paras_images_to_stokes(delta: np.ndarray, theta: np.ndarray, omega: np.ndarray, stokes_in,
+                                out: np.ndarray | None = None, dtype=np.float64) -> np.ndarray:
+    """
+    Jones counterpart of analyticFormulas.char_paras_images_to_stokes (fully polarized incident light only).
+    The Jones matrices are not built: the incident Jones vector is rotated by omega - theta, the y component
+    is retarded by delta and the result is rotated back by theta.
+
+    Args:
+        delta: [rad] any shape
+        theta: [rad] same shape as delta
+        omega: [rad] same shape as delta
+        stokes_in: [S0, S1, S2, S3] incident on every pixel
+        out: (4, ...) array the result is written to
+        dtype: real dtype of the computation and of the result (float32 computes with complex64)
+
+    Returns: (4, ...) [S0, S1, S2, S3] of every pixel (out if given)
+
+    """
+    delta, theta, omega = np.broadcast_arrays(np.asarray(delta, dtype=dtype), np.asarray(theta, dtype=dtype),
+                                              np.asarray(omega, dtype=dtype))
+    Ex, Ey = stokes_to_jones_vector(stokes_in).astype(np.result_type(dtype, np.complex64))
+    cos_r, sin_r = np.cos(omega - theta), np.sin(omega - theta)
+    # Components along the fast and the slow axis
+    fast = cos_r * Ex - sin_r * Ey
+    slow = (sin_r * Ex + cos_r * Ey) * np.exp(1j * delta)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    return jones_vectors_to_stokes(np.stack([cos_t * fast - sin_t * slow, sin_t * fast + cos_t * slow], axis=-1),
+                                   out=out)
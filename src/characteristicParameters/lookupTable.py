@@ -0,0 +1,165 @@
+import hashlib
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from characteristicParameters.optimizationProcedure import OptimizationProcedure
+from characteristicParameters.tileCheckpoint import _atomic_write
+
+"""
+Lookup table (LUT) of initial guesses for the optimization procedure (section 2.2 in the paper).
+
+For a fixed set of orientations phi, Eqs. (8) and (9) map (delta, theta, omega) to the normalized Stokes
+parameters (S1, S2) of every measurement. The LUT samples this mapping on a regular grid over one period of
+the parameters (delta 0-pi, theta 0-pi/2, omega 0-pi, see section 2.3 "Measurement ranges") and finds the grid
+point closest to a measurement with a KD tree in measurement space. The grid point is then used as the start
+of a local solve instead of a global search.
+
+Tables are cached on disk, keyed by the phi set and the grid resolution (directory: the environment variable
+CHARACTERISTIC_PARAMETERS_CACHE or ~/.cache/characteristicParameters), and kept in memory after the first use.
+"""
+
+DEFAULT_RESOLUTION = (33, 32, 64)
+
+_loaded_tables: dict[str, "LookupTable"] = {}
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("CHARACTERISTIC_PARAMETERS_CACHE",
+                               Path.home() / ".cache" / "characteristicParameters"))
+
+
+def cache_key(phis: list[float] | np.ndarray, resolution: tuple[int, int, int]) -> str:
+    """
+    Returns: file name stem identifying the phi set (rounded to 1e-9 rad) and the grid resolution
+
+    """
+    description = repr(([round(float(phi), 9) for phi in phis], tuple(int(n) for n in resolution)))
+    return "lut_" + hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+class LookupTable:
+
+    def __init__(self, phis: list[float] | np.ndarray, parameters: np.ndarray, features: np.ndarray):
+        """
+        Use LookupTable.build or get_lookup_table instead.
+
+        Args:
+            phis: [rad] orientations of the incident light
+            parameters: [rad] (n_entries, 3) delta, theta, omega of every grid point
+            features: (n_entries, 2 * n_phi) S1, S2 of every phi at every grid point
+        """
+        self.phis = np.asarray(phis, dtype=float)
+        self.parameters = parameters
+        self.features = features
+        self._tree = None
+
+    def __str__(self):
+        return f"{self.__class__.__name__}: {len(self.parameters)} entries, phis {self.phis.tolist()}"
+
+    @classmethod
+    def build(cls, phis: list[float] | np.ndarray,
+              resolution: tuple[int, int, int] = DEFAULT_RESOLUTION) -> "LookupTable":
+        """
+        Args:
+            phis: [rad] orientations of the incident light
+            resolution: number of grid points of delta (including 0 and pi), theta and omega (periodic)
+
+        """
+        n_delta, n_theta, n_omega = resolution
+        delta, theta, omega = np.meshgrid(np.linspace(0, math.pi, n_delta),
+                                          np.arange(n_theta) * (math.pi / 2 / n_theta),
+                                          np.arange(n_omega) * (math.pi / n_omega), indexing="ij")
+        parameters = np.stack([delta.ravel(), theta.ravel(), omega.ravel()], axis=-1)
+        phis = np.asarray(phis, dtype=float)
+        S1, S2 = OptimizationProcedure.S1_S2_in_theory_arrays(phis, parameters[:, [0]], parameters[:, [1]],
+                                                              parameters[:, [2]])
+        features = np.stack([S1, S2], axis=-1).reshape(len(parameters), -1)
+        return cls(phis, parameters, features)
+
+    def save(self, path: str | os.PathLike) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, lambda handle: np.savez(handle, phis=self.phis, parameters=self.parameters,
+                                                    features=self.features))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "LookupTable":
+        with np.load(path) as archive:
+            return cls(archive["phis"], archive["parameters"], archive["features"])
+
+    @property
+    def tree(self):
+        # Built on the first query, scipy dominates the import time of the package
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+
+            self._tree = cKDTree(self.features)
+        return self._tree
+
+    def nearest(self, features: np.ndarray, k: int = 1) -> np.ndarray:
+        """
+        Args:
+            features: (..., 2 * n_phi) measured S1, S2 of every phi (in the order of self.phis)
+            k: number of grid points to return
+
+        Returns: [rad] (..., 3) delta, theta, omega of the closest grid point or (..., k, 3) of the k closest
+
+        """
+        _, indices = self.tree.query(np.asarray(features, dtype=float), k=k)
+        return self.parameters[indices]
+
+    def nearest_batch(self, features: np.ndarray, k: int = 1, dtype=np.float32,
+                      max_chunk_elements: int = 1 << 22) -> np.ndarray:
+        """
+        Brute-force version of nearest for many measurements at once (e.g. all pixels of a tile).
+        The squared distances |f|^2 - 2 f.g + |g|^2 to all grid points are computed with one matrix product per
+        chunk of measurements in dtype. Because the result is only a start for a local solve, float32 suffices:
+        its rounding (about 1e-7 of |f|^2) can at most swap grid points that are almost equally close.
+
+        Args:
+            features: (n_measurements, 2 * n_phi) measured S1, S2 of every phi (in the order of self.phis)
+            k: number of grid points to return per measurement
+            dtype: dtype of the distance computation
+            max_chunk_elements: upper limit of the number of distances held in memory at once
+
+        Returns: [rad] (n_measurements, k, 3) delta, theta, omega of the k closest grid points (unordered)
+
+        """
+        features = np.asarray(features, dtype=dtype)
+        grid = self.features.astype(dtype)
+        grid_norms = np.einsum("ij,ij->i", grid, grid)
+        chunk_size = max(1, max_chunk_elements // len(grid))
+        indices = np.empty((len(features), k), dtype=np.intp)
+        for start in range(0, len(features), chunk_size):
+            chunk = features[start:start + chunk_size]
+            # |f|^2 is the same for all grid points of a measurement and does not change the ranking
+            distances = grid_norms - 2 * (chunk @ grid.T)
+            indices[start:start + chunk_size] = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        return self.parameters[indices]
+
+
+def get_lookup_table(phis: list[float] | np.ndarray,
+                     resolution: tuple[int, int, int] = DEFAULT_RESOLUTION,
+                     cache_dir: str | os.PathLike | None = None) -> LookupTable:
+    """
+    Returns the table from memory, from the disk cache or builds (and caches) it.
+
+    Args:
+        phis: [rad] orientations of the incident light
+        resolution: number of grid points of delta, theta and omega
+        cache_dir: directory of the disk cache (default: default_cache_dir())
+
+    """
+    key = cache_key(phis, resolution)
+    if key not in _loaded_tables:
+        path = Path(cache_dir if cache_dir is not None else default_cache_dir()) / f"{key}.npz"
+        if path.exists():
+            table = LookupTable.load(path)
+        else:
+            table = LookupTable.build(phis, resolution)
+            table.save(path)
+        _loaded_tables[key] = table
+    return _loaded_tables[key]
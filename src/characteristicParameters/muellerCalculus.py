@@ -69,6 +69,25 @@ def linear_retarder(delta: float, theta: float) -> np.ndarray:
                      [0, np.sin(delta) * np.sin(2 * theta), -np.sin(delta) * np.cos(2 * theta), np.cos(delta)]])
 
 
+def linear_polarizer(theta: float) -> np.ndarray:
+    """
+    Ideal linear polarizer with its transmission axis at angle theta, i.e. rotator(theta) * P(0) * rotator(-theta).
+    Definition can be found in:
+    page 167 in "Chipman, R., Lam, W. S. T., & Young, G. (2018). Polarized light and optical systems. CRC press."
+
+    Args:
+        theta: [rad] orientation of the transmission axis
+
+    Returns: 4x4 numpy matrix of the Mueller matrix linear polarizer model
+
+    """
+    horizontal = 0.5 * np.array([[1, 1, 0, 0],
+                                 [1, 1, 0, 0],
+                                 [0, 0, 0, 0],
+                                 [0, 0, 0, 0]])
+    return rotator(theta) @ horizontal @ rotator(-theta)
+
+
 def optical_equivalent_model(delta: float, theta: float, omega: float) -> np.ndarray:
     """
     Models the optically equivalent model composed of two Mueller matrices:
@@ -85,3 +104,40 @@ def optical_equivalent_model(delta: float, theta: float, omega: float) -> np.nda
     r = rotator(omega)
     x = linear_retarder(delta=delta, theta=theta)
     return np.matmul(x, r)
+
+
+def optical_equivalent_model_stack(delta: np.ndarray, theta: np.ndarray, omega: np.ndarray,
+                                   dtype=np.float64) -> np.ndarray:
+    """
+    Vectorized version of optical_equivalent_model for arrays of characteristic parameters
+
+    Args:
+        delta: [rad] retardance of the linear retarder, any shape
+        theta: [rad] position of the fast axis of the linear retarder, same shape as delta
+        omega: [rad] rotation of the rotation matrix, same shape as delta
+        dtype: dtype of the computation and of the result (float32 elements have a relative error of about 1e-7)
+
+    Returns: (..., 4, 4) Mueller matrices X(delta, theta) * R(omega), one per element of delta
+
+    """
+    delta, theta, omega = np.broadcast_arrays(np.asarray(delta, dtype=dtype), np.asarray(theta, dtype=dtype),
+                                              np.asarray(omega, dtype=dtype))
+    zeros = np.zeros(delta.shape, dtype=dtype)
+    ones = np.ones(delta.shape, dtype=dtype)
+
+    cos_2o, sin_2o = np.cos(2 * omega), np.sin(2 * omega)
+    r = np.stack([np.stack([ones, zeros, zeros, zeros], axis=-1),
+                  np.stack([zeros, cos_2o, -sin_2o, zeros], axis=-1),
+                  np.stack([zeros, sin_2o, cos_2o, zeros], axis=-1),
+                  np.stack([zeros, zeros, zeros, ones], axis=-1)], axis=-2)
+
+    cos_d, sin_d = np.cos(delta), np.sin(delta)
+    cos_2t, sin_2t = np.cos(2 * theta), np.sin(2 * theta)
+    x = np.stack([np.stack([ones, zeros, zeros, zeros], axis=-1),
+                  np.stack([zeros, cos_2t ** 2 + sin_2t ** 2 * cos_d, sin_2t * cos_2t * (1 - cos_d), -sin_d * sin_2t],
+                           axis=-1),
+                  np.stack([zeros, (1 - cos_d) * sin_2t * cos_2t, sin_2t ** 2 + cos_2t ** 2 * cos_d, sin_d * cos_2t],
+                           axis=-1),
+                  np.stack([zeros, sin_d * sin_2t, -sin_d * cos_2t, cos_d], axis=-1)], axis=-2)
+
+    return np.matmul(x, r)
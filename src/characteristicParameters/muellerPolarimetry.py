@@ -0,0 +1,164 @@
+import math
+
+import numpy as np
+
+from characteristicParameters import _helpers
+from characteristicParameters.analyticFormulas import stokes_images_to_char_paras_phi_0_and_45
+from characteristicParameters.muellerCalculus import linear_polarizer, linear_retarder
+
+"""
+Batched Mueller matrix polarimetry, e.g. with a dual-rotating-retarder polarimeter.
+
+Measurement k illuminates the sample with the Stokes vector g_k of the polarization state generator and
+records the first element of a_k^T, the analyser row vector, times the light leaving the sample:
+    I_k = a_k^T M g_k = outer(a_k, g_k).ravel() . M.ravel()
+The rows outer(a_k, g_k).ravel() form the (n_measurements, 16) instrument matrix W, so I = W M.ravel().
+W and its pseudo-inverse are computed once; the Mueller matrices of all pixels are then recovered with a
+single matrix multiplication. The characteristic parameters follow from the columns of the recovered matrices:
+M (1, 1, 0, 0)^T and M (1, 0, 1, 0)^T are the Stokes vectors leaving the sample for linearly polarized light at
+phi=0 and phi=pi/4, which are passed to the analytic formulas (section 2.4 in the paper).
+"""
+
+
+def generator_stokes(retarder_angle: float, retardance: float = math.pi / 2, polarizer_angle: float = 0
+                     ) -> np.ndarray:
+    """
+    Stokes vector of a polarization state generator made of a linear polarizer followed by a linear retarder.
+
+    Args:
+        retarder_angle: [rad] orientation of the fast axis of the retarder
+        retardance: [rad] retardance of the retarder (default: quarter-wave plate)
+        polarizer_angle: [rad] orientation of the transmission axis of the polarizer
+
+    Returns: 4x1 Stokes vector for unpolarized input light of unit intensity
+
+    """
+    return linear_retarder(delta=retardance, theta=retarder_angle) @ linear_polarizer(polarizer_angle) \
+        @ np.array([1, 0, 0, 0])
+
+
+def analyzer_vector(retarder_angle: float, retardance: float = math.pi / 2, polarizer_angle: float = 0
+                    ) -> np.ndarray:
+    """
+    Analyser row vector of a linear retarder followed by a linear polarizer in front of the detector.
+
+    Args:
+        retarder_angle: [rad] orientation of the fast axis of the retarder
+        retardance: [rad] retardance of the retarder (default: quarter-wave plate)
+        polarizer_angle: [rad] orientation of the transmission axis of the polarizer
+
+    Returns: 4x1 vector a with intensity = a . S for the Stokes vector S arriving at the analyser
+
+    """
+    return (linear_polarizer(polarizer_angle) @ linear_retarder(delta=retardance, theta=retarder_angle))[0]
+
+
+class MuellerPolarimeter:
+
+    def __init__(self, generator_states: np.ndarray, analyzer_states: np.ndarray):
+        """
+
+        Args:
+            generator_states: (n_measurements, 4) Stokes vectors illuminating the sample
+            analyzer_states: (n_measurements, 4) analyser row vectors (see analyzer_vector)
+        """
+        generator_states = np.asarray(generator_states, dtype=float)
+        analyzer_states = np.asarray(analyzer_states, dtype=float)
+        if generator_states.shape != analyzer_states.shape or generator_states.shape[1:] != (4,):
+            raise _helpers.InvalidInputError(f"The generator and analyser states must both have the shape "
+                                             f"(n_measurements, 4), got {generator_states.shape} and "
+                                             f"{analyzer_states.shape}.")
+
+        # (n_measurements, 16) with rows outer(a_k, g_k).ravel()
+        self.instrument_matrix = np.einsum("ki,kj->kij", analyzer_states, generator_states).reshape(-1, 16)
+        if np.linalg.matrix_rank(self.instrument_matrix) < 16:
+            raise _helpers.InvalidInputError("The measurements do not determine all 16 elements of the Mueller matrix.")
+        self._pseudo_inverse = np.linalg.pinv(self.instrument_matrix)
+
+    def __str__(self):
+        return (f"Class {self.__class__.__name__}: {self.instrument_matrix.shape[0]} measurements, "
+                f"condition number {self.condition_number():.3g}")
+
+    @classmethod
+    def dual_rotating_retarder(cls,
+                               n_measurements: int = 25,
+                               ratio: float = 5,
+                               retardance: float = math.pi / 2) -> "MuellerPolarimeter":
+        """
+        Dual-rotating-retarder polarimeter: fixed horizontal polarizers, the generator retarder is rotated in steps
+        of pi/n_measurements and the analyser retarder ratio times as fast.
+        The intensity contains harmonics up to 4 * (ratio + 1) of the generator angle, so these equally spaced
+        angles determine all 16 elements only for n_measurements > 4 * (ratio + 1), e.g. 25 for ratio 5.
+        Instruments with other angles are described with the constructor.
+
+        Args:
+            n_measurements: number of intensity measurements
+            ratio: angular velocity of the analyser retarder relative to the generator retarder
+            retardance: [rad] retardance of both retarders
+
+        """
+        angles = math.pi * np.arange(n_measurements) / n_measurements
+        return cls(generator_states=[generator_stokes(angle, retardance) for angle in angles],
+                   analyzer_states=[analyzer_vector(ratio * angle, retardance) for angle in angles])
+
+    def condition_number(self) -> float:
+        return float(np.linalg.cond(self.instrument_matrix))
+
+    def intensities(self, mueller_matrices: np.ndarray) -> np.ndarray:
+        """
+        Forward model of the measurement.
+
+        Args:
+            mueller_matrices: (..., 4, 4) Mueller matrices of the sample
+
+        Returns: (n_measurements, ...) intensities
+
+        """
+        mueller_matrices = np.asarray(mueller_matrices, dtype=float)
+        flat = mueller_matrices.reshape(mueller_matrices.shape[:-2] + (16,))
+        return np.moveaxis(flat @ self.instrument_matrix.T, -1, 0)
+
+    def recover_mueller_matrices(self, intensities: np.ndarray) -> np.ndarray:
+        """
+        Least-squares estimate of the Mueller matrices of all pixels.
+
+        Args:
+            intensities: (n_measurements, ...) measured intensities, e.g. (n_measurements, height, width)
+
+        Returns: (..., 4, 4) Mueller matrices
+
+        """
+        intensities = np.asarray(intensities, dtype=float)
+        if intensities.shape[0] != self.instrument_matrix.shape[0]:
+            raise _helpers.InvalidInputError(f"Expected {self.instrument_matrix.shape[0]} intensities along the first "
+                                             f"axis, got {intensities.shape[0]}.")
+        flat = np.tensordot(self._pseudo_inverse, intensities, axes=1)
+        return np.moveaxis(flat, 0, -1).reshape(intensities.shape[1:] + (4, 4))
+
+    def find_characteristic_parameters(self, intensities: np.ndarray
+                                       ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+
+        Args:
+            intensities: (n_measurements, ...) measured intensities
+
+        Returns: delta [0-pi], theta [0-pi/4], omega [0-pi] of every pixel
+
+        """
+        return mueller_matrices_to_char_paras(self.recover_mueller_matrices(intensities))
+
+
+def mueller_matrices_to_char_paras(mueller_matrices: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Characteristic parameters of the optically equivalent model of many Mueller matrices.
+
+    Args:
+        mueller_matrices: (..., 4, 4) Mueller matrices (any overall scale)
+
+    Returns: delta [0-pi], theta [0-pi/4], omega [0-pi], each with the shape of the leading axes
+
+    """
+    mueller_matrices = np.asarray(mueller_matrices, dtype=float)
+    stokes_0_deg = np.moveaxis(mueller_matrices[..., :, 0] + mueller_matrices[..., :, 1], -1, 0)
+    stokes_45_deg = np.moveaxis(mueller_matrices[..., :, 0] + mueller_matrices[..., :, 2], -1, 0)
+    return stokes_images_to_char_paras_phi_0_and_45(stokes_0_deg, stokes_45_deg)
@@ -2,7 +2,8 @@ import math
 from dataclasses import dataclass
 
 import numpy as np
-from scipy import optimize
+
+from characteristicParameters import _helpers, solverBackends
 
 """
 Important:
@@ -10,6 +11,10 @@ Most of these functions refer to the measurement procedure described in section
 It is recommended to use the paper as a reference.
 """
 
+# Up to this number of measurements, the residual function R is evaluated with a plain loop over Python floats:
+# the call overhead of numpy on tiny arrays exceeds the work (the loop takes about half the time for 3 measurements)
+_MAX_MEASUREMENTS_OF_SCALAR_LOOP = 8
+
 
 @dataclass
 class MeasuredCharacteristicParameters:
@@ -21,6 +26,7 @@ class MeasuredCharacteristicParameters:
         delta: [rad] 0-pi
         theta: [rad] 0-pi/4 (but cannot distinguish between fast and slow axis)
         omega: [rad] 0-pi/2
+    If S3 is included in the residual, theta is in the range 0-pi (fast and slow axis are distinguished).
 
     Attributes:
         delta: [rad]
@@ -72,17 +78,34 @@ class MeasuredStokesVector:
     def get_S2_normalized(self):
         return self.S2 / self.S0
 
+    def get_S3_normalized(self):
+        return self.S3 / self.S0 if self.S3 is not None else None
+
 
 class OptimizationProcedure:
 
-    def __init__(self, measured_outgoing_stokes_parameters: list[MeasuredStokesVector]):
+    def __init__(self, measured_outgoing_stokes_parameters: list[MeasuredStokesVector], use_S3: bool = False):
         """
 
         Args:
             measured_outgoing_stokes_parameters: list containing instances of the MeasuredOutgoingStokesVector class
+            use_S3: include the measured S3 parameters in the residual vector (all measurements must contain S3).
+                    S3 changes sign when fast and slow axis are swapped, so theta is determined in the range 0-pi
+                    and the default search area of omega shrinks to 0-pi.
         """
 
+        if use_S3 and any(measurement.S3 is None for measurement in measured_outgoing_stokes_parameters):
+            raise _helpers.InvalidInputError("use_S3 requires all measurements to contain S3.")
         self.measured_stokes: list[MeasuredStokesVector] = measured_outgoing_stokes_parameters
+        self.use_S3 = use_S3
+
+        # The measurements as arrays, so that the residual vector can be evaluated without Python loops
+        self._phis = np.array([measurement.phi for measurement in self.measured_stokes], dtype=float)
+        self._S1 = np.array([measurement.get_S1_normalized() for measurement in self.measured_stokes], dtype=float)
+        self._S2 = np.array([measurement.get_S2_normalized() for measurement in self.measured_stokes], dtype=float)
+        self._S3 = np.array([measurement.get_S3_normalized() for measurement in self.measured_stokes], dtype=float) \
+            if use_S3 else np.empty(0)
+        self._residual_buffer = np.empty(0)
 
     def __str__(self):
         return f"{self.__class__.__name__}: {len(self.measured_stokes)} {MeasuredStokesVector.__name__}"
@@ -125,6 +148,46 @@ class OptimizationProcedure:
         return 0.5 * (math.sin(A) * (1 + math.cos(delta)) -
                       math.sin(B) * (1 - math.cos(delta)))
 
+    @staticmethod
+    def S1_S2_in_theory_arrays(phi, delta, theta, omega) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of Eqs. (8) and (9) in the paper.
+        All arguments are broadcast against each other.
+
+        Args:
+            phi: [rad]
+            delta: [rad]
+            theta: [rad]
+            omega: [rad]
+
+        Returns: S1, S2 parameters in the range 0-1
+
+        """
+        A = 2 * (np.asarray(phi) + omega)
+        B = A - 4 * np.asarray(theta)
+        cos_delta = np.cos(delta)
+        S1 = 0.5 * (np.cos(A) * (1 + cos_delta) + np.cos(B) * (1 - cos_delta))
+        S2 = 0.5 * (np.sin(A) * (1 + cos_delta) - np.sin(B) * (1 - cos_delta))
+        return S1, S2
+
+    @staticmethod
+    def S3_in_theory(phi, delta, theta, omega):
+        """
+        Last row of optical_equivalent_model (see muellerCalculus) applied to linearly polarized light at angle phi:
+            S3 = sin(delta) * sin(2 * theta - 2 * (phi + omega))
+        Accepts scalars and numpy arrays (broadcast against each other).
+
+        Args:
+            phi: [rad]
+            delta: [rad]
+            theta: [rad]
+            omega: [rad]
+
+        Returns: S3 parameter in the range -1-1
+
+        """
+        return np.sin(delta) * np.sin(2 * np.asarray(theta) - 2 * (np.asarray(phi) + omega))
+
     @staticmethod
     def convert_theta_to_specified_range(theta: float) -> float:
         """
@@ -163,25 +226,234 @@ class OptimizationProcedure:
         """
         Eq. (12) in the paper
         """
-        residual_vector = []
+        return list(self.residual_vector_r_array(delta, theta, omega))
 
-        for measurement in self.measured_stokes:
-            residual_vector.append(
-                measurement.get_S1_normalized() - OptimizationProcedure.S1_in_theory(phi=measurement.phi,
-                                                                                     delta=delta, theta=theta,
-                                                                                     omega=omega))
-            residual_vector.append(
-                measurement.get_S2_normalized() - OptimizationProcedure.S2_in_theory(phi=measurement.phi,
-                                                                                     delta=delta, theta=theta,
-                                                                                     omega=omega))
+    def n_residuals_per_measurement(self) -> int:
+        return 3 if self.use_S3 else 2
+
+    def n_residuals(self) -> int:
+        return self._phis.size * self.n_residuals_per_measurement()
+
+    def residual_vector_r_array(self, delta: float, theta: float, omega: float,
+                                out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Eq. (12) in the paper as an array (rows cycle through S1, S2 (and S3) of every measurement)
+
+        Args:
+            delta: [rad]
+            theta: [rad]
+            omega: [rad]
+            out: (n_residuals(),) array the residual vector is written to
 
-        return residual_vector
+        Returns: (n_residuals(),) residual vector (out if given)
+
+        """
+        out = np.empty(self.n_residuals()) if out is None else out
+        if out.shape != (self.n_residuals(),):
+            raise _helpers.InvalidInputError(f"out must have the shape ({self.n_residuals()},), not {out.shape}.")
+        # A view, also for strided 1-D arrays
+        rows = out.reshape(self._phis.size, self.n_residuals_per_measurement())
+        # Eqs. (8) and (9) with the scalar factors computed once
+        A = 2 * (self._phis + omega)
+        B = A - 4 * theta
+        cos_delta = math.cos(delta)
+        p, q = 0.5 * (1 + cos_delta), 0.5 * (1 - cos_delta)
+        np.subtract(self._S1, p * np.cos(A) + q * np.cos(B), out=rows[:, 0])
+        np.subtract(self._S2, p * np.sin(A) - q * np.sin(B), out=rows[:, 1])
+        if self.use_S3:
+            np.subtract(self._S3, math.sin(delta) * np.sin(2 * theta - A), out=rows[:, 2])
+        return out
 
     def residual_function_R(self, delta: float, theta: float, omega: float) -> float:
         """
         Eq. (13) in the Paper
         """
-        return np.linalg.norm(self.residual_vector_r(delta, theta, omega), ord=2)
+        if self._phis.size <= _MAX_MEASUREMENTS_OF_SCALAR_LOOP:
+            return math.sqrt(self._squared_residual_sum(delta, theta, omega))
+        if self._residual_buffer.size != self.n_residuals():
+            self._residual_buffer = np.empty(self.n_residuals())
+        residuals = self.residual_vector_r_array(delta, theta, omega, out=self._residual_buffer)
+        return math.sqrt(np.dot(residuals, residuals))
+
+    def _squared_residual_sum(self, delta: float, theta: float, omega: float) -> float:
+        cos_delta = math.cos(delta)
+        sin_delta = math.sin(delta)
+        p, q = 0.5 * (1 + cos_delta), 0.5 * (1 - cos_delta)
+        total = 0.0
+        for (index, phi) in enumerate(self._phis.tolist()):
+            A = 2 * (phi + omega)
+            B = A - 4 * theta
+            r1 = self._S1[index] - (p * math.cos(A) + q * math.cos(B))
+            r2 = self._S2[index] - (p * math.sin(A) - q * math.sin(B))
+            total += r1 * r1 + r2 * r2
+            if self.use_S3:
+                r3 = self._S3[index] - sin_delta * math.sin(2 * theta - A)
+                total += r3 * r3
+        return total
+
+    def residual_jacobian(self, delta: float, theta: float, omega: float, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Jacobian of the residual vector r (Eq. (12) in the paper) with respect to delta, theta and omega,
+        obtained by differentiating Eqs. (8) and (9).
+        The result is written to out, if given.
+
+        Returns: (2 * number of measurements, 3) or, with S3, (3 * number of measurements, 3),
+                 rows in the same order as residual_vector_r
+
+        """
+        A = 2 * (self._phis + omega)
+        B = A - 4 * theta
+        cos_delta = math.cos(delta)
+        sin_delta = math.sin(delta)
+
+        dS1 = np.stack([0.5 * sin_delta * (np.cos(B) - np.cos(A)),
+                        2 * (1 - cos_delta) * np.sin(B),
+                        -(np.sin(A) * (1 + cos_delta) + np.sin(B) * (1 - cos_delta))], axis=-1)
+        dS2 = np.stack([-0.5 * sin_delta * (np.sin(A) + np.sin(B)),
+                        2 * (1 - cos_delta) * np.cos(B),
+                        np.cos(A) * (1 + cos_delta) - np.cos(B) * (1 - cos_delta)], axis=-1)
+
+        derivatives = [dS1, dS2]
+        if self.use_S3:
+            C = 2 * theta - A
+            derivatives.append(np.stack([cos_delta * np.sin(C),
+                                         2 * sin_delta * np.cos(C),
+                                         -2 * sin_delta * np.cos(C)], axis=-1))
+
+        # r = measured - theory, the rows cycle through S1, S2 (and S3)
+        return np.negative(np.stack(derivatives, axis=1).reshape(-1, 3), out=out)
+
+    def _analytic_solution(self) -> np.ndarray:
+        """
+        Closed-form solution from the measurements at phi=0 and phi=pi/4 (section 2.4 in the paper)
+        """
+        from characteristicParameters.analyticFormulas import stokes_to_char_paras_phi_0_and_45
+
+        by_phi = {}
+        for measurement in self.measured_stokes:
+            for phi in (0, math.pi / 4):
+                if math.isclose(measurement.phi, phi, abs_tol=1e-9):
+                    by_phi[phi] = [measurement.S0, measurement.S1, measurement.S2]
+        if len(by_phi) < 2:
+            raise _helpers.InvalidInputError("The analytic backend requires measurements at phi=0 and phi=pi/4.")
+        return np.array(stokes_to_char_paras_phi_0_and_45(by_phi[0], by_phi[math.pi / 4]))
+
+    def default_ub_omega(self) -> float:
+        """
+        Upper boundary of omega if none is specified. Without S3, theta and omega are periodically continued to
+        [0, pi] and [0, 2pi] (see convert_theta_to_specified_range). With S3, theta has the period pi, so the
+        search area [0, pi] x [0, pi] of theta and omega contains a single minimum instead of four.
+        """
+        return math.pi if self.use_S3 else 2 * math.pi
+
+    def convert_to_specified_ranges(self, x) -> MeasuredCharacteristicParameters:
+        """
+        Args:
+            x: delta, theta, omega found by a solver
+
+        Returns: characteristic parameters with theta and omega in their measurement ranges
+                 (theta in the range 0-pi if S3 is used)
+
+        """
+        delta, theta, omega = self.convert_to_specified_ranges_array(x)
+        return MeasuredCharacteristicParameters(delta=delta, theta=theta, omega=omega)
+
+    def convert_to_specified_ranges_array(self, x, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Array version of convert_to_specified_ranges
+
+        Returns: (3,) delta, theta, omega (out if given)
+
+        """
+        out = np.empty(3) if out is None else out
+        out[0] = x[0]
+        out[1] = x[1] % math.pi if self.use_S3 else OptimizationProcedure.convert_theta_to_specified_range(x[1])
+        out[2] = OptimizationProcedure.convert_omega_to_specified_range(x[2])
+        return out
+
+    def solver_problem(self,
+                       lb_delta: float = 0,
+                       ub_delta: float = math.pi,
+                       lb_theta: float = 0,
+                       ub_theta: float = math.pi,
+                       lb_omega: float = 0,
+                       ub_omega: float | None = None) -> solverBackends.SolverProblem:
+        """
+        The minimization of the residual function R as a problem for the solver backends (see solverBackends)
+        (ub_omega defaults to default_ub_omega())
+
+        """
+        ub_omega = ub_omega if ub_omega is not None else self.default_ub_omega()
+        return solverBackends.SolverProblem(
+            objective=lambda x: self.residual_function_R(delta=x[0], theta=x[1], omega=x[2]),
+            bounds=[(lb_delta, ub_delta), (lb_theta, ub_theta), (lb_omega, ub_omega)],
+            residuals=lambda x: self.residual_vector_r_array(delta=x[0], theta=x[1], omega=x[2]),
+            jacobian=lambda x: self.residual_jacobian(delta=x[0], theta=x[1], omega=x[2]),
+            analytic=self._analytic_solution)
+
+    def find_characteristic_parameters_array(self,
+                                             lb_delta: float = 0,
+                                             ub_delta: float = math.pi,
+                                             lb_theta: float = 0,
+                                             ub_theta: float = math.pi,
+                                             lb_omega: float = 0,
+                                             ub_omega: float | None = None,
+                                             strategy: str = "rand1exp",
+                                             backend: str = "differential_evolution",
+                                             backend_options: dict | None = None,
+                                             use_lut: bool = False,
+                                             lut_seeds: int = 4,
+                                             out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Finds the characteristic parameters by finding the minimum of the residual function R.
+        By default, the scipy differential evolution is used.
+        With use_lut, the closest entries of the lookup table of this phi set (see lookupTable) are the starts of
+        a local least-squares solve instead (no global search). It cannot be combined with another backend or with
+        backend_options (InvalidInputError).
+
+        Args:
+            lb_delta: lower boundary of delta
+            ub_delta: upper boundary of delta
+            lb_theta: lower boundary of theta
+            ub_theta: upper boundary of theta
+            lb_omega: lower boundary of omega
+            ub_omega: upper boundary of omega (default: default_ub_omega())
+            strategy: differential evolution strategy
+            backend: name of the solver backend (see solverBackends.available_backends)
+            backend_options: additional keyword arguments of the backend
+            use_lut: start a local solve from the lookup table instead of using the backend. The lower boundaries of
+                     theta and omega are moved down by a quarter and a half period, so the solve of a start on the
+                     grid rows at lb_theta and lb_omega can reach a minimum just below them (it is wrapped back).
+            lut_seeds: number of closest lookup table entries the local solve is started from
+            out: (3,) array the result is written to (e.g. a pixel of a preallocated image)
+
+        Returns: (3,) delta, theta, omega (out if given)
+
+        """
+        options = dict(backend_options or {})
+        if use_lut:
+            from characteristicParameters.lookupTable import get_lookup_table
+
+            if backend != "differential_evolution" or options:
+                raise _helpers.InvalidInputError("use_lut runs its own least-squares solve, it cannot be combined "
+                                                 "with a backend or backend_options.")
+            table = get_lookup_table([measurement.phi for measurement in self.measured_stokes])
+            features = [(measurement.get_S1_normalized(), measurement.get_S2_normalized())
+                        for measurement in self.measured_stokes]
+            backend = "least_squares"
+            # Noise and the ambiguities of the measurement (section 2.3) can make the closest grid point a poor
+            # start, so the local solve is started from the few closest ones
+            options = {"x0": table.nearest(np.ravel(features), k=lut_seeds)}
+            # theta and omega are periodic: a minimum just below the grid rows at the lower boundaries is the same
+            # as one just below pi/2 and pi
+            lb_theta, lb_omega = lb_theta - math.pi / 4, lb_omega - math.pi / 2
+        elif backend == "differential_evolution":
+            options.setdefault("strategy", strategy)
+        problem = self.solver_problem(lb_delta=lb_delta, ub_delta=ub_delta, lb_theta=lb_theta, ub_theta=ub_theta,
+                                      lb_omega=lb_omega, ub_omega=ub_omega)
+        result = solverBackends.solve(problem, backend=backend, **options)
+
+        return self.convert_to_specified_ranges_array(result.x, out=out)
 
     def find_characteristic_parameters(self,
                                        lb_delta: float = 0,
@@ -189,12 +461,19 @@ class OptimizationProcedure:
                                        lb_theta: float = 0,
                                        ub_theta: float = math.pi,
                                        lb_omega: float = 0,
-                                       ub_omega: float = 2 * math.pi,
+                                       ub_omega: float | None = None,
                                        strategy: str = "rand1exp",
+                                       backend: str = "differential_evolution",
+                                       backend_options: dict | None = None,
+                                       use_lut: bool = False,
+                                       lut_seeds: int = 4,
                                        ) -> MeasuredCharacteristicParameters:
         """
-        Finds the characteristic parameters by finding the minimum of the residual function R using
-        the scipy differential evolution.
+        Finds the characteristic parameters by finding the minimum of the residual function R.
+        By default, the scipy differential evolution is used.
+        With use_lut, the closest entries of the lookup table of this phi set (see lookupTable) are the starts of
+        a local least-squares solve instead (no global search). It cannot be combined with another backend or with
+        backend_options (InvalidInputError).
 
         Args:
             lb_delta: lower boundary of delta
@@ -202,26 +481,104 @@ class OptimizationProcedure:
             lb_theta: lower boundary of theta
             ub_theta: upper boundary of theta
             lb_omega: lower boundary of omega
-            ub_omega: upper boundary of omega
+            ub_omega: upper boundary of omega (default: default_ub_omega())
             strategy: differential evolution strategy
+            backend: name of the solver backend (see solverBackends.available_backends)
+            backend_options: additional keyword arguments of the backend
+            use_lut: start a local solve from the lookup table instead of using the backend
+                     (see find_characteristic_parameters_array)
+            lut_seeds: number of closest lookup table entries the local solve is started from
 
         Returns: class MeasuredCharacteristicParameters containing the characteristic parameters
 
         """
+        delta, theta, omega = self.find_characteristic_parameters_array(
+            lb_delta=lb_delta, ub_delta=ub_delta, lb_theta=lb_theta, ub_theta=ub_theta, lb_omega=lb_omega,
+            ub_omega=ub_omega, strategy=strategy, backend=backend, backend_options=backend_options, use_lut=use_lut,
+            lut_seeds=lut_seeds)
+        return MeasuredCharacteristicParameters(delta=delta, theta=theta, omega=omega)
+
+
+class IncrementalOptimizationProcedure(OptimizationProcedure):
+    """
+    Optimization procedure for measurements that arrive one orientation phi at a time (e.g. a rotating polarizer).
+    Every new measurement updates the cached measurement arrays and re-polishes the previous optimum with a local
+    least-squares solve. The global search only runs for the first solution and whenever the polished
+    solution does not explain the measurements any more (the residual jumps).
+    """
+
+    def __init__(self,
+                 measured_outgoing_stokes_parameters: list[MeasuredStokesVector] | None = None,
+                 residual_threshold: float = 1e-2,
+                 strategy: str = "rand1exp",
+                 backend: str = "differential_evolution",
+                 use_S3: bool = False):
+        """
 
-        def func(x) -> float:
-            return self.residual_function_R(delta=x[0], theta=x[1], omega=x[2])
+        Args:
+            measured_outgoing_stokes_parameters: measurements available at the start (can be empty)
+            residual_threshold: the global search reruns if the root mean square of the residual vector r
+                                (Eq. (12) in the paper) of the polished solution exceeds this value
+            strategy: differential evolution strategy of the global search
+            backend: solver backend of the global search (see solverBackends.available_backends)
+            use_S3: include the measured S3 parameters in the residual vector (see OptimizationProcedure)
+        """
+        super().__init__([], use_S3=use_S3)
+        self.residual_threshold = residual_threshold
+        self.strategy = strategy
+        self.backend = backend
+
+        self._solution: np.ndarray | None = None
+        self.n_global_searches = 0
+        self.n_local_updates = 0
+
+        for measurement in measured_outgoing_stokes_parameters or []:
+            self._append(measurement)
+
+    def _append(self, measurement: MeasuredStokesVector) -> None:
+        if self.use_S3 and measurement.S3 is None:
+            raise _helpers.InvalidInputError("use_S3 requires all measurements to contain S3.")
+        self.measured_stokes.append(measurement)
+        self._phis = np.append(self._phis, measurement.phi)
+        self._S1 = np.append(self._S1, measurement.get_S1_normalized())
+        self._S2 = np.append(self._S2, measurement.get_S2_normalized())
+        if self.use_S3:
+            self._S3 = np.append(self._S3, measurement.get_S3_normalized())
+
+    def rms_residual(self, delta: float, theta: float, omega: float) -> float:
+        return float(np.sqrt(np.mean(self.residual_vector_r_array(delta, theta, omega) ** 2)))
+
+    def _global_search(self) -> np.ndarray:
+        self.n_global_searches += 1
+        options = {"strategy": self.strategy} if self.backend == "differential_evolution" else {}
+        return solverBackends.solve(self.solver_problem(), backend=self.backend, **options).x
+
+    def add_measurement(self, measurement: MeasuredStokesVector) -> MeasuredCharacteristicParameters | None:
+        """
+        Adds a measurement and updates the solution.
 
-        result = optimize.differential_evolution(func=func,
-                                                 bounds=((lb_delta, ub_delta),
-                                                         (lb_theta, ub_theta),
-                                                         (lb_omega, ub_omega)),
-                                                 strategy=strategy)
+        Args:
+            measurement: measurement at a new orientation phi
 
-        delta_tilde = result.x[0]
-        theta_tilde = OptimizationProcedure.convert_theta_to_specified_range(result.x[1])
-        omega_tilde = OptimizationProcedure.convert_omega_to_specified_range(result.x[2])
+        Returns: updated characteristic parameters (None as long as fewer than two measurements are available,
+                 the three parameters are not determined by a single one)
 
-        return MeasuredCharacteristicParameters(delta=delta_tilde,
-                                                theta=theta_tilde,
-                                                omega=omega_tilde)
+        """
+        self._append(measurement)
+        if len(self.measured_stokes) < 2:
+            return None
+
+        if self._solution is None:
+            self._solution = self._global_search()
+        else:
+            self.n_local_updates += 1
+            polished = solverBackends.solve(self.solver_problem(), backend="least_squares", x0=self._solution).x
+            if self.rms_residual(*polished) > self.residual_threshold:
+                polished = self._global_search()
+            self._solution = polished
+        return self.get_characteristic_parameters()
+
+    def get_characteristic_parameters(self) -> MeasuredCharacteristicParameters | None:
+        if self._solution is None:
+            return None
+        return self.convert_to_specified_ranges(self._solution)
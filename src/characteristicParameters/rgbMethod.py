@@ -4,9 +4,8 @@ from dataclasses import dataclass
 from typing import Callable
 
 import numpy as np
-from characteristicParameters import _helpers
-from characteristicParameters.triangle_wave_functions import T_pi
-from scipy import optimize
+from characteristicParameters import _helpers, solverBackends
+from characteristicParameters.triangle_wave_functions import T_pi, T_pi_array
 
 """
 Important:
@@ -75,6 +74,50 @@ def convert_retardation_to_different_wavelength(k_function: Callable[[float], fl
             * delta_1)
 
 
+def error_function_E_arrays(measured_deltas: np.ndarray,
+                            wavelengths: np.ndarray,
+                            k_function: Callable[[float], float],
+                            delta_r: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of Eq. (27) in the paper for many locations and many retardations at once.
+    The reference wavelength is wavelengths[0].
+
+    Args:
+        measured_deltas: [rad] (n_locations, n_wavelengths) measured retardations in the range 0-pi
+        wavelengths: (n_wavelengths,)
+        k_function: a reduced_birefringence_function (must accept numpy arrays)
+        delta_r: [rad] (n_locations, n_candidates) retardations at the reference wavelength
+
+    Returns: (n_locations, n_candidates) error function E of every location and candidate
+
+    """
+    locations = MeasuredRetardationsAtManyLocations(wavelengths=wavelengths,
+                                                    deltas=measured_deltas,
+                                                    reduced_birefringence_function=k_function)
+    return locations.error_function_E(delta_r)
+
+
+def branch_candidates(delta_r_measured: np.ndarray, lb_delta: float, ub_delta: float) -> np.ndarray:
+    """
+    All retardations 2*pi*n +- delta_r_measured inside [lb_delta, ub_delta],
+    i.e. all solutions of T_pi(delta_r) = delta_r_measured
+
+    Args:
+        delta_r_measured: [rad] (n_locations,) measured retardations at the reference wavelength (0-pi)
+        lb_delta: lower boundary of the search area
+        ub_delta: upper boundary of the search area
+
+    Returns: (n_locations, n_candidates), candidates outside of the search area are NaN
+
+    """
+    orders = np.arange(math.floor(lb_delta / (2 * math.pi)), math.ceil(ub_delta / (2 * math.pi)) + 1)
+    delta_r_measured = np.asarray(delta_r_measured, dtype=float)[:, np.newaxis]
+    candidates = np.concatenate([2 * math.pi * orders - delta_r_measured,
+                                 2 * math.pi * orders + delta_r_measured], axis=1)
+    candidates[(candidates < lb_delta) | (candidates > ub_delta)] = np.nan
+    return candidates
+
+
 class MeasuredRetardationsAtOneLocation:
 
     def __init__(self,
@@ -102,6 +145,13 @@ class MeasuredRetardationsAtOneLocation:
 
         self.k_function: Callable[[float], float] = reduced_birefringence_function
 
+        # The measured retardations and the factors of Eq. (5) in the paper (delta(lambda) = factor * delta_r)
+        # as arrays, so that the error vector can be evaluated without Python loops
+        self._deltas = np.array([measurement.delta for measurement in self.all_measurements], dtype=float)
+        self._factors = np.array([convert_retardation_to_different_wavelength(
+            k_function=reduced_birefringence_function, wavelength_1=self.get_reference_wavelength(), delta_1=1.0,
+            wavelength_2=measurement.wavelength) for measurement in self.all_measurements], dtype=float)
+
     def __str__(self):
         return (f"Class {self.__class__.__name__}: reference wavelength {self.get_reference_wavelength()}, "
                 f"{len(self.all_measurements)} {RetardationMeasurement.__name__}")
@@ -117,19 +167,20 @@ class MeasuredRetardationsAtOneLocation:
             delta_r: retardation of the light at the reference wavelength
 
         """
+        return list(self.error_vector_e_array(delta_r))
 
-        vector = []
-        for measured_lambda_delta in self.all_measurements:
-            delta_in = convert_retardation_to_different_wavelength(
-                k_function=self.k_function,
-                wavelength_1=self.get_reference_wavelength(),
-                delta_1=delta_r,
-                wavelength_2=measured_lambda_delta.wavelength
-            )
+    def error_vector_e_array(self, delta_r: float, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Eq. (26) in the paper as an array (one element per measurement, see self.all_measurements)
+
+        Args:
+            delta_r: retardation of the light at the reference wavelength
+            out: (number of measurements,) array the error vector is written to
 
-            vector.append(measured_lambda_delta.delta - T_pi(delta_in))
+        Returns: error vector (out if given)
 
-        return vector
+        """
+        return np.subtract(self._deltas, T_pi(delta_r * self._factors), out=out)
 
     def error_function_E(self, delta_r: float):
         """
@@ -139,7 +190,56 @@ class MeasuredRetardationsAtOneLocation:
             delta_r: retardation at the reference wavelength (see self.reference_wavelength)
 
         """
-        return np.linalg.norm(self.error_vector_e(delta_r), ord=2)
+        # A plain loop over Python floats, numpy calls on arrays of a few wavelengths cost more than the work
+        squared_sum = 0.0
+        for (delta, factor) in zip(self._deltas.tolist(), self._factors.tolist()):
+            error = delta - T_pi(delta_r * factor)
+            squared_sum += error * error
+        return math.sqrt(squared_sum)
+
+    def _branch_scan_solution(self, lb_delta: float, ub_delta: float) -> np.ndarray:
+        delta_r, _ = MeasuredRetardationsAtManyLocations.from_locations([self]).find_delta_r(lb_delta=lb_delta,
+                                                                                             ub_delta=ub_delta)
+        return delta_r
+
+    def solver_problem(self, lb_delta: float = 0, ub_delta: float = 50 * math.pi) -> solverBackends.SolverProblem:
+        """
+        The minimization of Eq. (27) in the paper as a problem for the solver backends (see solverBackends).
+        The "analytic" backend evaluates E at every branch of the reference wavelength.
+
+        """
+        return solverBackends.SolverProblem(
+            objective=lambda x: self.error_function_E(delta_r=x[0]),
+            bounds=[(lb_delta, ub_delta)],
+            residuals=lambda x: self.error_vector_e_array(delta_r=x[0]),
+            analytic=lambda: self._branch_scan_solution(lb_delta, ub_delta))
+
+    def find_delta_r(self,
+                     lb_delta: float = 0,
+                     ub_delta: float = 50 * math.pi,
+                     strategy: str = "rand2exp",
+                     backend: str = "differential_evolution",
+                     backend_options: dict | None = None) -> float:
+        """
+        Finds the minimum of Eq. (27) in the paper for this location on its own
+
+        Args:
+            lb_delta: lower boundary of the search area (default is 0)
+            ub_delta: upper boundary of the search area (default is 50 pi)
+            strategy: strategy of the differential evolution (see scipy documentation)
+            backend: name of the solver backend (see solverBackends.available_backends)
+            backend_options: additional keyword arguments of the backend
+
+        Returns: retardation at the reference wavelength
+
+        """
+        options = dict(backend_options or {})
+        if backend == "differential_evolution":
+            options.setdefault("strategy", strategy)
+        result = solverBackends.solve(self.solver_problem(lb_delta=lb_delta, ub_delta=ub_delta),
+                                      backend=backend, **options)
+
+        return result.x[0]
 
 
 class MultipleNeighboringLocations:
@@ -190,7 +290,9 @@ class MultipleNeighboringLocations:
                                      k: float,
                                      lb_delta: float = 0,
                                      ub_delta: float = 50 * math.pi,
-                                     strategy: str = "rand2exp"):
+                                     strategy: str = "rand2exp",
+                                     backend: str = "differential_evolution",
+                                     backend_options: dict | None = None):
         """
         Finds the minimum of Eq. (32) in the paper
 
@@ -202,22 +304,141 @@ class MultipleNeighboringLocations:
             lb_delta: lower boundary of the search area (default i 0)
             ub_delta: upper boundary of the search area (default is 50 pi)
             strategy: strategy of the differential evolution (see scipy documentation)
+            backend: name of the solver backend (see solverBackends.available_backends)
+            backend_options: additional keyword arguments of the backend
 
         Returns: list of retardations at the reference wavelength
 
         """
 
-        # func:
-        def func(x):
-            return self.collective_error_function_L(delta_rs=x, k=k)
-
         # define boundaries:
         bounds = []
         for _ in self.locations:
             bounds.append((lb_delta, ub_delta))
 
-        optimization_result = optimize.differential_evolution(func=func,
-                                                              bounds=bounds,
-                                                              strategy=strategy)
+        problem = solverBackends.SolverProblem(objective=lambda x: self.collective_error_function_L(delta_rs=x, k=k),
+                                               bounds=bounds)
+        options = dict(backend_options or {})
+        if backend == "differential_evolution":
+            options.setdefault("strategy", strategy)
+        result = solverBackends.solve(problem, backend=backend, **options)
+
+        return result.x
+
+
+class MeasuredRetardationsAtManyLocations:
+    """
+    Array-backed counterpart of MeasuredRetardationsAtOneLocation for many locations and many wavelengths
+    (e.g. hyperspectral measurements). The first wavelength is the reference wavelength.
+    """
 
-        return optimization_result.x
+    def __init__(self,
+                 wavelengths: list[float] | np.ndarray,
+                 deltas: np.ndarray,
+                 reduced_birefringence_function: Callable[[float], float],
+                 dtype=np.float64):
+        """
+
+        Args:
+            wavelengths: (n_wavelengths,) the first one is the reference wavelength
+            deltas: [rad] (n_locations, n_wavelengths) measured retardations in the range 0-pi
+            reduced_birefringence_function: k(lambda), must accept numpy arrays
+                                            (e.g. define_reduced_birefringence_function)
+            dtype: dtype in which the error function is evaluated (float32: see the accuracy budget in the README).
+                   find_delta_r only ranks the branches in dtype and returns them in float64.
+
+        """
+        self.wavelengths = np.asarray(wavelengths, dtype=float)
+        self.dtype = np.dtype(dtype)
+        self.deltas = np.atleast_2d(np.asarray(deltas, dtype=dtype))
+        if self.deltas.shape[1] != self.wavelengths.size:
+            raise _helpers.InvalidInputError(f"deltas contains {self.deltas.shape[1]} wavelengths, "
+                                             f"but {self.wavelengths.size} wavelengths were specified.")
+        self.k_function: Callable[[float], float] = reduced_birefringence_function
+
+        # Eq. (5) in the paper: delta(lambda) = factor(lambda) * delta_r
+        self._factors = (self.wavelengths[0] / self.wavelengths
+                         * reduced_birefringence_function(self.wavelengths)
+                         / reduced_birefringence_function(self.wavelengths[0])).astype(dtype)
+
+    def __str__(self):
+        return (f"Class {self.__class__.__name__}: reference wavelength {self.get_reference_wavelength()}, "
+                f"{self.deltas.shape[0]} locations, {self.wavelengths.size} wavelengths")
+
+    @classmethod
+    def from_locations(cls,
+                       locations: list[MeasuredRetardationsAtOneLocation]) -> "MeasuredRetardationsAtManyLocations":
+        """
+        All locations must have been measured at the same wavelengths (in the same order).
+
+        """
+        wavelengths = [measurement.wavelength for measurement in locations[0].all_measurements]
+        deltas = [[measurement.delta for measurement in location.all_measurements] for location in locations]
+        return cls(wavelengths=wavelengths, deltas=np.array(deltas),
+                   reduced_birefringence_function=locations[0].k_function)
+
+    def get_reference_wavelength(self) -> float:
+        return float(self.wavelengths[0])
+
+    def _broadcast_candidates(self, delta_r) -> np.ndarray:
+        delta_r = np.asarray(delta_r, dtype=self.dtype)
+        if delta_r.ndim <= 1:
+            delta_r = np.broadcast_to(np.atleast_1d(delta_r), (self.deltas.shape[0], delta_r.size))
+        return delta_r
+
+    def error_vectors_e(self, delta_r: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Eq. (26) in the paper for all locations and candidates
+
+        Args:
+            delta_r: [rad] (n_candidates,) shared by all locations or (n_locations, n_candidates)
+            out: (n_locations, n_candidates, n_wavelengths) array the error vectors are written to
+
+        Returns: (n_locations, n_candidates, n_wavelengths) (out if given)
+
+        """
+        delta_r = self._broadcast_candidates(delta_r)
+        return np.subtract(self.deltas[:, np.newaxis, :], T_pi_array(delta_r[..., np.newaxis] * self._factors,
+                                                                     dtype=self.dtype), out=out)
+
+    def error_function_E(self, delta_r: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Eq. (27) in the paper for all locations and candidates.
+        The wavelengths are accumulated one after another, so the memory use does not grow with their number.
+
+        Args:
+            delta_r: [rad] (n_candidates,) shared by all locations or (n_locations, n_candidates)
+            out: (n_locations, n_candidates) array E is written to
+
+        Returns: (n_locations, n_candidates) (out if given)
+
+        """
+        delta_r = self._broadcast_candidates(delta_r)
+        squared_sum = np.zeros(delta_r.shape, dtype=self.dtype) if out is None else out
+        squared_sum[...] = 0
+        difference = np.empty(delta_r.shape, dtype=self.dtype)
+        for (index, factor) in enumerate(self._factors):
+            np.multiply(delta_r, factor, out=difference)
+            T_pi_array(difference, dtype=self.dtype, out=difference)
+            np.subtract(self.deltas[:, [index]], difference, out=difference)
+            squared_sum += np.square(difference, out=difference)
+        return np.sqrt(squared_sum, out=squared_sum)
+
+    def find_delta_r(self, lb_delta: float = 0, ub_delta: float = 50 * math.pi) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluates E at every branch 2*pi*n +- delta of the reference wavelength (see branch_candidates)
+        and returns the best one of every location.
+
+        Args:
+            lb_delta: lower boundary of the search area (default is 0)
+            ub_delta: upper boundary of the search area (default is 50 pi)
+
+        Returns: (n_locations,) retardations at the reference wavelength and (n_locations,) their error E
+
+        """
+        candidates = branch_candidates(self.deltas[:, 0], lb_delta=lb_delta, ub_delta=ub_delta)
+        errors = self.error_function_E(np.nan_to_num(candidates))
+        errors[np.isnan(candidates)] = np.inf
+        best = np.argmin(errors, axis=1)
+        rows = np.arange(candidates.shape[0])
+        return candidates[rows, best], errors[rows, best]
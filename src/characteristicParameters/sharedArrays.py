@@ -0,0 +1,81 @@
+import sys
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+"""
+NumPy arrays backed by multiprocessing.shared_memory.
+The owner creates the block, worker processes attach to it with the (picklable) descriptor,
+so large images are never pickled or copied per worker.
+"""
+
+
+@dataclass(frozen=True)
+class SharedArrayDescriptor:
+    """
+    Everything a different process needs to attach to a SharedArray (a few bytes when pickled)
+
+    Attributes:
+        name: name of the shared memory block
+        shape: shape of the array
+        dtype: dtype of the array (numpy name)
+    """
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+class SharedArray:
+
+    def __init__(self, memory: shared_memory.SharedMemory, shape: tuple[int, ...], dtype, owner: bool):
+        """
+        Use SharedArray.create, SharedArray.from_array or SharedArray.attach instead.
+
+        Args:
+            memory: shared memory block holding the data
+            shape: shape of the array
+            dtype: dtype of the array
+            owner: the owner unlinks the block when it is closed
+        """
+        self._memory = memory
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        self.descriptor = SharedArrayDescriptor(name=memory.name, shape=tuple(shape), dtype=np.dtype(dtype).name)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}: {self.descriptor}"
+
+    @classmethod
+    def create(cls, shape: tuple[int, ...], dtype) -> "SharedArray":
+        n_bytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return cls(shared_memory.SharedMemory(create=True, size=n_bytes), shape, dtype, owner=True)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "SharedArray":
+        shared = cls.create(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor: SharedArrayDescriptor) -> "SharedArray":
+        if sys.version_info >= (3, 13):
+            memory = shared_memory.SharedMemory(name=descriptor.name, track=False)
+        else:
+            # Child processes of multiprocessing share the resource tracker of the owner,
+            # so registering the block again is a no-op and it is only unlinked by the owner
+            memory = shared_memory.SharedMemory(name=descriptor.name)
+        return cls(memory, descriptor.shape, descriptor.dtype, owner=False)
+
+    def close(self) -> None:
+        # The array must not outlive the buffer it points to
+        self.array = None
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,202 @@
+import itertools
+from dataclasses import dataclass, replace
+from typing import Callable
+
+import numpy as np
+
+from characteristicParameters import _helpers
+
+"""
+Pluggable solver backends for the fitting classes.
+
+A fitting class (e.g. OptimizationProcedure or MultipleNeighboringLocations) describes its minimization
+problem with a SolverProblem; a backend takes the problem and returns a SolverResult.
+Backends are looked up by name in a registry, so the backend can be chosen per job and new backends
+can be added with register_backend without editing the fitting classes.
+scipy is imported inside the backends, it dominates the import time of the package.
+"""
+
+
+@dataclass
+class SolverProblem:
+    """
+    Attributes:
+        objective: x -> scalar function to be minimized
+        bounds: (lower, upper) boundary of every element of x
+        residuals: x -> residual vector whose norm is the objective (enables least-squares backends)
+        jacobian: x -> (n_residuals, n_parameters) Jacobian of the residual vector
+        analytic: () -> x, closed-form solution of the problem (enables the "analytic" backend)
+    """
+    objective: Callable[[np.ndarray], float]
+    bounds: list[tuple[float, float]]
+    residuals: Callable[[np.ndarray], np.ndarray] | None = None
+    jacobian: Callable[[np.ndarray], np.ndarray] | None = None
+    analytic: Callable[[], np.ndarray] | None = None
+
+
+@dataclass
+class SolverResult:
+    """
+    Attributes:
+        x: solution
+        fun: objective at the solution
+        n_evaluations: number of evaluations of the objective, the residual vector and its Jacobian
+        backend: name of the backend that produced the result
+        success: whether the backend reported convergence
+    """
+    x: np.ndarray
+    fun: float
+    n_evaluations: int
+    backend: str
+    success: bool = True
+
+
+SolverBackend = Callable[..., SolverResult]
+
+_BACKENDS: dict[str, SolverBackend] = {}
+
+
+def register_backend(name: str, backend: SolverBackend | None = None):
+    """
+    Registers a backend under a name. Can be used as a decorator:
+
+        @register_backend("my_backend")
+        def my_backend(problem: SolverProblem, **options) -> SolverResult: ...
+
+    Args:
+        name: name used to select the backend
+        backend: problem, **options -> SolverResult
+
+    """
+    def decorator(function: SolverBackend) -> SolverBackend:
+        _BACKENDS[name] = function
+        return function
+
+    return decorator if backend is None else decorator(backend)
+
+
+def get_backend(name: str) -> SolverBackend:
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise _helpers.InvalidInputError(f"Unknown solver backend {name!r}. "
+                                         f"Available backends: {', '.join(available_backends())}") from None
+
+
+def available_backends() -> list[str]:
+    return list(_BACKENDS)
+
+
+class _Counter:
+
+    def __init__(self, function: Callable | None):
+        self.function = function
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+        return self.function(*args)
+
+
+def solve(problem: SolverProblem, backend: str = "differential_evolution", **options) -> SolverResult:
+    """
+    Solves the problem with the backend registered under the given name.
+
+    Args:
+        problem: minimization problem
+        backend: name of the backend (see available_backends)
+        **options: passed on to the backend (e.g. strategy for differential_evolution)
+
+    Returns: result of the backend, with the number of function evaluations counted here
+
+    """
+    function = get_backend(backend)
+    counters = [_Counter(f) if f is not None else None
+                for f in (problem.objective, problem.residuals, problem.jacobian)]
+    counted_problem = replace(problem, objective=counters[0], residuals=counters[1], jacobian=counters[2])
+    result = function(counted_problem, **options)
+    result.n_evaluations = sum(counter.count for counter in counters if counter is not None)
+    result.backend = backend
+    return result
+
+
+def _result(x, problem: SolverProblem, success: bool = True) -> SolverResult:
+    x = np.asarray(x, dtype=float)
+    return SolverResult(x=x, fun=float(problem.objective(x)), n_evaluations=0, backend="", success=bool(success))
+
+
+@register_backend("differential_evolution")
+def differential_evolution(problem: SolverProblem, strategy: str = "rand1exp", **options) -> SolverResult:
+    from scipy import optimize
+
+    result = optimize.differential_evolution(func=problem.objective, bounds=problem.bounds,
+                                             strategy=strategy, **options)
+    return SolverResult(x=result.x, fun=float(result.fun), n_evaluations=0, backend="", success=result.success)
+
+
+@register_backend("dual_annealing")
+def dual_annealing(problem: SolverProblem, **options) -> SolverResult:
+    from scipy import optimize
+
+    result = optimize.dual_annealing(func=problem.objective, bounds=problem.bounds, **options)
+    return SolverResult(x=result.x, fun=float(result.fun), n_evaluations=0, backend="", success=result.success)
+
+
+def _least_squares_from(problem: SolverProblem, x0: np.ndarray):
+    from scipy import optimize
+
+    lower, upper = np.array(problem.bounds, dtype=float).T
+    return optimize.least_squares(problem.residuals, np.clip(x0, lower, upper), bounds=(lower, upper),
+                                  jac=problem.jacobian if problem.jacobian is not None else "2-point")
+
+
+@register_backend("least_squares")
+def least_squares(problem: SolverProblem, x0: np.ndarray | None = None, n_starts: int = 8,
+                  seed: int | np.random.Generator | None = None) -> SolverResult:
+    """
+    Bounded trust-region least squares (scipy.optimize.least_squares) on the residual vector.
+    It is a local solver: it is started from x0 (one start point or one per row) or, without x0,
+    from n_starts random points drawn with np.random.default_rng(seed). The best solution is kept.
+
+    """
+    if problem.residuals is None:
+        raise _helpers.InvalidInputError("The least_squares backend requires a residual vector.")
+    lower, upper = np.array(problem.bounds, dtype=float).T
+    if x0 is not None:
+        starts = np.atleast_2d(np.asarray(x0, dtype=float))
+    else:
+        rng = np.random.default_rng(seed)
+        starts = [rng.uniform(lower, upper) for _ in range(n_starts)]
+    best = min((_least_squares_from(problem, start) for start in starts), key=lambda result: result.cost)
+    return _result(best.x, problem, success=best.success)
+
+
+@register_backend("grid+polish")
+def grid_polish(problem: SolverProblem, points_per_dimension: int = 16, max_grid_points: int = 1_000_000
+                ) -> SolverResult:
+    """
+    Evaluates the objective on a regular grid over the bounds and polishes the best grid point with a local solver
+    (least squares if a residual vector is available, L-BFGS-B otherwise).
+
+    """
+    n_grid_points = points_per_dimension ** len(problem.bounds)
+    if n_grid_points > max_grid_points:
+        raise _helpers.InvalidInputError(f"The grid would have {n_grid_points} points (more than {max_grid_points}),"
+                                         f" use a global backend for {len(problem.bounds)} parameters.")
+    axes = [np.linspace(lower, upper, points_per_dimension) for (lower, upper) in problem.bounds]
+    best_x = min((np.array(point) for point in itertools.product(*axes)), key=problem.objective)
+
+    if problem.residuals is not None:
+        polished = _least_squares_from(problem, best_x)
+    else:
+        from scipy import optimize
+
+        polished = optimize.minimize(problem.objective, best_x, method="L-BFGS-B", bounds=problem.bounds)
+    return _result(polished.x, problem, success=polished.success)
+
+
+@register_backend("analytic")
+def analytic(problem: SolverProblem) -> SolverResult:
+    if problem.analytic is None:
+        raise _helpers.InvalidInputError("This problem has no closed-form solution, choose a different backend.")
+    return _result(problem.analytic(), problem)
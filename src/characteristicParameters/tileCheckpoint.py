@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from characteristicParameters import _helpers
+
+"""
+Incremental persistence of solved tiles, so that long image jobs can be resumed after an interruption.
+
+Layout of a checkpoint directory:
+    manifest.json       fingerprint of the job and the indices of all completed tiles
+    tile_<index>.npy    result of one tile
+Both kinds of files are written to a temporary file first and then renamed (atomic on POSIX and Windows),
+so an interruption can never leave a half written tile or manifest behind.
+"""
+
+
+def _atomic_write(path: Path, write) -> None:
+    file_descriptor, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def fingerprint_array(array: np.ndarray) -> str:
+    """
+    Returns: sha256 hex digest of the shape, dtype and content of the array
+
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.shape}{array.dtype}".encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+
+class TileCheckpoint:
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, directory: str | os.PathLike, fingerprint: dict):
+        """
+
+        Args:
+            directory: checkpoint directory (created if necessary)
+            fingerprint: JSON serializable description of the job (input hash, tiling, solver settings).
+                         An existing checkpoint is only resumed if its fingerprint is identical.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Normalize (e.g. tuples become lists) so that it compares equal to the stored version
+        self.fingerprint = json.loads(json.dumps(fingerprint))
+        self.completed: set[int] = set()
+
+        manifest_path = self.directory / self.MANIFEST_NAME
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest["fingerprint"] != self.fingerprint:
+                raise _helpers.InvalidInputError(f"The checkpoint in {self.directory} belongs to a different job.")
+            self.completed = set(manifest["completed"])
+
+    def __str__(self):
+        return f"{self.__class__.__name__}: {len(self.completed)} completed tiles in {self.directory}"
+
+    def _tile_path(self, tile_index: int) -> Path:
+        return self.directory / f"tile_{tile_index}.npy"
+
+    def is_completed(self, tile_index: int) -> bool:
+        return tile_index in self.completed
+
+    def load(self, tile_index: int) -> np.ndarray:
+        return np.load(self._tile_path(tile_index))
+
+    def save(self, tile_index: int, values: np.ndarray) -> None:
+        """
+        Persists the result of one tile first and then records it in the manifest
+
+        """
+        _atomic_write(self._tile_path(tile_index), lambda handle: np.save(handle, values))
+        self.completed.add(tile_index)
+        manifest = {"fingerprint": self.fingerprint, "completed": sorted(self.completed)}
+        _atomic_write(self.directory / self.MANIFEST_NAME, lambda handle: handle.write(json.dumps(manifest).encode()))
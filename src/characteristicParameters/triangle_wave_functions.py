@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 def T_pi(delta: float) -> float:
     """
@@ -31,3 +33,22 @@ def T_pi_2(delta) -> float:
     """
 
     return abs(((delta - math.pi / 2) % (math.pi)) - math.pi / 2)
+
+
+def T_pi_array(delta, dtype=np.float64, out=None):
+    """
+    Array version of T_pi that is computed in dtype and in place (no temporary arrays besides the result).
+    In float32, the error grows with |delta| (about 1e-7 * |delta|, i.e. below 2e-5 rad for |delta| < 50 pi).
+
+    Args:
+        delta: [rad] any shape
+        dtype: dtype of the computation and of the result
+        out: array the result is written to (must have the dtype dtype)
+
+    Returns: [rad] [0-pi] (out if given)
+
+    """
+    result = np.subtract(delta, math.pi, dtype=dtype, out=out)
+    np.mod(result, 2 * math.pi, out=result)
+    np.subtract(result, math.pi, out=result)
+    return np.abs(result, out=result)
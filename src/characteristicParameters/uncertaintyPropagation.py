@@ -0,0 +1,171 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from characteristicParameters import _helpers
+from characteristicParameters.analyticFormulas import stokes_images_to_char_paras_phi_0_and_45
+from characteristicParameters.imageProcessing import _validate_mask
+
+"""
+Per-pixel uncertainty of the analytic formulas (section 2.4 in the paper) by first-order error propagation.
+
+The closed form maps x = (S1_0, S2_0, S1_45, S2_45), the normalized Stokes parameters measured at phi=0 and
+phi=pi/4, to (delta, theta, omega). With its Jacobian J (3 x 4) and the covariance C of the measured
+parameters, the covariance of the result is J C J^T; its diagonal gives the variances of delta, theta, omega.
+
+The linearisation breaks down close to the singular points of the closed form (delta close to 0 or pi, where
+theta or omega are undefined). Pixels whose linearised standard deviation exceeds max_linear_std are
+evaluated by Monte Carlo sampling instead.
+"""
+
+
+@dataclass
+class UncertaintyMaps:
+    """
+    Attributes:
+        delta_std: [rad] standard deviation of delta
+        theta_std: [rad] standard deviation of theta
+        omega_std: [rad] standard deviation of omega
+        monte_carlo: pixels that were evaluated by Monte Carlo sampling
+    """
+    delta_std: np.ndarray
+    theta_std: np.ndarray
+    omega_std: np.ndarray
+    monte_carlo: np.ndarray
+
+
+def _normalized(stokes_0_deg: np.ndarray, stokes_45_deg: np.ndarray) -> np.ndarray:
+    # (4, ...) containing S1_0, S2_0, S1_45, S2_45
+    return np.stack([stokes_0_deg[1] / stokes_0_deg[0], stokes_0_deg[2] / stokes_0_deg[0],
+                     stokes_45_deg[1] / stokes_45_deg[0], stokes_45_deg[2] / stokes_45_deg[0]])
+
+
+def jacobian_phi_0_and_45(stokes_0_deg: np.ndarray, stokes_45_deg: np.ndarray) -> np.ndarray:
+    """
+    Jacobian of stokes_images_to_char_paras_phi_0_and_45 with respect to the normalized Stokes parameters.
+
+    Args:
+        stokes_0_deg: measured at phi=0°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+        stokes_45_deg: measured at phi=45°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+
+    Returns: (..., 3, 4) derivatives of (delta, theta, omega) with respect to (S1_0, S2_0, S1_45, S2_45),
+             infinite or NaN at the singular points
+
+    """
+    S1_0, S2_0, S1_45, S2_45 = _normalized(np.asarray(stokes_0_deg, dtype=float),
+                                           np.asarray(stokes_45_deg, dtype=float))
+    Sigma_1 = S1_0 + S2_45
+    Sigma_2 = -S1_45 + S2_0
+    Sigma_3 = S1_0 - S2_45
+    Sigma_4 = -S1_45 - S2_0
+
+    # Derivatives of Sigma_1..Sigma_4 with respect to S1_0, S2_0, S1_45, S2_45
+    d_sigma = np.array([[1, 0, 0, 1],
+                        [0, 1, -1, 0],
+                        [1, 0, 0, -1],
+                        [0, -1, -1, 0]], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # delta = arccos(cos_delta), cos_delta = (Sigma_1^2 + Sigma_2^2 - Sigma_3^2 - Sigma_4^2) / 4
+        cos_delta = 0.25 * (Sigma_1 ** 2 + Sigma_2 ** 2 - Sigma_3 ** 2 - Sigma_4 ** 2)
+        d_delta_d_cos = -1 / np.sqrt(1 - cos_delta ** 2)
+        d_delta = d_delta_d_cos[..., np.newaxis] * 0.5 * np.stack([Sigma_1, Sigma_2, -Sigma_3, -Sigma_4], axis=-1)
+
+        # omega = atan2(Sigma_2, Sigma_1) / 2
+        radius_12 = Sigma_1 ** 2 + Sigma_2 ** 2
+        zeros = np.zeros_like(Sigma_1)
+        d_omega = 0.5 * np.stack([-Sigma_2, Sigma_1, zeros, zeros], axis=-1) / radius_12[..., np.newaxis]
+
+        # theta = atan2(Y, X) / 4
+        Y = Sigma_2 * Sigma_3 - Sigma_1 * Sigma_4
+        X = Sigma_1 * Sigma_3 + Sigma_2 * Sigma_4
+        dY = np.stack([-Sigma_4, Sigma_3, Sigma_2, -Sigma_1], axis=-1)
+        dX = np.stack([Sigma_3, Sigma_4, Sigma_1, Sigma_2], axis=-1)
+        d_theta = 0.25 * (X[..., np.newaxis] * dY - Y[..., np.newaxis] * dX) / (X ** 2 + Y ** 2)[..., np.newaxis]
+
+    return np.stack([d_delta, d_theta, d_omega], axis=-2) @ d_sigma
+
+
+def _covariance(noise_std, covariance, shape: tuple[int, ...]) -> np.ndarray:
+    if (noise_std is None) == (covariance is None):
+        raise _helpers.InvalidInputError("Specify either noise_std or covariance.")
+    if covariance is None:
+        # Independent noise: scalar or one standard deviation per parameter (S1_0, S2_0, S1_45, S2_45)
+        variances = np.broadcast_to(np.asarray(noise_std, dtype=float) ** 2, (4,))
+        covariance = np.diag(variances)
+    covariance = np.asarray(covariance, dtype=float)
+    if covariance.shape[-2:] != (4, 4):
+        raise _helpers.InvalidInputError(f"The covariance must have the shape (..., 4, 4), not {covariance.shape}.")
+    return np.broadcast_to(covariance, shape + (4, 4))
+
+
+def _wrapped_rms(samples: np.ndarray, center: np.ndarray, period: float | None) -> np.ndarray:
+    deviation = samples - center[..., np.newaxis]
+    if period is not None:
+        deviation = (deviation + period / 2) % period - period / 2
+    return np.sqrt(np.mean(deviation ** 2, axis=-1))
+
+
+def uncertainty_phi_0_and_45(stokes_0_deg: np.ndarray,
+                             stokes_45_deg: np.ndarray,
+                             noise_std: float | np.ndarray | None = None,
+                             covariance: np.ndarray | None = None,
+                             max_linear_std: float = 0.1,
+                             n_samples: int = 1000,
+                             rng: np.random.Generator | None = None,
+                             mask: np.ndarray | None = None) -> UncertaintyMaps:
+    """
+    Standard deviations of the characteristic parameters obtained with stokes_images_to_char_paras_phi_0_and_45.
+
+    Args:
+        stokes_0_deg: measured at phi=0°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+        stokes_45_deg: measured at phi=45°, shape (3, ...) or (4, ...) containing [S0, S1, S2(, S3)]
+        noise_std: standard deviation of the independent noise of the normalized Stokes parameters,
+                   scalar or (S1_0, S2_0, S1_45, S2_45)
+        covariance: (4, 4) or (..., 4, 4) covariance of (S1_0, S2_0, S1_45, S2_45), instead of noise_std
+        max_linear_std: [rad] pixels with a larger linearised standard deviation are sampled instead
+        n_samples: number of Monte Carlo samples per sampled pixel
+        rng: random generator of the Monte Carlo samples
+        mask: pixels to evaluate (shape of the pixel axes), the others are NaN and never sampled
+              (None evaluates all pixels)
+
+    Returns: standard deviations of every pixel. For sampled pixels, it is the root mean square deviation of
+             the samples from the noise-free result (theta modulo pi/2 and omega modulo pi).
+
+    """
+    stokes_0_deg = np.asarray(stokes_0_deg, dtype=float)
+    stokes_45_deg = np.asarray(stokes_45_deg, dtype=float)
+    shape = stokes_0_deg.shape[1:]
+    covariance = _covariance(noise_std, covariance, shape)
+
+    # Pixels with S0 == 0 (e.g. masked out background) are NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jacobian = jacobian_phi_0_and_45(stokes_0_deg, stokes_45_deg)
+    with np.errstate(invalid="ignore", over="ignore"):
+        variances = np.einsum("...ij,...jk,...ik->...i", jacobian, covariance, jacobian)
+    stds = np.sqrt(np.maximum(variances, 0))
+    if mask is not None:
+        mask = _validate_mask(mask, shape)
+        stds[~mask] = np.nan
+
+    monte_carlo = ~np.all(stds <= max_linear_std, axis=-1)
+    if mask is not None:
+        monte_carlo &= mask
+    if np.any(monte_carlo):
+        rng = rng if rng is not None else np.random.default_rng()
+        x = _normalized(stokes_0_deg[:, monte_carlo], stokes_45_deg[:, monte_carlo]).T
+        center = stokes_images_to_char_paras_phi_0_and_45([np.ones(len(x)), x[:, 0], x[:, 1]],
+                                                          [np.ones(len(x)), x[:, 2], x[:, 3]])
+        # (n_pixels, n_samples, 4) correlated noise
+        cholesky = np.linalg.cholesky(covariance[monte_carlo] + 1e-30 * np.eye(4))
+        noise = np.einsum("pij,psj->psi", cholesky, rng.standard_normal((len(x), n_samples, 4)))
+        samples = x[:, np.newaxis, :] + noise
+        ones = np.ones(samples.shape[:2])
+        sampled = stokes_images_to_char_paras_phi_0_and_45([ones, samples[..., 0], samples[..., 1]],
+                                                           [ones, samples[..., 2], samples[..., 3]])
+        for (index, period) in enumerate((None, math.pi / 2, math.pi)):
+            stds[monte_carlo, index] = _wrapped_rms(sampled[index], center[index], period)
+
+    return UncertaintyMaps(delta_std=stds[..., 0], theta_std=stds[..., 1], omega_std=stds[..., 2],
+                           monte_carlo=monte_carlo)
@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from characteristicParameters import imageProcessing
+from characteristicParameters.analyticFormulas import char_paras_to_stokes
+from characteristicParameters.asyncPipeline import SimulatedCamera, process_frames
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+
+PHIS = [0, math.pi / 4]
+
+
+def make_camera(**kwargs) -> SimulatedCamera:
+    return SimulatedCamera(delta=np.full((2, 3), 1.2), theta=np.full((2, 3), 0.3), omega=np.full((2, 3), 0.7),
+                           phis=PHIS, **kwargs)
+
+
+async def collect(source, invert, executor, max_pending=2):
+    return [item async for item in process_frames(source, invert, executor=executor, max_pending=max_pending)]
+
+
+def test_simulated_camera_uses_forward_model():
+    # Arrange
+    camera = make_camera(n_frames=2, delta_rate=0.1)
+
+    # Act
+    stokes = camera.render(1)
+
+    # Assert
+    expected = char_paras_to_stokes(delta=1.3, theta=0.3, omega=0.7, stokes_in=linearly_polarized_light(PHIS[1]))
+    assert stokes.shape == (2, 4, 2, 3)
+    assert pytest.approx(expected) == list(stokes[1, :, 1, 2])
+
+
+def test_process_frames_inverts_all_frames_in_order():
+    # Arrange
+    camera = make_camera(n_frames=4, delta_rate=0.1)
+    invert = functools.partial(imageProcessing.analytic_image, phis=PHIS)
+
+    # Act
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = asyncio.run(collect(camera, invert, executor))
+
+    # Assert
+    assert [frame.index for (frame, _) in results] == [0, 1, 2, 3]
+    for (frame, maps) in results:
+        assert pytest.approx(1.2 + 0.1 * frame.index) == float(maps.delta[0, 0])
+
+
+def test_acquisition_overlaps_with_inversion():
+    # Arrange: acquisition and inversion take 50 ms each, sequential processing would take 400 ms
+    camera = make_camera(n_frames=4, frame_interval=0.05)
+
+    def slow_invert(stokes):
+        time.sleep(0.05)
+        return stokes.shape
+
+    # Act
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = asyncio.run(collect(camera, slow_invert, executor))
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert len(results) == 4
+    assert elapsed < 0.35
+
+
+def test_rendering_does_not_block_the_event_loop():
+    # Arrange: rendering a frame takes 100 ms, a ticker coroutine runs every 10 ms
+    class SlowCamera(SimulatedCamera):
+        def render(self, index):
+            time.sleep(0.1)
+            return super().render(index)
+
+    camera = SlowCamera(delta=np.full((2, 3), 1.2), theta=np.full((2, 3), 0.3), omega=np.full((2, 3), 0.7),
+                        phis=PHIS, n_frames=2)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        frames = [frame async for frame in camera]
+        task.cancel()
+        return frames, ticks
+
+    # Act
+    frames, ticks = asyncio.run(run())
+
+    # Assert
+    assert [frame.index for frame in frames] == [0, 1]
+    assert ticks >= 5
@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import imageProcessing
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes
+from characteristicParameters.batchedLevenbergMarquardt import BatchedLevenbergMarquardt, solve_symmetric_3x3
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+
+PHIS = [0, math.pi / 4, math.pi / 8]
+
+
+def make_stokes_stack(deltas, thetas, omegas, phis=PHIS):
+    # (n_phi, 4, ...) Stokes parameters of every pixel
+    return np.stack([char_paras_images_to_stokes(deltas, thetas, omegas, linearly_polarized_light(phi))
+                     for phi in phis])
+
+
+def test_solve_symmetric_3x3_matches_numpy():
+    # Arrange: random symmetric positive definite matrices
+    rng = np.random.default_rng(0)
+    factors = rng.normal(size=(20, 3, 3))
+    matrices = factors @ factors.transpose(0, 2, 1) + 0.1 * np.eye(3)
+    right_hand_sides = rng.normal(size=(20, 3))
+
+    # Act
+    solution, determinant = solve_symmetric_3x3(matrices[:, [0, 0, 0, 1, 1, 2], [0, 1, 2, 1, 2, 2]],
+                                                right_hand_sides)
+
+    # Assert
+    assert pytest.approx(np.linalg.det(matrices), rel=1e-9) == determinant
+    assert pytest.approx(np.linalg.solve(matrices, right_hand_sides[..., np.newaxis])[..., 0].ravel(),
+                         rel=1e-9, abs=1e-12) == solution.ravel()
+
+
+def test_fit_recovers_true_parameters_and_keeps_nan_pixels():
+    # Arrange: the starts are perturbed true parameters, the last pixel has S0 == 0
+    rng = np.random.default_rng(1)
+    deltas = rng.uniform(0.3, 2.8, 50)
+    thetas = rng.uniform(0.1, 1.4, 50)
+    omegas = rng.uniform(0.1, 3.0, 50)
+    stokes = make_stokes_stack(deltas, thetas, omegas)
+    stokes[:, :, -1] = 0
+    x0 = np.stack([deltas, thetas, omegas], axis=-1) + rng.uniform(-0.05, 0.05, (50, 3))
+
+    # Act
+    fit = BatchedLevenbergMarquardt.from_stokes(stokes, PHIS).fit(x0)
+
+    # Assert
+    assert pytest.approx(deltas[:-1], abs=1e-6) == fit.delta[:-1]
+    assert pytest.approx(thetas[:-1], abs=1e-6) == fit.theta[:-1]
+    assert pytest.approx(omegas[:-1], abs=1e-6) == fit.omega[:-1]
+    assert np.all(fit.residual[:-1] < 1e-8)
+    assert np.all(fit.converged[:-1])
+    assert np.isnan(fit.delta[-1]) and np.isnan(fit.residual[-1])
+
+
+def test_invalid_shapes_are_rejected():
+    solver = BatchedLevenbergMarquardt(PHIS, np.zeros((4, 3)), np.zeros((4, 3)))
+
+    with pytest.raises(InvalidInputError):
+        BatchedLevenbergMarquardt(PHIS, np.zeros((4, 3)), np.zeros((4, 2)))
+    with pytest.raises(InvalidInputError):
+        solver.fit(np.zeros((3, 3)))
+    with pytest.raises(InvalidInputError):
+        solver.fit(np.zeros((4, 2, 2)))
+
+
+def test_batched_optimizer_image_matches_the_global_search():
+    # Arrange: noisy measurements, one pixel is masked
+    rng = np.random.default_rng(9)
+    deltas = rng.uniform(0.1, 3.0, (2, 3))
+    thetas = rng.uniform(0, math.pi / 2, (2, 3))
+    omegas = rng.uniform(0, math.pi, (2, 3))
+    stack = make_stokes_stack(deltas, thetas, omegas) + rng.normal(0, 1e-3, (3, 4, 2, 3))
+    mask = np.ones((2, 3), dtype=bool)
+    mask[0, 1] = False
+    np.random.seed(0)
+
+    # Act
+    batched = imageProcessing.batched_optimizer_image(stack, phis=PHIS, tile_size=2, mask=mask)
+    double = imageProcessing.optimizer_image(stack, phis=PHIS)
+
+    # Assert: the minima are as good as the ones of the differential evolution
+    residual_batched = imageProcessing.residual_map(stack, PHIS, batched)
+    residual_double = imageProcessing.residual_map(stack, PHIS, double)
+    assert np.isnan(batched.delta[0, 1])
+    assert np.all(residual_batched[mask] <= residual_double[mask] + 1e-9)
+    assert pytest.approx(double.delta[mask], abs=1e-3) == batched.delta[mask]
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import cli, imageProcessing
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import char_paras_to_stokes
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+
+
+def test_collect_input_files(tmp_path):
+    np.save(tmp_path / "b.npy", np.zeros(1))
+    np.savez(tmp_path / "a.npz", stokes=np.zeros(1))
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    files = cli.collect_input_files([tmp_path])
+
+    assert [f.name for f in files] == ["a.npz", "b.npy"]
+
+
+def test_load_stack_rejects_archives_without_the_stack(tmp_path):
+    np.savez(tmp_path / "a.npz", phis=np.zeros(2), mask=np.ones((1, 1), dtype=bool))
+
+    with pytest.raises(InvalidInputError):
+        cli.load_stack(tmp_path / "a.npz", "stokes")
+
+
+def test_main_skips_results_of_a_previous_run(tmp_path, capsys):
+    # Arrange: one pixel image measured at 0° and 45°
+    stokes = np.array([char_paras_to_stokes(delta=1.0, theta=0.3, omega=0.7, stokes_in=linearly_polarized_light(phi))
+                       for phi in (0, math.pi / 4)])
+    np.save(tmp_path / "a.npy", stokes.reshape(2, 4, 1, 1))
+    cli.main([str(tmp_path)])
+
+    # Act
+    exit_code = cli.main([str(tmp_path)])
+
+    # Assert
+    assert exit_code == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.npy", "a_char_paras.npz"]
+    assert "Total (analytic): 1 files" in capsys.readouterr().out.splitlines()[-1]
+
+
+def test_main_processes_directory(tmp_path, capsys):
+    # Arrange: one pixel image measured at 0° and 45°
+    stokes = np.array([char_paras_to_stokes(delta=1.0, theta=0.3, omega=0.7, stokes_in=linearly_polarized_light(phi))
+                       for phi in (0, math.pi / 4)])
+    np.save(tmp_path / "specimen.npy", stokes.reshape(2, 4, 1, 1))
+
+    # Act
+    exit_code = cli.main([str(tmp_path), "--method", "analytic", "--dtype", "float32",
+                          "-o", str(tmp_path / "out")])
+
+    # Assert
+    assert exit_code == 0
+    with np.load(tmp_path / "out" / "specimen_char_paras.npz") as results:
+        assert results["delta"].dtype == np.float32
+        assert math.isclose(results["delta"][0, 0], 1.0, abs_tol=1e-5)
+    assert "pixels/s" in capsys.readouterr().out
+
+
+def test_main_skips_pixels_outside_the_automatic_mask(tmp_path, capsys):
+    # Arrange: the second pixel is background (S0 == 0)
+    stokes = np.zeros((2, 4, 1, 2))
+    for (i, phi) in enumerate((0, math.pi / 4)):
+        stokes[i, :, 0, 0] = char_paras_to_stokes(delta=1.0, theta=0.3, omega=0.7,
+                                                  stokes_in=linearly_polarized_light(phi))
+    np.save(tmp_path / "specimen.npy", stokes)
+
+    # Act
+    exit_code = cli.main([str(tmp_path / "specimen.npy"), "--auto-mask", "--min-s0", "1e-3"])
+
+    # Assert
+    assert exit_code == 0
+    with np.load(tmp_path / "specimen_char_paras.npz") as results:
+        assert math.isclose(results["delta"][0, 0], 1.0, abs_tol=1e-5)
+        assert np.isnan(results["delta"][0, 1])
+    assert "1 pixels in" in capsys.readouterr().out
+
+
+def test_phis_are_given_in_degrees_on_the_command_line(tmp_path):
+    # Arrange: one pixel image measured at 0° and 45°
+    stokes = np.array([char_paras_to_stokes(delta=1.0, theta=0.3, omega=0.7, stokes_in=linearly_polarized_light(phi))
+                       for phi in (0, math.pi / 4)])
+    np.save(tmp_path / "specimen.npy", stokes.reshape(2, 4, 1, 1))
+
+    # Act
+    exit_code = cli.main([str(tmp_path), "--method", "hybrid", "--phis-deg", "0,45", "--residual-threshold", "1"])
+
+    # Assert
+    assert exit_code == 0
+    with np.load(tmp_path / "specimen_char_paras.npz") as results:
+        assert math.isclose(results["delta"][0, 0], 1.0, abs_tol=1e-5)
+
+
+def test_tile_size_is_only_passed_on_when_given(tmp_path, monkeypatch):
+    # Arrange
+    calls = []
+
+    def fake_batched_optimizer_image(stack, **kwargs):
+        calls.append(kwargs)
+        return imageProcessing.analytic_image(stack, phis=kwargs["phis"])
+
+    monkeypatch.setattr(imageProcessing, "batched_optimizer_image", fake_batched_optimizer_image)
+    stokes = np.array([char_paras_to_stokes(delta=1.0, theta=0.3, omega=0.7, stokes_in=linearly_polarized_light(phi))
+                       for phi in (0, math.pi / 4)])
+    np.save(tmp_path / "specimen.npy", stokes.reshape(2, 4, 1, 1))
+
+    # Act
+    cli.main([str(tmp_path / "specimen.npy"), "--method", "batched"])
+    cli.main([str(tmp_path / "specimen.npy"), "--method", "batched", "--tile-size", "32"])
+
+    # Assert
+    assert "tile_size" not in calls[0]
+    assert calls[1]["tile_size"] == 32
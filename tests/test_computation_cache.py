@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from characteristicParameters.computationCache import ComputationCache, cached
+
+calls = []
+
+
+def noisy_map(size: int, scale: float) -> dict:
+    calls.append((size, scale))
+    return {"values": scale * np.arange(size * size).reshape(size, size), "scale": scale}
+
+
+def test_results_are_computed_once_per_argument_set(tmp_path):
+    # Arrange
+    cache = ComputationCache(tmp_path)
+    calls.clear()
+
+    # Act
+    first = cache.get_or_compute(noisy_map, size=3, scale=2.0)
+    second = cache.get_or_compute(noisy_map, size=3, scale=2.0)
+    other = cache.get_or_compute(noisy_map, size=3, scale=0.5)
+
+    # Assert
+    assert calls == [(3, 2.0), (3, 0.5)]
+    assert pytest.approx(first["values"]) == second["values"]
+    assert pytest.approx(0.5 * np.arange(9).reshape(3, 3)) == other["values"]
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+
+def test_array_arguments_are_keyed_by_content():
+    key_1 = ComputationCache.key(noisy_map, {"x": np.array([1.0, 2.0])})
+    key_2 = ComputationCache.key(noisy_map, {"x": np.array([1.0, 2.0])})
+    key_3 = ComputationCache.key(noisy_map, {"x": np.array([1.0, 2.5])})
+
+    assert key_1 == key_2
+    assert key_1 != key_3
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    # Arrange: every result is roughly 8 kB (random data does not compress)
+    cache = ComputationCache(tmp_path, max_bytes=20_000)
+
+    @cached(cache=cache)
+    def random_values(seed: int) -> np.ndarray:
+        return np.random.default_rng(seed).random(1000)
+
+    # Act
+    first = random_values(seed=0)
+    for seed in range(1, 4):
+        random_values(seed=seed)
+
+    # Assert
+    assert cache.size_bytes() <= 20_000
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+    assert pytest.approx(first) == random_values(seed=0)
@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+import pytest
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.dispersionCalibration import fit_dispersion_parameters
+from characteristicParameters.rgbMethod import define_reduced_birefringence_function
+
+WAVELENGTHS = np.array([632.8, 546.1, 435.8, 500.0])
+
+
+def synthetic_retardations(n_locations: int, noise_std: float, seed: int = 0) -> np.ndarray:
+    # delta(lambda) = lambda_0 / lambda * k(lambda) * delta(lambda_0), see Eq. (5) in the paper
+    rng = np.random.default_rng(seed)
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+    delta_0 = rng.uniform(1, 50, (n_locations, 1))
+    retardations = delta_0 * WAVELENGTHS[0] / WAVELENGTHS * k_function(WAVELENGTHS)
+    return retardations + rng.normal(0, noise_std, retardations.shape)
+
+
+def test_noise_free_data_is_fitted_exactly():
+    fit = fit_dispersion_parameters(WAVELENGTHS, synthetic_retardations(100, noise_std=0))
+
+    assert pytest.approx(25.5e3, rel=1e-6) == fit.a
+    assert pytest.approx(3.25e9, rel=1e-6) == fit.b
+    assert fit.lambda_0 == WAVELENGTHS[0]
+    assert fit.n_samples == 300
+    assert fit.rms_residual < 1e-10
+
+
+def test_many_noisy_samples_in_chunks():
+    # Arrange
+    retardations = synthetic_retardations(1_000_000, noise_std=1e-3).reshape(1000, 1000, 4)
+
+    # Act
+    start = time.perf_counter()
+    fit = fit_dispersion_parameters(WAVELENGTHS, retardations, chunk_size=250_000)
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert pytest.approx(25.5e3, rel=0.05) == fit.a
+    assert pytest.approx(3.25e9, rel=0.05) == fit.b
+    assert fit.n_samples == 3_000_000
+    assert elapsed < 10
+
+
+def test_reference_wavelength_only_is_rejected():
+    with pytest.raises(InvalidInputError):
+        fit_dispersion_parameters([632.8], np.ones((10, 1)))
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters.floodFillUnwrapping import quality_guided_unwrap
+from characteristicParameters.rgbMethod import define_reduced_birefringence_function, branch_candidates, \
+    convert_retardation_to_different_wavelength
+from characteristicParameters.triangle_wave_functions import T_pi
+
+WAVELENGTHS = [632.8, 546.1, 435.8]
+A, B = 25.5e3, 3.25e9
+
+
+def measure(delta_r_true: np.ndarray) -> np.ndarray:
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=A, b=B)
+    return np.array([T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=WAVELENGTHS[0], delta_1=delta_r_true, wavelength_2=wavelength))
+        for wavelength in WAVELENGTHS])
+
+
+def test_branch_candidates():
+    candidates = branch_candidates(np.array([1.0]), lb_delta=0, ub_delta=4 * math.pi)
+
+    finite = np.sort(candidates[~np.isnan(candidates)])
+    assert pytest.approx([1, 2 * math.pi - 1, 2 * math.pi + 1, 4 * math.pi - 1]) == list(finite)
+
+
+def test_quality_guided_unwrap_follows_a_ramp_over_several_fringe_orders():
+    # Arrange: the retardation increases by 6 pi across the image
+    rows, cols = np.mgrid[0:12, 0:12]
+    delta_r_true = 3 * math.pi + 0.5 * cols + 0.1 * rows
+
+    # Act
+    result = quality_guided_unwrap(measure(delta_r_true), WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+
+    # Assert
+    assert result.n_seeds == 1
+    assert pytest.approx(delta_r_true.ravel(), abs=1e-9) == result.delta_r.ravel()
+    assert np.all(result.error < 1e-9)
+
+
+def test_neighbors_resolve_an_ambiguous_pixel():
+    # Arrange: noise makes the wrong fringe order of one pixel the best match on its own
+    rows, cols = np.mgrid[0:5, 0:5]
+    delta_r_true = 10 * math.pi + 0.05 * cols + 0.05 * rows
+    retardations = measure(delta_r_true)
+    retardations[:, 2, 2] = measure(np.array(8 * math.pi + 0.15))
+
+    # Act
+    result = quality_guided_unwrap(retardations, WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+
+    # Assert: the corrupted pixel stays within half a fringe order of its neighbors
+    assert abs(result.delta_r[2, 2] - delta_r_true[2, 2]) < math.pi
+    assert pytest.approx(np.delete(delta_r_true.ravel(), 12)) == np.delete(result.delta_r.ravel(), 12)
+
+
+def test_nan_barrier_separates_regions_with_own_seeds():
+    # Arrange: a column of NaN pixels separates two regions of different fringe orders
+    rows, cols = np.mgrid[0:5, 0:7]
+    delta_r_true = np.where(cols < 3, 3 * math.pi + 0.05 * cols, 9 * math.pi + 0.05 * rows)
+    retardations = measure(delta_r_true)
+    retardations[:, :, 3] = np.nan
+
+    # Act
+    result = quality_guided_unwrap(retardations, WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+
+    # Assert
+    valid = cols != 3
+    assert result.n_seeds == 2
+    assert np.all(np.isnan(result.delta_r[:, 3]))
+    assert pytest.approx(delta_r_true[valid], abs=1e-9) == result.delta_r[valid]
+
+
+def test_masked_pixels_are_not_unwrapped():
+    # Arrange
+    rows, cols = np.mgrid[0:4, 0:4]
+    delta_r_true = 5 * math.pi + 0.1 * cols + 0.1 * rows
+    mask = np.ones((4, 4), dtype=bool)
+    mask[:, 0] = False
+
+    # Act
+    result = quality_guided_unwrap(measure(delta_r_true), WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi, mask=mask)
+
+    # Assert
+    assert result.n_seeds == 1
+    assert np.all(np.isnan(result.delta_r[~mask])) and np.all(np.isnan(result.error[~mask]))
+    assert pytest.approx(delta_r_true[mask], abs=1e-9) == result.delta_r[mask]
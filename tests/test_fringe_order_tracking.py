@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters.fringeOrderTracking import FringeOrderTracker
+from characteristicParameters.rgbMethod import define_reduced_birefringence_function, \
+    convert_retardation_to_different_wavelength
+from characteristicParameters.triangle_wave_functions import T_pi
+
+WAVELENGTHS = [632.8, 546.1, 435.8]
+A, B = 25.5e3, 3.25e9
+
+
+def measure(delta_r: np.ndarray) -> np.ndarray:
+    # (n_wavelengths, height, width) measured retardations in the range 0-pi
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=A, b=B)
+    return np.array([T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=WAVELENGTHS[0], delta_1=delta_r, wavelength_2=wavelength))
+        for wavelength in WAVELENGTHS])
+
+
+def test_tracker_follows_increasing_retardation_with_few_evaluations():
+    # Arrange: the retardation grows by 0.3 rad per frame, crossing several fringe orders
+    rows, cols = np.mgrid[0:3, 0:4]
+    delta_r_0 = 3.1 * math.pi + 0.2 * cols + 0.1 * rows
+    tracker = FringeOrderTracker(WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+
+    # Act
+    frames = [tracker.update(measure(delta_r_0 + 0.3 * index)) for index in range(30)]
+
+    # Assert
+    for (index, frame) in enumerate(frames):
+        assert pytest.approx((delta_r_0 + 0.3 * index).ravel(), abs=1e-6) == frame.delta_r.ravel()
+    assert np.all(frames[0].reacquired)
+    assert not any(np.any(frame.reacquired) for frame in frames[1:])
+    assert all(frame.n_evaluations == 2 * delta_r_0.size for frame in frames[1:])
+
+
+def test_tracker_reacquires_pixels_after_a_jump():
+    # Arrange
+    delta_r = np.full((2, 2), 5.3 * math.pi)
+    tracker = FringeOrderTracker(WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+    tracker.update(measure(delta_r))
+    jumped = delta_r.copy()
+    jumped[0, 1] += 4 * math.pi + 0.5
+
+    # Act
+    frame = tracker.update(measure(jumped))
+
+    # Assert
+    assert frame.reacquired.tolist() == [[False, True], [False, False]]
+    assert pytest.approx(jumped.ravel(), abs=1e-6) == frame.delta_r.ravel()
+
+
+def test_masked_pixels_are_skipped_and_reacquired_when_selected_again():
+    # Arrange
+    delta_r = np.full((2, 2), 5.3 * math.pi)
+    tracker = FringeOrderTracker(WAVELENGTHS, a=A, b=B, ub_delta=20 * math.pi)
+    mask = np.array([[True, False], [True, True]])
+    first = tracker.update(measure(delta_r), mask=mask)
+
+    # Act
+    second = tracker.update(measure(delta_r + 0.1))
+
+    # Assert
+    assert np.isnan(first.delta_r[0, 1]) and np.isnan(first.error[0, 1])
+    assert first.reacquired.tolist() == [[True, False], [True, True]]
+    assert first.n_evaluations == 3 * tracker._n_branches
+    assert second.reacquired.tolist() == [[False, True], [False, False]]
+    assert pytest.approx((delta_r + 0.1).ravel(), abs=1e-6) == second.delta_r.ravel()
@@ -1,3 +1,7 @@
+import subprocess
+import sys
+
+import characteristicParameters
 from characteristicParameters._helpers import all_are_close
 
 
@@ -9,3 +13,20 @@ def test_all_are_close():
     # Act & Assert
     assert all_are_close(list_to_be_tested_true)
     assert not all_are_close(list_to_be_tested_false)
+
+
+def test_importing_the_package_does_not_import_scipy():
+    # Arrange: scipy may already be loaded in the test process, hence a fresh interpreter
+    statement = ("import characteristicParameters, characteristicParameters.muellerCalculus, "
+                 "characteristicParameters.optimizationProcedure, characteristicParameters.rgbMethod; "
+                 "import sys; print('scipy' in sys.modules)")
+
+    # Act
+    result = subprocess.run([sys.executable, "-c", statement], capture_output=True, text=True, check=True)
+
+    # Assert
+    assert result.stdout.strip() == "False"
+
+
+def test_submodules_are_loaded_on_attribute_access():
+    assert characteristicParameters.muellerCalculus.rotator(0).shape == (4, 4)
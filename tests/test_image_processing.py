@@ -0,0 +1,335 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import imageProcessing
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import char_paras_to_stokes, stokes_to_char_paras_phi_0_and_45, \
+    stokes_images_to_char_paras_phi_0_and_45
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+from characteristicParameters.rgbMethod import define_reduced_birefringence_function, \
+    convert_retardation_to_different_wavelength
+from characteristicParameters.triangle_wave_functions import T_pi
+
+
+def make_stokes_stack(deltas, thetas, omegas, phis):
+    # Stack of shape (n_phi, 4, height, width) generated with the Mueller calculus
+    height, width = deltas.shape
+    stack = np.empty((len(phis), 4, height, width))
+    for (i, phi) in enumerate(phis):
+        for row in range(height):
+            for col in range(width):
+                stack[i, :, row, col] = char_paras_to_stokes(delta=deltas[row, col], theta=thetas[row, col],
+                                                             omega=omegas[row, col],
+                                                             stokes_in=linearly_polarized_light(phi))
+    return stack
+
+
+def test_iter_tiles():
+    tiles = imageProcessing.iter_tiles((5, 3), tile_size=2)
+
+    assert len(tiles) == 6
+    assert tiles[0] == (slice(0, 2), slice(0, 2))
+    assert tiles[-1] == (slice(4, 5), slice(2, 3))
+
+
+def test_analytic_image_matches_scalar_formula():
+    # Arrange
+    rng = np.random.default_rng(1)
+    deltas = rng.uniform(0, math.pi, (3, 4))
+    thetas = rng.uniform(0, math.pi, (3, 4))
+    omegas = rng.uniform(0, math.pi, (3, 4))
+    phis = [0, math.pi / 4]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+
+    # Act
+    maps = imageProcessing.analytic_image(stack, phis=phis, dtype=np.float32)
+    out = np.empty((3, 3, 4))
+    delta, _, _ = stokes_images_to_char_paras_phi_0_and_45(stack[0], stack[1], out=out)
+
+    # Assert
+    assert maps.delta.dtype == np.float32
+    assert np.shares_memory(delta, out)
+    assert pytest.approx(out[0].ravel(), abs=1e-6) == maps.delta.ravel()
+    for row in range(3):
+        for col in range(4):
+            expected = stokes_to_char_paras_phi_0_and_45(stack[0, :, row, col], stack[1, :, row, col])
+            assert pytest.approx(expected, abs=1e-5) == (maps.delta[row, col], maps.theta[row, col],
+                                                         maps.omega[row, col])
+
+
+def test_optimizer_image_finds_true_parameters():
+    # Arrange
+    deltas = np.array([[0.5, 2.0]])
+    thetas = np.array([[0.3, 1.1]])
+    omegas = np.array([[0.7, 0.2]])
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+
+    # Act
+    maps = imageProcessing.optimizer_image(stack, phis=phis, tile_size=1)
+
+    # Assert
+    assert pytest.approx(deltas.ravel(), abs=1e-4) == maps.delta.ravel()
+    assert pytest.approx((thetas % (math.pi / 2)).ravel(), abs=1e-4) == maps.theta.ravel()
+    assert pytest.approx((omegas % math.pi).ravel(), abs=1e-4) == maps.omega.ravel()
+
+
+def test_rgb_image_finds_true_retardations():
+    # Arrange
+    wavelengths = [632.8, 546.1, 435.8]
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    delta_r_true = np.array([[3.2 * math.pi, 7.7 * math.pi]])
+    retardations = np.array([[[T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=wavelengths[0], delta_1=d, wavelength_2=wavelength))
+        for d in delta_r_true[0]]] for wavelength in wavelengths])
+    # The differential evolution draws from numpy's global generator
+    np.random.seed(0)
+
+    # Act
+    delta_r = imageProcessing.rgb_image(retardations, wavelengths=wavelengths, a=25.5e3, b=3.25e9,
+                                        ub_delta=10 * math.pi)
+
+    # Assert
+    assert pytest.approx(delta_r_true, abs=1e-3) == delta_r
+
+
+def test_analytic_image_requires_phi_0_and_45():
+    stack = np.ones((2, 3, 1, 1))
+    with pytest.raises(InvalidInputError):
+        imageProcessing.analytic_image(stack, phis=[0, math.pi / 8])
+
+
+def test_residual_map_is_zero_for_true_parameters():
+    # Arrange
+    deltas, thetas, omegas = np.full((2, 2), 0.8), np.full((2, 2), 0.1), np.full((2, 2), 2.0)
+    phis = [0, math.pi / 4, math.pi / 3]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+    maps = imageProcessing.CharacteristicParameterMaps(delta=deltas, theta=thetas, omega=omegas)
+
+    # Act & Assert
+    assert pytest.approx(np.zeros(4), abs=1e-12) == imageProcessing.residual_map(stack, phis, maps).ravel()
+    for forward_model in ("mueller", "jones"):
+        assert pytest.approx(np.zeros(4), abs=1e-12) == imageProcessing.residual_map(
+            stack, phis, maps, forward_model=forward_model).ravel()
+
+
+def test_hybrid_image_routes_only_bad_pixels_to_the_optimizer():
+    # Arrange: a noise-free image with one pixel whose 45° measurement is corrupted
+    rng = np.random.default_rng(5)
+    deltas = rng.uniform(0.2, 2.9, (2, 3))
+    thetas = rng.uniform(0, math.pi, (2, 3))
+    omegas = rng.uniform(0, math.pi, (2, 3))
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+    stack[1, 1:3, 0, 1] = [0.6, 0.8]
+
+    # Act
+    result = imageProcessing.hybrid_image(stack, phis=phis, residual_threshold=1e-6)
+
+    # Assert
+    assert (result.n_analytic, result.n_optimizer) == (5, 1)
+    assert result.routed_to_optimizer[0, 1]
+    good = ~result.routed_to_optimizer
+    assert pytest.approx(deltas[good]) == result.maps.delta[good]
+    assert pytest.approx((thetas % (math.pi / 2))[good]) == result.maps.theta[good]
+    assert pytest.approx((omegas % math.pi)[good]) == result.maps.omega[good]
+    assert np.all(result.residual[good] < 1e-6)
+
+
+def test_hybrid_image_does_not_route_dark_pixels():
+    # Arrange: the second pixel is background (S0 == 0)
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(np.full((1, 2), 1.1), np.full((1, 2), 0.4), np.full((1, 2), 2.0), phis)
+    stack[:, :, 0, 1] = 0
+
+    # Act
+    result = imageProcessing.hybrid_image(stack, phis=phis)
+
+    # Assert
+    assert (result.n_analytic, result.n_optimizer) == (1, 0)
+    assert not result.routed_to_optimizer[0, 1]
+    assert np.all(np.isnan([result.maps.delta[0, 1], result.maps.theta[0, 1], result.maps.omega[0, 1],
+                            result.residual[0, 1]]))
+    assert pytest.approx(1.1) == result.maps.delta[0, 0]
+
+def test_block_average_handles_incomplete_blocks():
+    stack = np.arange(15.0).reshape(1, 3, 5)
+
+    coarse = imageProcessing.block_average(stack, factor=2)
+
+    assert coarse.shape == (1, 2, 3)
+    assert pytest.approx([3, 5, 6.5, 10.5, 12.5, 14]) == list(coarse.ravel())
+
+
+def test_rgb_image_pyramid_finds_true_retardations():
+    # Arrange: slowly varying retardation across the image
+    wavelengths = [632.8, 546.1, 435.8]
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    rows, cols = np.mgrid[0:4, 0:4]
+    delta_r_true = 4.2 * math.pi + 0.1 * cols + 0.05 * rows
+    retardations = np.array([[[T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=wavelengths[0], delta_1=d, wavelength_2=wavelength))
+        for d in row] for row in delta_r_true] for wavelength in wavelengths])
+
+    # Act
+    delta_r = imageProcessing.rgb_image_pyramid(retardations, wavelengths=wavelengths, a=25.5e3, b=3.25e9,
+                                                factor=2, group_size=2, ub_delta=10 * math.pi)
+
+    # Assert
+    assert pytest.approx(delta_r_true.ravel(), abs=1e-3) == delta_r.ravel()
+
+
+def test_rgb_image_pyramid_resumes_from_checkpoint(tmp_path):
+    # Arrange
+    wavelengths = [632.8, 546.1, 435.8]
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    rows, cols = np.mgrid[0:4, 0:4]
+    delta_r_true = 4.2 * math.pi + 0.1 * cols + 0.05 * rows
+    retardations = np.array([[[T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=wavelengths[0], delta_1=d, wavelength_2=wavelength))
+        for d in row] for row in delta_r_true] for wavelength in wavelengths])
+    settings = dict(wavelengths=wavelengths, a=25.5e3, b=3.25e9, factor=2, group_size=2, tile_size=2,
+                    ub_delta=10 * math.pi, checkpoint_dir=tmp_path)
+    np.random.seed(0)
+    first = imageProcessing.rgb_image_pyramid(retardations, **settings)
+
+    # Act: the differential evolution draws different numbers, but every tile is loaded from the checkpoint
+    np.random.seed(1)
+    second = imageProcessing.rgb_image_pyramid(retardations, **settings)
+
+    # Assert
+    assert second.tolist() == first.tolist()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["coarse", "fine"]
+
+
+def test_automatic_mask_rejects_dark_saturated_and_unpolarized_pixels():
+    # Arrange
+    deltas, thetas, omegas = np.full((2, 3), 0.8), np.full((2, 3), 0.1), np.full((2, 3), 2.0)
+    phis = [0, math.pi / 4]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+    stack[:, :, 0, 0] = 0
+    stack[1, :, 0, 1] *= 10
+    stack[0, 1:, 1, 2] = 0.01
+
+    # Act
+    mask = imageProcessing.automatic_mask(stack, min_s0=1e-6, max_s0=5, min_dop=0.5)
+
+    # Assert
+    assert mask.tolist() == [[False, False, True], [True, True, False]]
+
+
+def test_masked_drivers_only_process_the_masked_pixels():
+    # Arrange: the stack is corrupted outside the mask, so a processed background pixel would be noticed
+    rng = np.random.default_rng(2)
+    deltas = rng.uniform(0.2, 2.9, (2, 3))
+    thetas = rng.uniform(0, math.pi, (2, 3))
+    omegas = rng.uniform(0, math.pi, (2, 3))
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+    mask = np.array([[True, False, True], [False, False, True]])
+    stack[..., ~mask] = np.nan
+
+    # Act
+    analytic = imageProcessing.analytic_image(stack, phis=phis, mask=mask)
+    optimizer = imageProcessing.optimizer_image(stack, phis=phis, mask=mask)
+    hybrid = imageProcessing.hybrid_image(stack, phis=phis, mask=mask)
+
+    # Assert
+    for maps in (analytic, optimizer, hybrid.maps):
+        assert np.all(np.isnan(maps.delta[~mask]))
+        assert pytest.approx(deltas[mask], abs=1e-4) == maps.delta[mask]
+        assert pytest.approx((omegas % math.pi)[mask], abs=1e-4) == maps.omega[mask] % math.pi
+    assert (hybrid.n_analytic, hybrid.n_optimizer) == (3, 0)
+    assert not np.any(hybrid.routed_to_optimizer)
+    with pytest.raises(InvalidInputError):
+        imageProcessing.analytic_image(stack, phis=phis, mask=mask.T)
+
+
+def test_masked_rgb_image_and_pyramid():
+    # Arrange
+    wavelengths = [632.8, 546.1, 435.8]
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    rows, cols = np.mgrid[0:4, 0:4]
+    delta_r_true = 4.2 * math.pi + 0.1 * cols + 0.05 * rows
+    retardations = np.array([[[T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=wavelengths[0], delta_1=d, wavelength_2=wavelength))
+        for d in row] for row in delta_r_true] for wavelength in wavelengths])
+    # The top left 2x2 block is background, the pyramid does not solve its coarse pixel
+    mask = np.ones((4, 4), dtype=bool)
+    mask[:2, :2] = False
+    mask[3, 3] = False
+    retardations[:, ~mask] = np.nan
+    np.random.seed(0)
+
+    # Act
+    delta_r = imageProcessing.rgb_image(retardations, wavelengths=wavelengths, a=25.5e3, b=3.25e9,
+                                        ub_delta=10 * math.pi, mask=mask)
+    delta_r_pyramid = imageProcessing.rgb_image_pyramid(retardations, wavelengths=wavelengths, a=25.5e3, b=3.25e9,
+                                                        factor=2, group_size=2, ub_delta=10 * math.pi, mask=mask)
+
+    # Assert
+    for result in (delta_r, delta_r_pyramid):
+        assert np.all(np.isnan(result[~mask]))
+        assert pytest.approx(delta_r_true[mask], abs=1e-3) == result[mask]
+
+
+def test_float32_analytic_image_stays_within_the_accuracy_budget():
+    # Arrange: away from delta = 0 and pi, where theta and omega are ill-conditioned in any precision
+    rng = np.random.default_rng(8)
+    deltas = rng.uniform(0.05, math.pi - 0.05, (6, 7))
+    thetas = rng.uniform(0, math.pi, (6, 7))
+    omegas = rng.uniform(0, math.pi, (6, 7))
+    phis = [0, math.pi / 4]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis)
+
+    # Act
+    single = imageProcessing.analytic_image(stack.astype(np.float32), phis=phis, dtype=np.float32,
+                                            compute_dtype=np.float32)
+    double = imageProcessing.analytic_image(stack, phis=phis)
+
+    # Assert
+    assert single.delta.dtype == np.float32
+    assert np.max(np.abs(single.delta - double.delta)) < 1e-5
+    for (period, name) in ((math.pi / 4, "theta"), (math.pi, "omega")):
+        difference = (getattr(single, name) - getattr(double, name) + period / 2) % period - period / 2
+        assert np.max(np.abs(difference)) < 1e-4
+
+
+def test_mixed_precision_optimizer_matches_the_global_search():
+    # Arrange: noisy measurements, one pixel has omega close to the periodic boundary
+    rng = np.random.default_rng(9)
+    deltas = rng.uniform(0.1, 3.0, (2, 3))
+    thetas = rng.uniform(0, math.pi / 2, (2, 3))
+    omegas = rng.uniform(0, math.pi, (2, 3))
+    omegas[1, 2] = math.pi - 1e-3
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(deltas, thetas, omegas, phis) + rng.normal(0, 1e-3, (3, 4, 2, 3))
+    np.random.seed(0)
+
+    # Act
+    mixed = imageProcessing.optimizer_image(stack, phis=phis, precision="mixed")
+    double = imageProcessing.optimizer_image(stack, phis=phis)
+
+    # Assert: the polished minimum is as good as the one of the differential evolution
+    assert mixed.delta.dtype == np.float64
+    residual_mixed = imageProcessing.residual_map(stack, phis, mixed)
+    residual_double = imageProcessing.residual_map(stack, phis, double)
+    assert np.all(residual_mixed <= residual_double + 1e-9)
+    assert pytest.approx(double.delta.ravel(), abs=1e-3) == mixed.delta.ravel()
+    with pytest.raises(InvalidInputError):
+        imageProcessing.optimizer_image(stack, phis=phis, precision="float16")
+
+
+def test_mixed_precision_optimizer_leaves_dark_pixels_nan():
+    # Arrange: the second pixel is background (S0 == 0)
+    phis = [0, math.pi / 4, math.pi / 8]
+    stack = make_stokes_stack(np.full((1, 2), 1.1), np.full((1, 2), 0.4), np.full((1, 2), 2.0), phis)
+    stack[:, :, 0, 1] = 0
+
+    # Act
+    maps = imageProcessing.optimizer_image(stack, phis=phis, precision="mixed")
+
+    # Assert
+    assert pytest.approx([1.1, 0.4, 2.0], abs=1e-6) == [maps.delta[0, 0], maps.theta[0, 0], maps.omega[0, 0]]
+    assert np.all(np.isnan([maps.delta[0, 1], maps.theta[0, 1], maps.omega[0, 1]]))
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import jonesCalculus, muellerCalculus
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes
+from characteristicParameters.asyncPipeline import SimulatedCamera
+
+
+@pytest.mark.parametrize("stokes_in", [muellerCalculus.linearly_polarized_light(0.3),
+                                       muellerCalculus.linearly_polarized_light(1.9),
+                                       muellerCalculus.right_hand_circularly_polarized_light(),
+                                       [3, -1, 2, -2]])
+def test_jones_forward_model_matches_mueller_calculus(stokes_in):
+    # Arrange
+    rng = np.random.default_rng(3)
+    deltas, thetas, omegas = rng.uniform(0, 2 * math.pi, (3, 5, 6))
+
+    # Act
+    mueller = char_paras_images_to_stokes(deltas, thetas, omegas, stokes_in=stokes_in)
+    jones = char_paras_images_to_stokes(deltas, thetas, omegas, stokes_in=stokes_in, forward_model="jones")
+
+    # Assert
+    assert pytest.approx(mueller.ravel(), abs=1e-12) == jones.ravel()
+
+
+@pytest.mark.parametrize("forward_model", ["mueller", "jones"])
+def test_float32_forward_models_stay_within_the_accuracy_budget(forward_model):
+    # Arrange
+    rng = np.random.default_rng(4)
+    deltas, thetas, omegas = rng.uniform(0, 2 * math.pi, (3, 64, 64))
+    stokes_in = muellerCalculus.linearly_polarized_light(0.7)
+
+    # Act
+    single = char_paras_images_to_stokes(deltas, thetas, omegas, stokes_in=stokes_in, forward_model=forward_model,
+                                         dtype=np.float32)
+    double = char_paras_images_to_stokes(deltas, thetas, omegas, stokes_in=stokes_in, forward_model=forward_model)
+
+    # Assert
+    assert single.dtype == np.float32
+    assert np.max(np.abs(single - double)) < 2e-6
+
+
+def test_jones_matrix_stack_matches_scalar_model():
+    # Arrange
+    deltas, thetas, omegas = np.array([0.3, 2.5]), np.array([1.2, 0.1]), np.array([0.4, 2.9])
+
+    # Act
+    stack = jonesCalculus.optical_equivalent_model_stack(deltas, thetas, omegas)
+
+    # Assert
+    for i in range(2):
+        expected = jonesCalculus.optical_equivalent_model(delta=deltas[i], theta=thetas[i], omega=omegas[i])
+        assert pytest.approx(expected.ravel()) == stack[i].ravel()
+
+
+def test_stokes_to_jones_vector_round_trip():
+    for stokes in ([1, 1, 0, 0], [1, -1, 0, 0], [3, 0, 0, -3], [3, -1, 2, -2]):
+        jones = jonesCalculus.stokes_to_jones_vector(stokes)
+        assert pytest.approx(stokes) == list(jonesCalculus.jones_vectors_to_stokes(jones))
+
+
+def test_stokes_to_jones_vector_rejects_partially_polarized_light():
+    with pytest.raises(InvalidInputError):
+        jonesCalculus.stokes_to_jones_vector([1, 0.5, 0, 0])
+
+
+def test_simulated_camera_forward_models_agree():
+    # Arrange
+    parameters = dict(delta=np.full((2, 3), 1.3), theta=np.full((2, 3), 0.2), omega=np.full((2, 3), 2.2),
+                      phis=[0, math.pi / 4, math.pi / 8], n_frames=1, delta_rate=0.1)
+
+    # Act
+    mueller = SimulatedCamera(**parameters).render(3)
+    jones = SimulatedCamera(**parameters, forward_model="jones").render(3)
+
+    # Assert
+    assert pytest.approx(mueller.ravel(), abs=1e-12) == jones.ravel()
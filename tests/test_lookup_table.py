@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import lookupTable, muellerCalculus
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.lookupTable import LookupTable, get_lookup_table, cache_key
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+
+PHIS = [0, math.pi / 4, math.pi / 8]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHARACTERISTIC_PARAMETERS_CACHE", str(tmp_path))
+    monkeypatch.setattr(lookupTable, "_loaded_tables", {})
+    return tmp_path
+
+
+def test_nearest_returns_the_grid_point_of_its_own_features():
+    # Arrange
+    table = LookupTable.build(PHIS, resolution=(9, 8, 16))
+
+    # Act
+    delta, theta, omega = table.nearest(table.features[600])
+
+    # Assert
+    expected = [[OptimizationProcedure.S1_in_theory(phi, delta, theta, omega),
+                 OptimizationProcedure.S2_in_theory(phi, delta, theta, omega)] for phi in PHIS]
+    assert pytest.approx(table.features[600]) == np.ravel(expected)
+
+
+def test_nearest_batch_in_float32_matches_the_tree():
+    # Arrange
+    table = LookupTable.build(PHIS, resolution=(9, 8, 16))
+    rng = np.random.default_rng(2)
+    features = table.features[rng.integers(0, len(table.features), 50)] + rng.normal(0, 1e-3, (50, 2 * len(PHIS)))
+
+    # Act
+    nearest = table.nearest_batch(features, k=1, max_chunk_elements=10_000)
+
+    # Assert: grid points with the same features (e.g. any theta at delta=0) are equally close
+    def features_of(parameters):
+        S1, S2 = OptimizationProcedure.S1_S2_in_theory_arrays(np.array(PHIS), *parameters.T[..., np.newaxis])
+        return np.stack([S1, S2], axis=-1).reshape(len(parameters), -1)
+
+    assert nearest.shape == (50, 1, 3)
+    assert pytest.approx(features_of(table.nearest(features)).ravel(), abs=1e-6) == \
+        features_of(nearest[:, 0]).ravel()
+
+
+def test_tables_are_cached_on_disk_and_in_memory(cache_dir):
+    # Act
+    table = get_lookup_table(PHIS, resolution=(9, 8, 16))
+
+    # Assert
+    assert (cache_dir / f"{cache_key(PHIS, (9, 8, 16))}.npz").exists()
+    assert get_lookup_table(PHIS, resolution=(9, 8, 16)) is table
+    lookupTable._loaded_tables.clear()
+    assert pytest.approx(table.features) == get_lookup_table(PHIS, resolution=(9, 8, 16)).features
+    assert cache_key(PHIS, (9, 8, 16)) != cache_key(PHIS[:2], (9, 8, 16))
+
+
+def test_find_characteristic_parameters_with_lut(cache_dir):
+    # Arrange
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=0.4, omega=2.0)
+    procedure = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @
+                                                            muellerCalculus.linearly_polarized_light(phi))
+                                       for phi in PHIS])
+
+    # Act
+    paras = procedure.find_characteristic_parameters(use_lut=True)
+
+    # Assert
+    assert pytest.approx(1.1, abs=1e-6) == paras.delta
+    assert pytest.approx(0.4, abs=1e-6) == paras.theta
+    assert pytest.approx(2.0, abs=1e-6) == paras.omega
+
+
+@pytest.mark.parametrize("theta, omega", [(math.pi / 2 - 1e-3, 1.0), (0.7, math.pi - 1e-3),
+                                          (math.pi / 2 - 1e-3, math.pi - 1e-3)])
+def test_lut_solve_reaches_minima_just_below_the_periodic_boundaries(cache_dir, theta, omega):
+    # Arrange: the closest grid points lie on the rows theta=0 and omega=0
+    model = muellerCalculus.optical_equivalent_model(delta=1.3, theta=theta, omega=omega)
+    procedure = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @
+                                                            muellerCalculus.linearly_polarized_light(phi))
+                                       for phi in PHIS])
+
+    # Act
+    paras = procedure.find_characteristic_parameters(use_lut=True)
+
+    # Assert
+    assert procedure.residual_function_R(paras.delta, paras.theta, paras.omega) < 1e-9
+    assert pytest.approx([1.3, theta, omega], abs=1e-6) == [paras.delta, paras.theta, paras.omega]
+
+
+def test_lut_cannot_be_combined_with_a_backend(cache_dir):
+    procedure = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=[1, 1, 0, 0]) for phi in PHIS])
+
+    with pytest.raises(InvalidInputError):
+        procedure.find_characteristic_parameters(use_lut=True, backend="dual_annealing")
+    with pytest.raises(InvalidInputError):
+        procedure.find_characteristic_parameters(use_lut=True, backend_options={"n_starts": 2})
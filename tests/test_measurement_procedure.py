@@ -3,7 +3,9 @@ import math
 import numpy as np
 import pytest
 from characteristicParameters import muellerCalculus
-from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector, \
+    IncrementalOptimizationProcedure
 
 
 def test_MeasuredStokesVector():
@@ -16,6 +18,7 @@ def test_MeasuredStokesVector():
     assert pytest.approx(8) == stokes.S3
     assert pytest.approx(2) == stokes.get_S1_normalized()
     assert pytest.approx(3) == stokes.get_S2_normalized()
+    assert pytest.approx(4) == stokes.get_S3_normalized()
 
     # Test 2:
     stokes = MeasuredStokesVector(math.pi, [2, 6, 8])
@@ -23,6 +26,7 @@ def test_MeasuredStokesVector():
     assert pytest.approx(3) == stokes.get_S1_normalized()
     assert pytest.approx(4) == stokes.get_S2_normalized()
     assert stokes.S3 is None
+    assert stokes.get_S3_normalized() is None
 
 
 def test_S1_in_theory():
@@ -111,3 +115,133 @@ def test_residual_vector_r_and_residual_function_R():
     # The residuals (as function of the parameters) should be zero when we enter the "true" parameters
     assert pytest.approx([0, 0, 0, 0]) == mp.residual_vector_r(delta=delta, theta=theta, omega=omega)
     assert pytest.approx(0) == mp.residual_function_R(delta=delta, theta=theta, omega=omega)
+
+
+def test_S3_in_theory_matches_mueller_calculus():
+    # Arrange
+    delta, theta, omega = 1.1, 2.0, 0.7
+
+    for phi in np.radians([0, 30, 45, 100]):
+        # Act
+        stokes = muellerCalculus.optical_equivalent_model(delta=delta, theta=theta, omega=omega) @ \
+            muellerCalculus.linearly_polarized_light(phi)
+
+        # Assert
+        assert pytest.approx(stokes[3], abs=1e-12) == OptimizationProcedure.S3_in_theory(phi=phi, delta=delta,
+                                                                                         theta=theta, omega=omega)
+
+
+def test_S3_distinguishes_fast_and_slow_axis():
+    # Arrange: theta outside 0-pi/2 can only be recovered with S3
+    np.random.seed(0)
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=2.0, omega=0.7)
+    mp = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @
+                                                     muellerCalculus.linearly_polarized_light(phi))
+                                for phi in [0, math.pi / 4, math.pi / 8]], use_S3=True)
+
+    # Act
+    paras = mp.find_characteristic_parameters()
+
+    # Assert
+    assert len(mp.residual_vector_r(1.1, 2.0, 0.7)) == 9
+    assert mp.solver_problem().bounds[2] == (0, math.pi)
+    assert pytest.approx([1.1, 2.0, 0.7], abs=1e-5) == [paras.delta, paras.theta, paras.omega]
+
+
+@pytest.mark.parametrize("use_S3", [False, True])
+def test_residual_jacobian_matches_finite_differences(use_S3):
+    # Arrange
+    phis = [0, math.pi / 4, math.pi / 8]
+    mp = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=muellerCalculus.optical_equivalent_model(
+        delta=1.1, theta=0.4, omega=2.0) @ muellerCalculus.linearly_polarized_light(phi)) for phi in phis],
+        use_S3=use_S3)
+    x = np.array([0.7, 1.3, 0.2])
+    step = 1e-6
+
+    # Act
+    jacobian = mp.residual_jacobian(*x)
+
+    # Assert
+    for column in range(3):
+        dx = np.zeros(3)
+        dx[column] = step
+        expected = (np.array(mp.residual_vector_r(*(x + dx))) - np.array(mp.residual_vector_r(*(x - dx)))) / (2 * step)
+        assert pytest.approx(expected, abs=1e-6) == jacobian[:, column]
+
+
+def test_incremental_procedure_polishes_locally_after_the_first_solution():
+    # Arrange
+    np.random.seed(0)
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=0.4, omega=2.0)
+    measurements = [MeasuredStokesVector(phi=phi, stokes_vector=model @ muellerCalculus.linearly_polarized_light(phi))
+                    for phi in np.radians([0, 45, 22.5, 67.5, 10])]
+    incremental = IncrementalOptimizationProcedure()
+
+    # Act
+    results = [incremental.add_measurement(measurement) for measurement in measurements]
+
+    # Assert
+    assert results[0] is None
+    assert (incremental.n_global_searches, incremental.n_local_updates) == (1, 3)
+    assert pytest.approx([1.1, 0.4, 2.0], abs=1e-6) == [results[-1].delta, results[-1].theta, results[-1].omega]
+
+
+def test_incremental_procedure_reruns_the_global_search_when_the_residual_jumps():
+    # Arrange: the first two measurements are corrupted, the solution found with them cannot explain the others
+    np.random.seed(0)
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=0.4, omega=2.0)
+    phis = np.radians([0, 45, 22.5, 67.5, 10, 80])
+    measurements = [MeasuredStokesVector(phi=phi, stokes_vector=model @ muellerCalculus.linearly_polarized_light(phi))
+                    for phi in phis]
+    for measurement in measurements[:2]:
+        measurement.S1, measurement.S2 = -measurement.S2, measurement.S1
+    incremental = IncrementalOptimizationProcedure(measurements[:1], residual_threshold=1e-3)
+
+    # Act
+    for measurement in measurements[1:]:
+        incremental.add_measurement(measurement)
+
+    # Assert
+    assert incremental.n_global_searches >= 2
+    assert incremental.n_local_updates == 4
+
+
+def test_residual_vector_r_array_writes_to_preallocated_output():
+    # Arrange
+    phis = [0, math.pi / 4, math.pi / 8]
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=0.4, omega=2.0)
+    mp = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @
+                                                     muellerCalculus.linearly_polarized_light(phi))
+                                for phi in phis], use_S3=True)
+    out = np.empty(9)
+
+    # Act
+    residuals = mp.residual_vector_r_array(0.7, 1.3, 0.2, out=out)
+
+    # Assert
+    assert residuals is out
+    assert pytest.approx(mp.residual_vector_r(0.7, 1.3, 0.2)) == list(out)
+    assert pytest.approx(model[3] @ muellerCalculus.linearly_polarized_light(math.pi / 4)
+                         - OptimizationProcedure.S3_in_theory(math.pi / 4, 0.7, 1.3, 0.2)) == out[5]
+    strided = np.zeros(18)
+    mp.residual_vector_r_array(0.7, 1.3, 0.2, out=strided[::2])
+    assert pytest.approx(list(out)) == list(strided[::2])
+    with pytest.raises(InvalidInputError):
+        mp.residual_vector_r_array(0.7, 1.3, 0.2, out=np.empty(6))
+
+
+def test_find_characteristic_parameters_array_fills_an_image_pixel():
+    # Arrange
+    np.random.seed(0)
+    model = muellerCalculus.optical_equivalent_model(delta=1.1, theta=0.4, omega=2.0)
+    mp = OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @
+                                                     muellerCalculus.linearly_polarized_light(phi))
+                                for phi in [0, math.pi / 4, math.pi / 8]])
+    image = np.zeros((3, 2, 2))
+
+    # Act
+    mp.find_characteristic_parameters_array(backend="analytic", out=image[:, 1, 0])
+
+    # Assert
+    assert pytest.approx([1.1, 0.4, 2.0], abs=1e-9) == list(image[:, 1, 0])
+    assert np.count_nonzero(image) == 3
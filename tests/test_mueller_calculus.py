@@ -78,3 +78,34 @@ def test_optical_equivalent_model():
     # Assert
     for (S_is, S_should) in zip(S_out, [1, 0, 0, 1]):
         assert pytest.approx(S_is) == S_should
+
+
+def test_optical_equivalent_model_stack():
+    # Arrange
+    deltas = np.array([[0.1, 2.0], [3.0, 5.5]])
+    thetas = np.array([[0.4, 1.3], [2.2, 0.0]])
+    omegas = np.array([[0.9, 0.2], [4.0, 1.1]])
+
+    # Act
+    stack = characteristicParameters.muellerCalculus.optical_equivalent_model_stack(deltas, thetas, omegas)
+
+    # Assert
+    assert stack.shape == (2, 2, 4, 4)
+    for index in np.ndindex(deltas.shape):
+        expected = characteristicParameters.muellerCalculus.optical_equivalent_model(
+            delta=deltas[index], theta=thetas[index], omega=omegas[index])
+        assert pytest.approx(expected.ravel()) == stack[index].ravel()
+
+
+def test_linear_polarizer():
+    # Arrange: unpolarized light and light polarized perpendicular to the transmission axis
+    P = characteristicParameters.muellerCalculus.linear_polarizer(math.pi / 8)
+
+    # Act
+    S_out1 = P @ [1, 0, 0, 0]
+    S_out2 = P @ characteristicParameters.muellerCalculus.linearly_polarized_light(math.pi / 8 + math.pi / 2)
+
+    # Assert
+    assert pytest.approx(0.5 * characteristicParameters.muellerCalculus.linearly_polarized_light(math.pi / 8)) \
+        == S_out1
+    assert pytest.approx(np.zeros(4), abs=1e-15) == S_out2
@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import eff_diff_omega, eff_diff_theta
+from characteristicParameters.muellerCalculus import optical_equivalent_model_stack
+from characteristicParameters.muellerPolarimetry import MuellerPolarimeter, analyzer_vector, generator_stokes
+
+
+def test_dual_rotating_retarder_recovers_mueller_matrices_and_parameters():
+    # Arrange
+    rng = np.random.default_rng(2)
+    deltas = rng.uniform(0.1, 3.0, (3, 4))
+    thetas = rng.uniform(0, math.pi, (3, 4))
+    omegas = rng.uniform(0, math.pi, (3, 4))
+    mueller_matrices = optical_equivalent_model_stack(deltas, thetas, omegas)
+    polarimeter = MuellerPolarimeter.dual_rotating_retarder()
+    intensities = 2.5 * polarimeter.intensities(mueller_matrices)
+
+    # Act
+    recovered = polarimeter.recover_mueller_matrices(intensities)
+    delta, theta, omega = polarimeter.find_characteristic_parameters(intensities)
+
+    # Assert
+    assert intensities.shape == (25, 3, 4)
+    assert pytest.approx(2.5 * mueller_matrices.ravel(), abs=1e-12) == recovered.ravel()
+    assert pytest.approx(deltas.ravel(), abs=1e-9) == delta.ravel()
+    for (t_is, t_should, o_is, o_should) in zip(theta.ravel(), thetas.ravel(), omega.ravel(), omegas.ravel()):
+        assert eff_diff_theta(t_is % (math.pi / 2), t_should % (math.pi / 2)) < 1e-9
+        assert eff_diff_omega(o_is % math.pi, o_should % math.pi) < 1e-9
+
+
+def test_polarimeter_rejects_underdetermined_instruments():
+    angles = math.pi * np.arange(16) / 16
+    with pytest.raises(InvalidInputError):
+        MuellerPolarimeter(generator_states=[generator_stokes(angle) for angle in angles],
+                           analyzer_states=[analyzer_vector(5 * angle) for angle in angles])
@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters.rgbMethod import RetardationMeasurement, MeasuredRetardationsAtOneLocation, \
+    MeasuredRetardationsAtManyLocations, define_reduced_birefringence_function, error_function_E_arrays, \
+    convert_retardation_to_different_wavelength
+from characteristicParameters.triangle_wave_functions import T_pi
+
+WAVELENGTHS = [632.8, 546.1, 435.8]
+
+
+def test_error_function_E_arrays_matches_one_location():
+    # Arrange
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+    measured = np.array([[0.3, 2.1, 1.7], [2.9, 0.4, 1.1]])
+    delta_rs = np.array([[0.0, 4.2, 31.0], [1.0, 17.5, 60.3]])
+
+    # Act
+    errors = error_function_E_arrays(measured, WAVELENGTHS, k_function, delta_rs)
+
+    # Assert
+    for (i, deltas) in enumerate(measured):
+        location = MeasuredRetardationsAtOneLocation(
+            measurement_at_reference_wavelength=RetardationMeasurement(WAVELENGTHS[0], deltas[0]),
+            additional_measurements=[RetardationMeasurement(w, d) for (w, d) in zip(WAVELENGTHS[1:], deltas[1:])],
+            reduced_birefringence_function=k_function)
+        assert pytest.approx([location.error_function_E(d) for d in delta_rs[i]]) == list(errors[i])
+
+
+def test_many_locations_from_locations():
+    # Arrange
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+    location = MeasuredRetardationsAtOneLocation(
+        measurement_at_reference_wavelength=RetardationMeasurement(WAVELENGTHS[0], 0.5),
+        additional_measurements=[RetardationMeasurement(WAVELENGTHS[1], 1.5),
+                                 RetardationMeasurement(WAVELENGTHS[2], 2.5)],
+        reduced_birefringence_function=k_function)
+
+    # Act
+    many = MeasuredRetardationsAtManyLocations.from_locations([location, location])
+
+    # Assert
+    assert many.deltas.shape == (2, 3)
+    assert many.error_vectors_e([1.0, 9.0]).shape == (2, 2, 3)
+    assert pytest.approx(location.error_vector_e(9.0)) == list(many.error_vectors_e([1.0, 9.0])[1, 1])
+    assert pytest.approx(location.error_function_E(1.0)) == many.error_function_E([1.0, 9.0])[0, 0]
+
+
+def test_hyperspectral_find_delta_r():
+    # Arrange: 30 bands between 420 nm and 700 nm
+    wavelengths = np.linspace(700, 420, 30)
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    delta_r_true = np.array([0.3, 5.1 * math.pi, 33.3 * math.pi, 47.9 * math.pi])
+    deltas = np.array([[T_pi(convert_retardation_to_different_wavelength(k_function, wavelengths[0], d, w))
+                        for w in wavelengths] for d in delta_r_true])
+    locations = MeasuredRetardationsAtManyLocations(wavelengths, deltas, k_function)
+
+    # Act
+    delta_r, errors = locations.find_delta_r()
+
+    # Assert
+    assert pytest.approx(delta_r_true) == delta_r
+    assert np.all(errors < 1e-9)
+
+
+def test_float32_find_delta_r_matches_float64():
+    # Arrange
+    rng = np.random.default_rng(6)
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+    delta_r_true = rng.uniform(0, 50 * math.pi, 500)
+    deltas = np.array([[T_pi(convert_retardation_to_different_wavelength(k_function, WAVELENGTHS[0], d, w))
+                        for w in WAVELENGTHS] for d in delta_r_true])
+
+    # Act
+    single, single_errors = MeasuredRetardationsAtManyLocations(WAVELENGTHS, deltas, k_function,
+                                                                dtype=np.float32).find_delta_r()
+    double, _ = MeasuredRetardationsAtManyLocations(WAVELENGTHS, deltas, k_function).find_delta_r()
+
+    # Assert: the branches are ranked in float32, but returned in float64
+    assert single.dtype == np.float64
+    assert single_errors.dtype == np.float32
+    assert np.max(np.abs(single - double)) < 1e-6
+
+
+def test_array_variants_write_to_preallocated_outputs():
+    # Arrange
+    k_function = define_reduced_birefringence_function(lambda_0=WAVELENGTHS[0], a=25.5e3, b=3.25e9)
+    location = MeasuredRetardationsAtOneLocation(
+        measurement_at_reference_wavelength=RetardationMeasurement(WAVELENGTHS[0], 0.5),
+        additional_measurements=[RetardationMeasurement(WAVELENGTHS[1], 1.5),
+                                 RetardationMeasurement(WAVELENGTHS[2], 2.5)],
+        reduced_birefringence_function=k_function)
+    many = MeasuredRetardationsAtManyLocations.from_locations([location])
+    vector_out, errors_out = np.empty(3), np.empty((1, 2))
+
+    # Act
+    vector = location.error_vector_e_array(9.0, out=vector_out)
+    errors = many.error_function_E([1.0, 9.0], out=errors_out)
+
+    # Assert
+    expected = [d - T_pi(convert_retardation_to_different_wavelength(k_function, WAVELENGTHS[0], 9.0, w))
+                for (w, d) in zip(WAVELENGTHS, [0.5, 1.5, 2.5])]
+    assert vector is vector_out and errors is errors_out
+    assert pytest.approx(expected) == list(vector)
+    assert pytest.approx(np.linalg.norm(expected)) == errors[0, 1]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from characteristicParameters import imageProcessing
+from characteristicParameters.sharedArrays import SharedArray
+
+
+def square_tile(tile: np.ndarray) -> np.ndarray:
+    return np.stack([tile ** 2, -tile])
+
+
+def test_attach_sees_the_same_memory():
+    # Arrange
+    with SharedArray.from_array(np.arange(6.0).reshape(2, 3)) as owner:
+        # Act
+        attached = SharedArray.attach(owner.descriptor)
+        attached.array[1, 2] = 42
+        value = owner.array[1, 2]
+        attached.close()
+
+    # Assert
+    assert owner.descriptor.shape == (2, 3)
+    assert value == 42
+
+
+def test_run_tiles_with_workers_matches_serial_run():
+    # Arrange
+    image = np.random.default_rng(3).uniform(size=(5, 7))
+
+    # Act
+    serial = imageProcessing._run_tiles(square_tile, image, n_outputs=2, tile_size=2, workers=1, dtype=np.float64)
+    parallel = imageProcessing._run_tiles(square_tile, image, n_outputs=2, tile_size=2, workers=2,
+                                          dtype=np.float32)
+
+    # Assert
+    assert parallel.dtype == np.float32
+    assert pytest.approx(serial.ravel(), rel=1e-6) == parallel.ravel()
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters import muellerCalculus, solverBackends
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.optimizationProcedure import OptimizationProcedure, MeasuredStokesVector
+from characteristicParameters.rgbMethod import RetardationMeasurement, MeasuredRetardationsAtOneLocation, \
+    convert_retardation_to_different_wavelength, define_reduced_birefringence_function
+from characteristicParameters.triangle_wave_functions import T_pi
+
+
+def light(phi):
+    return muellerCalculus.linearly_polarized_light(phi)
+
+
+def make_procedure(delta, theta, omega, phis=(0, math.pi / 4, math.pi / 8)) -> OptimizationProcedure:
+    model = muellerCalculus.optical_equivalent_model(delta=delta, theta=theta, omega=omega)
+    return OptimizationProcedure([MeasuredStokesVector(phi=phi, stokes_vector=model @ light(phi)) for phi in phis])
+
+
+@pytest.mark.parametrize("backend", ["least_squares", "grid+polish", "analytic"])
+def test_backends_find_the_characteristic_parameters(backend):
+    # Arrange
+    procedure = make_procedure(delta=1.1, theta=0.4, omega=2.0)
+    options = {"seed": 0} if backend == "least_squares" else None
+
+    # Act
+    paras = procedure.find_characteristic_parameters(backend=backend, backend_options=options)
+
+    # Assert
+    assert pytest.approx(0, abs=1e-6) == procedure.residual_function_R(paras.delta, paras.theta, paras.omega)
+    assert pytest.approx(1.1, abs=1e-6) == paras.delta
+
+
+def test_solve_counts_the_evaluations():
+    # Arrange
+    problem = solverBackends.SolverProblem(objective=lambda x: float((x[0] - 1) ** 2), bounds=[(-3, 3)],
+                                           residuals=lambda x: np.array([x[0] - 1]))
+
+    # Act
+    result = solverBackends.solve(problem, backend="least_squares", x0=np.array([0.0]))
+
+    # Assert
+    assert result.backend == "least_squares"
+    assert pytest.approx(1) == result.x[0]
+    assert result.n_evaluations > 0
+
+
+def test_least_squares_random_starts_are_seeded():
+    # Arrange: a local minimum at x = -2 and the global one at x = 1
+    problem = solverBackends.SolverProblem(objective=lambda x: float((x[0] - 1) ** 2 * (x[0] + 2) ** 2 + x[0]),
+                                           bounds=[(-3, 3)],
+                                           residuals=lambda x: np.array([(x[0] - 1) * (x[0] + 2), x[0] + 3]))
+
+    # Act
+    first = solverBackends.solve(problem, backend="least_squares", n_starts=3, seed=5)
+    np.random.seed(1)
+    second = solverBackends.solve(problem, backend="least_squares", n_starts=3, seed=5)
+
+    # Assert: the global generator has no influence
+    assert np.array_equal(first.x, second.x)
+    assert first.n_evaluations == second.n_evaluations
+
+
+def test_rgb_analytic_backend_scans_all_branches():
+    # Arrange
+    wavelengths = [632.8, 546.1, 435.8]
+    k_function = define_reduced_birefringence_function(lambda_0=wavelengths[0], a=25.5e3, b=3.25e9)
+    delta_r = 21.25 * math.pi
+    measurements = [RetardationMeasurement(wavelength, T_pi(convert_retardation_to_different_wavelength(
+        k_function=k_function, wavelength_1=wavelengths[0], delta_1=delta_r, wavelength_2=wavelength)))
+                    for wavelength in wavelengths]
+    location = MeasuredRetardationsAtOneLocation(measurements[0], measurements[1:], k_function)
+
+    # Act and Assert
+    assert pytest.approx(delta_r) == location.find_delta_r(backend="analytic")
+
+
+def test_custom_backends_can_be_registered():
+    # Arrange
+    @solverBackends.register_backend("lower_bound")
+    def lower_bound(problem):
+        x = np.array([lower for (lower, _) in problem.bounds])
+        return solverBackends.SolverResult(x=x, fun=problem.objective(x), n_evaluations=0, backend="")
+
+    # Act
+    paras = make_procedure(delta=1.1, theta=0.4, omega=2.0).find_characteristic_parameters(backend="lower_bound")
+
+    # Assert
+    assert "lower_bound" in solverBackends.available_backends()
+    assert pytest.approx(0) == paras.delta
+
+
+def test_unknown_backends_and_unsupported_problems_are_rejected():
+    procedure = make_procedure(delta=1.1, theta=0.4, omega=2.0, phis=(0, math.pi / 8))
+    with pytest.raises(InvalidInputError):
+        procedure.find_characteristic_parameters(backend="does_not_exist")
+    with pytest.raises(InvalidInputError):
+        procedure.find_characteristic_parameters(backend="analytic")
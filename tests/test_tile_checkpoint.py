@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+from characteristicParameters import imageProcessing
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.tileCheckpoint import TileCheckpoint
+
+SOLVED_TILES = []
+
+
+def solve_and_record(tile: np.ndarray) -> np.ndarray:
+    SOLVED_TILES.append(tile.copy())
+    return 2 * tile[np.newaxis]
+
+
+def test_save_and_resume(tmp_path):
+    # Arrange
+    checkpoint = TileCheckpoint(tmp_path, fingerprint={"job": 1})
+
+    # Act
+    checkpoint.save(3, np.arange(4.0))
+    resumed = TileCheckpoint(tmp_path, fingerprint={"job": 1})
+
+    # Assert
+    assert resumed.is_completed(3)
+    assert not resumed.is_completed(0)
+    assert pytest.approx([0, 1, 2, 3]) == list(resumed.load(3))
+    assert json.loads((tmp_path / TileCheckpoint.MANIFEST_NAME).read_text())["completed"] == [3]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_different_job_is_rejected(tmp_path):
+    TileCheckpoint(tmp_path, fingerprint={"job": 1}).save(0, np.zeros(1))
+
+    with pytest.raises(InvalidInputError):
+        TileCheckpoint(tmp_path, fingerprint={"job": 2})
+
+
+def test_run_tiles_skips_completed_tiles(tmp_path):
+    # Arrange: simulate an interrupted run that only finished the first tile
+    image = np.arange(16.0).reshape(4, 4)
+    SOLVED_TILES.clear()
+    first = imageProcessing._run_tiles(solve_and_record, image, n_outputs=1, tile_size=2, workers=1,
+                                       dtype=np.float64, checkpoint_dir=tmp_path)
+    manifest_path = tmp_path / TileCheckpoint.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest["completed"] = [0]
+    manifest_path.write_text(json.dumps(manifest))
+    SOLVED_TILES.clear()
+
+    # Act
+    resumed = imageProcessing._run_tiles(solve_and_record, image, n_outputs=1, tile_size=2, workers=1,
+                                         dtype=np.float64, checkpoint_dir=tmp_path)
+
+    # Assert
+    assert len(SOLVED_TILES) == 3
+    assert pytest.approx(first.ravel()) == resumed.ravel()
+    assert pytest.approx((2 * image).ravel()) == resumed.ravel()
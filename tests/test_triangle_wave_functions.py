@@ -1,7 +1,8 @@
 import math
 
+import numpy as np
 import pytest
-from characteristicParameters.triangle_wave_functions import T_pi, T_pi_2
+from characteristicParameters.triangle_wave_functions import T_pi, T_pi_2, T_pi_array
 
 
 def test_T_pi():
@@ -20,3 +21,12 @@ def test_T_pi_2():
 
     assert pytest.approx(T_pi_2(math.pi)) == 0
     assert pytest.approx(T_pi_2(5 * math.pi)) == 0
+
+
+def test_T_pi_array_matches_T_pi_in_both_precisions():
+    deltas = np.linspace(-3, 50 * math.pi, 10001)
+    expected = [T_pi(delta) for delta in deltas]
+
+    assert pytest.approx(expected, abs=1e-12) == T_pi_array(deltas)
+    assert T_pi_array(deltas, dtype=np.float32).dtype == np.float32
+    assert pytest.approx(expected, abs=2e-5) == T_pi_array(deltas, dtype=np.float32)
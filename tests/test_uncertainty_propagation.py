@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+from characteristicParameters._helpers import InvalidInputError
+from characteristicParameters.analyticFormulas import char_paras_images_to_stokes, \
+    stokes_images_to_char_paras_phi_0_and_45
+from characteristicParameters.muellerCalculus import linearly_polarized_light
+from characteristicParameters.uncertaintyPropagation import jacobian_phi_0_and_45, uncertainty_phi_0_and_45
+
+
+def make_stokes(deltas, thetas, omegas):
+    return [char_paras_images_to_stokes(np.asarray(deltas), np.asarray(thetas), np.asarray(omegas),
+                                        linearly_polarized_light(phi))[:3] for phi in (0, math.pi / 4)]
+
+
+def test_jacobian_matches_finite_differences():
+    # Arrange
+    stokes_0, stokes_45 = make_stokes([1.2, 2.3], [0.3, 1.0], [0.4, 2.5])
+    x = np.stack([stokes_0[1], stokes_0[2], stokes_45[1], stokes_45[2]])
+    step = 1e-7
+
+    def closed_form(x):
+        ones = np.ones(x.shape[1])
+        return np.array(stokes_images_to_char_paras_phi_0_and_45([ones, x[0], x[1]], [ones, x[2], x[3]]))
+
+    # Act
+    jacobian = jacobian_phi_0_and_45(stokes_0, stokes_45)
+
+    # Assert
+    for column in range(4):
+        dx = np.zeros_like(x)
+        dx[column] = step
+        expected = (closed_form(x + dx) - closed_form(x - dx)) / (2 * step)
+        assert pytest.approx(expected.T, abs=1e-6) == jacobian[:, :, column]
+
+
+def test_linearised_standard_deviations_match_sampling():
+    # Arrange
+    rng = np.random.default_rng(0)
+    stokes_0, stokes_45 = make_stokes(rng.uniform(0.3, 2.8, 20), rng.uniform(0, math.pi, 20),
+                                      rng.uniform(0, math.pi, 20))
+
+    # Act
+    linear = uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3)
+    sampled = uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3, max_linear_std=0, n_samples=4000,
+                                       rng=rng)
+
+    # Assert
+    assert not np.any(linear.monte_carlo)
+    assert np.all(sampled.monte_carlo)
+    for name in ("delta_std", "theta_std", "omega_std"):
+        assert pytest.approx(getattr(sampled, name), rel=0.1) == getattr(linear, name)
+
+
+def test_singular_pixels_are_sampled():
+    # Arrange: delta close to 0, theta and omega are hardly defined there
+    stokes_0, stokes_45 = make_stokes([1e-4, 1.5], [0.3, 0.3], [0.4, 0.4])
+
+    # Act
+    maps = uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3, rng=np.random.default_rng(1))
+
+    # Assert
+    assert list(maps.monte_carlo) == [True, False]
+    assert np.all(np.isfinite([maps.delta_std, maps.theta_std, maps.omega_std]))
+    assert maps.theta_std[0] > 0.1
+
+
+def test_masked_pixels_are_neither_evaluated_nor_sampled():
+    # Arrange: the second pixel is background (S0 == 0), the first one is singular
+    stokes_0, stokes_45 = make_stokes([1e-4, 1.5, 1.5], [0.3, 0.3, 0.3], [0.4, 0.4, 0.4])
+    stokes_0[:, 1] = 0
+    stokes_45[:, 1] = 0
+
+    # Act
+    maps = uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3, rng=np.random.default_rng(1),
+                                    mask=[True, False, True])
+
+    # Assert
+    assert list(maps.monte_carlo) == [True, False, False]
+    assert np.isnan(maps.delta_std[1]) and np.isnan(maps.omega_std[1])
+    assert np.all(np.isfinite(maps.delta_std[[0, 2]]))
+    with pytest.raises(InvalidInputError):
+        uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3, mask=[True, False])
+
+
+def test_noise_must_be_specified_once():
+    stokes_0, stokes_45 = make_stokes([1.0], [0.3], [0.4])
+    with pytest.raises(InvalidInputError):
+        uncertainty_phi_0_and_45(stokes_0, stokes_45)
+    with pytest.raises(InvalidInputError):
+        uncertainty_phi_0_and_45(stokes_0, stokes_45, noise_std=1e-3, covariance=np.eye(4))